@@ -0,0 +1,43 @@
+import logging
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from middlewares.webhook_validator import client_state_matches
+from models.webhook import LifecycleNotificationPayload
+from services.subscription_renewal import get_renewal_scheduler
+from utils.audit_log import write_audit_record
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+@router.post("/lifecycle")
+async def lifecycle_webhook(request: Request):
+    """
+    Endpoint que recebe as notificações de ciclo de vida das subscriptions
+    (reauthorizationRequired, subscriptionRemoved e missed).
+    """
+    validation_token = request.query_params.get("validationToken")
+
+    if validation_token:
+        return PlainTextResponse(content=validation_token, status_code=200)
+
+    try:
+        payload = LifecycleNotificationPayload.model_validate_json(await request.body())
+    except Exception as e:
+        logger.error(f"Erro ao validar notificação de ciclo de vida: {e}")
+        raise HTTPException(status_code=400, detail="Payload inválido")
+
+    for item in payload.value:
+        if not client_state_matches(item.clientState):
+            raise HTTPException(status_code=400, detail="ClientState inválido")
+
+    write_audit_record("lifecycle", payload.model_dump())
+
+    scheduler = get_renewal_scheduler()
+    if scheduler is None:
+        logger.warning("Notificação de ciclo de vida recebida sem scheduler de renovação ativo")
+    else:
+        for item in payload.value:
+            scheduler.handle_lifecycle_event(item.model_dump())
+
+    return PlainTextResponse(status_code=202)
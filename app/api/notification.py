@@ -1,66 +1,73 @@
 import logging
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import PlainTextResponse
 from datetime import datetime
-from config import CLIENT_SECRET_STATE
-from middlewares.webhook_validator import validate_graph_request
-from services.email_service import EmailService
-from services.external_service import ExternalService
-from services.notification_processor import process_notification_async
-from utils.functions import save_request_to_json
+from config import NOTIFICATION_QUEUE_RETRY_AFTER
+from middlewares.webhook_validator import parse_notification_body
+from services.dedup_cache import get_dedup_cache
+from services.message_batch_fetcher import get_message_batch_fetcher
+from services.notification_processor import item_stats
+from services.notification_queue import NotificationQueue, NotificationQueueFull, get_notification_queue
+from utils.audit_log import get_audit_log_writer, write_audit_record
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
 @router.post("/notification")
-async def notification_webhook(
-        request: Request,
-        background_tasks: BackgroundTasks,
-        validated_request: dict = Depends(validate_graph_request),
-        graph_api: EmailService = Depends(EmailService),
-        external_service: ExternalService = Depends(ExternalService)
-    ):
-    
-    try:
-        validation_token = request.query_params.get("validationToken")
+async def notification_webhook(request: Request):
+    """
+    Recebe as notificações do Graph. Este é o caminho mais quente da aplicação:
+    o handshake responde antes de qualquer dependência ser construída, o corpo é
+    decodificado uma única vez direto para o modelo e o próprio modelo é enfileirado.
+    """
+    validation_token = request.query_params.get("validationToken")
+
+    if validation_token:
+        return PlainTextResponse(content=validation_token, status_code=200)
 
-        if validation_token:
-            return PlainTextResponse(content=validation_token, status_code=200)
-        
-        payload = validated_request["payload"]
+    payload = parse_notification_body(await request.body())
 
-        request_data = {
-            "headers": dict(request.headers),
+    try:
+        # A serialização do registro acontece na thread do log de auditoria
+        write_audit_record("notification", {
+            "headers": request.headers,
             "body": payload,
             "timestamp": datetime.now().isoformat()
-        }
-
-        save_request_to_json(request_data, "notification")
-
-        background_tasks.add_task(
-            process_notification_async,
-            payload,
-            graph_api,
-            external_service
-        )
+        })
 
+        try:
+            get_notification_queue().enqueue(payload)
+        except NotificationQueueFull:
+            logger.warning("Fila de notificações cheia, solicitando reenvio ao Graph")
+            return PlainTextResponse(
+                status_code=503,
+                headers={"Retry-After": str(NOTIFICATION_QUEUE_RETRY_AFTER)}
+            )
 
-        # email_data = await graph_api.get_email_data(payload)
-
-        # save_request_to_json(email_data, "email")
-
-        # await external_service.send_email(email_data)
- 
         return PlainTextResponse(status_code=202)
 
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error("Erro ao processar notificação: %s", str(e))
         raise HTTPException(
             status_code=500,
             detail="Erro interno do servidor ao processar notificação"
         )
-    
-    
\ No newline at end of file
+
+
+@router.get("/notification/stats")
+async def notification_stats(notification_queue: NotificationQueue = Depends(get_notification_queue)):
+    """Endpoint com a profundidade da fila e a utilização dos workers."""
+
+    batch_fetcher = get_message_batch_fetcher()
+    dedup_cache = get_dedup_cache()
+    audit_log_writer = get_audit_log_writer()
+
+    return {
+        "queue": notification_queue.stats(),
+        "items": dict(item_stats),
+        "graph_batch": asdict(batch_fetcher.stats) if batch_fetcher else None,
+        "dedup": dedup_cache.stats() if dedup_cache else None,
+        "audit_log": audit_log_writer.stats() if audit_log_writer else None
+    }
@@ -1,6 +1,13 @@
 import logging
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from models.task import Task
+from fastapi.responses import StreamingResponse
+from config import PLANNER_BULK_MAX_TASKS
+from models.task import BulkTaskRequest, Task
+from services.directory_service import directory_cache_stats, get_cached_user, invalidate_directory_cache
+from services.planner_management_service.group_service import invalidate_squad_group_cache, squad_group_cache_stats
+from services.planner_management_service.planner_service import invalidate_plan_cache, plan_cache_stats
+from services.planner_management_service.label_service import invalidate_label_cache, label_cache_stats
 from services.planner_management_service.planner_management_service import PlannerManagementService
 # from app.services.planner_management_service.planner_management_service import PlannerManagementService
 
@@ -16,7 +23,8 @@ async def create_task(
         created_task_resopnse = await planner_service.insert_task(task)
 
         return {
-            "created_task": created_task_resopnse
+            "created_task": created_task_resopnse,
+            "timings": planner_service.last_timings
         }
     
     except Exception as e:
@@ -28,6 +36,98 @@ async def create_task(
 
 
 
+@router.post("/planner/tasks")
+async def create_tasks(
+    bulk_request: BulkTaskRequest,
+    stream: bool = False,
+    planner_service: PlannerManagementService = Depends(PlannerManagementService)
+):
+    """
+    Cria várias tarefas de uma vez. Com stream=true, os resultados são enviados
+    em NDJSON (uma linha por tarefa) à medida que cada criação termina.
+    """
+    if not bulk_request.tasks:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma tarefa")
+
+    if len(bulk_request.tasks) > PLANNER_BULK_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {PLANNER_BULK_MAX_TASKS} tarefas por requisição")
+
+    if stream:
+        async def ndjson():
+            async for result in planner_service.iter_insert_tasks(bulk_request.tasks):
+                yield result.model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        results = await planner_service.insert_tasks(bulk_request.tasks)
+
+        failed = [result for result in results if result.status == "failed"]
+        return {
+            "status": "success" if not failed else "partial_success",
+            "message": f"{len(results) - len(failed)} de {len(results)} tarefas criadas",
+            "results": results
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao criar tarefas em massa: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro interno do servidor ao criar tarefas: {str(e)}"
+        )
+
+
+@router.get("/planner/cache")
+async def get_planner_cache_stats():
+    """
+    Estatísticas dos caches usados na criação de tarefas.
+    """
+    return {
+        "directory": directory_cache_stats(),
+        "squad_groups": squad_group_cache_stats(),
+        "plans": plan_cache_stats(),
+        "labels": label_cache_stats()
+    }
+
+
+@router.delete("/planner/cache")
+async def invalidate_planner_cache(
+    email: Optional[str] = None,
+    group_id: Optional[str] = None,
+    plan_id: Optional[str] = None
+):
+    """
+    Invalida os caches do Planner. Com email, invalida o usuário e seu grupo squad;
+    com group_id, o plano/bucket do grupo; com plan_id, os labels do plano;
+    sem parâmetros, todos.
+    """
+    invalidated = {}
+
+    if email:
+        user = get_cached_user(email)
+        if user is not None:
+            invalidate_squad_group_cache(user.id)
+        invalidate_directory_cache(email)
+        invalidated["users"] = email
+
+    if group_id:
+        invalidate_plan_cache(group_id)
+        invalidated["plans"] = group_id
+
+    if plan_id:
+        invalidate_label_cache(plan_id)
+        invalidated["labels"] = plan_id
+
+    if not email and not group_id and not plan_id:
+        invalidate_directory_cache()
+        invalidate_squad_group_cache()
+        invalidate_plan_cache()
+        invalidate_label_cache()
+        invalidated = {"users": "all", "plans": "all", "labels": "all"}
+
+    return {"invalidated": invalidated}
+
+
 @router.get("/planner")
 async def get_user_groups(
     planner_service: PlannerManagementService = Depends(PlannerManagementService)
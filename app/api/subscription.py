@@ -1,6 +1,12 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from dataclasses import asdict
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
+from models.subscription import BulkSubscriptionRequest
+from services.delta_sync import get_delta_sync
+from services.subscription_provisioning import SubscriptionProvisioningService
+from services.subscription_renewal import get_renewal_scheduler
 from services.subscription_service import SubscriptionService
 
 router = APIRouter()
@@ -31,6 +37,35 @@ async def create_subscription(request: Request, graph_api: SubscriptionService =
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/subscriptions/bulk")
+async def create_subscriptions_bulk(
+    bulk_request: BulkSubscriptionRequest,
+    provisioning_service: SubscriptionProvisioningService = Depends(SubscriptionProvisioningService)
+):
+    """Endpoint para criar subscriptions para várias caixas de correio (usuários e/ou membros de um grupo)."""
+    if not bulk_request.users and not bulk_request.group_id:
+        raise HTTPException(status_code=400, detail="Informe users e/ou group_id")
+
+    try:
+        results = await provisioning_service.provision(
+            users=bulk_request.users,
+            resource_template=bulk_request.resource_template,
+            change_type=bulk_request.change_type,
+            group_id=bulk_request.group_id
+        )
+
+        failed = [result for result in results if result.status in ("failed", "limit_reached")]
+        return {
+            "status": "success" if not failed else "partial_success",
+            "message": f"{len(results) - len(failed)} de {len(results)} caixas de correio com subscription ativa",
+            "results": results
+        }
+
+    except Exception as e:
+        logging.error(f"Erro no provisionamento de subscriptions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/subscriptions/{subscription_id}")
 async def delete_subscription(subscription_id: str, graph_api: SubscriptionService = Depends(SubscriptionService)):
     """Endpoint para deletar uma subscription específica."""
@@ -46,16 +81,86 @@ async def delete_subscription(subscription_id: str, graph_api: SubscriptionServi
 
 
 @router.get("/subscriptions")
-async def list_subscriptions(graph_api: SubscriptionService = Depends(SubscriptionService)):
-    """Endpoint para listar todas as subscriptions."""
+async def list_subscriptions(
+    resource: Optional[str] = None,
+    change_type: Optional[str] = None,
+    mailbox: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    graph_api: SubscriptionService = Depends(SubscriptionService)
+):
+    """Endpoint para listar as subscriptions do registro local, com filtros e paginação."""
     try:
-        subscriptions = await graph_api.list_subscriptions()
+        subscriptions, total = await graph_api.list_subscriptions(resource, change_type, mailbox, limit, offset)
         return {
             "status": "success",
             "message": "Subscriptions listed successfully",
+            "total": total,
+            "limit": limit,
+            "offset": offset,
             "subscriptions": subscriptions
         }
     except Exception as e:
         logging.error(f"Erro ao listar subscriptions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/subscriptions/reconcile")
+async def reconcile_subscriptions(graph_api: SubscriptionService = Depends(SubscriptionService)):
+    """Endpoint para sincronizar o registro local com as subscriptions do Graph."""
+    try:
+        result = await graph_api.reconcile_subscriptions()
+        return {
+            "status": "success",
+            "message": "Subscriptions reconciled successfully",
+            **result
+        }
+    except Exception as e:
+        logging.error(f"Erro ao reconciliar subscriptions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/subscriptions/renewal")
+async def renewal_status():
+    """Endpoint com o estado do scheduler de renovação das subscriptions."""
+    scheduler = get_renewal_scheduler()
+    return {
+        "status": "success",
+        "renewal": scheduler.stats() if scheduler else None
+    }
+
+
+@router.get("/subscriptions/delta-sync")
+async def delta_sync_status():
+    """Endpoint com o estado da sincronização delta (recuperação de mensagens perdidas)."""
+    delta_sync = get_delta_sync()
+    return {
+        "status": "success",
+        "delta_sync": delta_sync.stats() if delta_sync else None
+    }
+
+
+@router.post("/subscriptions/delta-sync")
+async def run_delta_sync(mailbox: Optional[str] = Query(None)):
+    """Endpoint para sincronizar agora uma caixa (mailbox) ou todas as caixas com subscription."""
+    delta_sync = get_delta_sync()
+    if delta_sync is None:
+        raise HTTPException(status_code=409, detail="Sincronização delta desabilitada (DELTA_SYNC_ENABLED)")
+
+    try:
+        if mailbox:
+            subscription_id = (await delta_sync.mailbox_subscriptions()).get(mailbox.lower())
+            results = [await delta_sync.sync_mailbox(mailbox, subscription_id)] if subscription_id else None
+        else:
+            results = await delta_sync.sync_all()
+    except Exception as e:
+        logging.error(f"Erro na sincronização delta: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Caixa {mailbox} sem subscription de mensagens no registro")
+
+    return {
+        "status": "success" if all(result.status != "failed" for result in results) else "partial_success",
+        "results": [asdict(result) for result in results]
+    }
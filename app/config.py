@@ -3,6 +3,14 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 CLIENT_ID = os.getenv("CLIENT_ID")
 TENANT_ID = os.getenv("TENANT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
@@ -19,11 +27,101 @@ WEBHOOK_LIFECYCLE_ENDPOINT = build_webhook_url(os.getenv("WEBHOOK_LIFECYCLE"))
 
 EXTERNAL_API_URL = os.getenv("EXTERNAL_API_URL")
 
+# Cliente HTTP compartilhado para a API externa (agente)
+EXTERNAL_HTTP_MAX_CONNECTIONS = int(os.getenv("EXTERNAL_HTTP_MAX_CONNECTIONS", "50"))
+EXTERNAL_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("EXTERNAL_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+EXTERNAL_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("EXTERNAL_HTTP_KEEPALIVE_EXPIRY", "30"))
+EXTERNAL_HTTP2 = env_bool("EXTERNAL_HTTP2", True)
+EXTERNAL_HTTP_CONNECT_TIMEOUT = float(os.getenv("EXTERNAL_HTTP_CONNECT_TIMEOUT", "5"))
+EXTERNAL_HTTP_READ_TIMEOUT = float(os.getenv("EXTERNAL_HTTP_READ_TIMEOUT", "30"))
+EXTERNAL_HTTP_WRITE_TIMEOUT = float(os.getenv("EXTERNAL_HTTP_WRITE_TIMEOUT", "30"))
+EXTERNAL_HTTP_POOL_TIMEOUT = float(os.getenv("EXTERNAL_HTTP_POOL_TIMEOUT", "10"))
+EXTERNAL_HTTP_GZIP = env_bool("EXTERNAL_HTTP_GZIP", False)
+EXTERNAL_HTTP_GZIP_MIN_BYTES = int(os.getenv("EXTERNAL_HTTP_GZIP_MIN_BYTES", "1024"))
+# Corpos a partir deste tamanho são comprimidos numa thread, fora do event loop
+EXTERNAL_HTTP_GZIP_THREAD_MIN_BYTES = int(os.getenv("EXTERNAL_HTTP_GZIP_THREAD_MIN_BYTES", "65536"))
+
+
+# Fila de processamento de notificações
+NOTIFICATION_QUEUE_MAXSIZE = int(os.getenv("NOTIFICATION_QUEUE_MAXSIZE", "1000"))
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "10"))
+NOTIFICATION_QUEUE_RETRY_AFTER = int(os.getenv("NOTIFICATION_QUEUE_RETRY_AFTER", "5"))
+NOTIFICATION_QUEUE_DRAIN_TIMEOUT = float(os.getenv("NOTIFICATION_QUEUE_DRAIN_TIMEOUT", "30"))
+
+# Concorrência no processamento dos itens de cada notificação
+NOTIFICATION_BATCH_CONCURRENCY = int(os.getenv("NOTIFICATION_BATCH_CONCURRENCY", "5"))
+NOTIFICATION_MAX_CONCURRENT_ITEMS = int(os.getenv("NOTIFICATION_MAX_CONCURRENT_ITEMS", "50"))
+
+# Agrupamento das buscas de mensagens em chamadas $batch do Graph
+GRAPH_BATCH_ENABLED = env_bool("GRAPH_BATCH_ENABLED", True)
+GRAPH_BATCH_WINDOW_MS = float(os.getenv("GRAPH_BATCH_WINDOW_MS", "20"))
+GRAPH_BATCH_MAX_SIZE = int(os.getenv("GRAPH_BATCH_MAX_SIZE", "20"))
+GRAPH_BATCH_MAX_RETRIES = int(os.getenv("GRAPH_BATCH_MAX_RETRIES", "3"))
+
+# Perfil de $select usado na busca das mensagens: "minimal", "standard" ou "full"
+GRAPH_MESSAGE_SELECT_PROFILE = os.getenv("GRAPH_MESSAGE_SELECT_PROFILE", "standard")
+# Formato do corpo retornado pelo Graph ("text" ou "html"); vazio mantém o original
+GRAPH_MESSAGE_BODY_CONTENT_TYPE = os.getenv("GRAPH_MESSAGE_BODY_CONTENT_TYPE", "")
+
+# Descarte de notificações repetidas
+DEDUP_ENABLED = env_bool("DEDUP_ENABLED", True)
+DEDUP_TTL_SECONDS = float(os.getenv("DEDUP_TTL_SECONDS", "3600"))
+# Prazo da reserva enquanto o item é processado; só após a entrega a chave vale por DEDUP_TTL_SECONDS
+DEDUP_LEASE_SECONDS = float(os.getenv("DEDUP_LEASE_SECONDS", "300"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))
+# Caminho do SQLite para persistir as chaves entre reinícios; vazio mantém apenas em memória
+DEDUP_SQLITE_PATH = os.getenv("DEDUP_SQLITE_PATH", "")
+
+# Log de auditoria (JSONL) das notificações e e-mails processados
+AUDIT_LOG_ENABLED = env_bool("AUDIT_LOG_ENABLED", True)
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "logs")
+AUDIT_LOG_MAX_BYTES = int(os.getenv("AUDIT_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIT_LOG_MAX_AGE_SECONDS = float(os.getenv("AUDIT_LOG_MAX_AGE_SECONDS", "3600"))
+AUDIT_LOG_COMPRESS = env_bool("AUDIT_LOG_COMPRESS", False)
+AUDIT_LOG_BUFFER_SIZE = int(os.getenv("AUDIT_LOG_BUFFER_SIZE", "10000"))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1"))
+# Fração dos registros gravados (1.0 grava todos)
+AUDIT_LOG_SAMPLE_RATE = float(os.getenv("AUDIT_LOG_SAMPLE_RATE", "1.0"))
+
+# Etapa de anexos: baixa o $value de cada anexo em partes e envia para a API externa
+# (ATTACHMENTS_UPLOAD_URL) ou grava em disco (ATTACHMENTS_SPOOL_DIR) sem carregá-lo em memória
+ATTACHMENTS_ENABLED = env_bool("ATTACHMENTS_ENABLED", False)
+ATTACHMENTS_UPLOAD_URL = os.getenv("ATTACHMENTS_UPLOAD_URL", "")
+ATTACHMENTS_SPOOL_DIR = os.getenv("ATTACHMENTS_SPOOL_DIR", "attachments")
+ATTACHMENTS_MAX_BYTES = int(os.getenv("ATTACHMENTS_MAX_BYTES", str(25 * 1024 * 1024)))
+# Tipos aceitos/recusados, separados por vírgula ("application/pdf,image/*"); vazio aceita todos
+ATTACHMENTS_ALLOWED_TYPES = os.getenv("ATTACHMENTS_ALLOWED_TYPES", "")
+ATTACHMENTS_BLOCKED_TYPES = os.getenv("ATTACHMENTS_BLOCKED_TYPES", "")
+ATTACHMENTS_SKIP_INLINE = env_bool("ATTACHMENTS_SKIP_INLINE", True)
+ATTACHMENTS_CONCURRENCY = int(os.getenv("ATTACHMENTS_CONCURRENCY", "4"))
+ATTACHMENTS_CHUNK_SIZE = int(os.getenv("ATTACHMENTS_CHUNK_SIZE", str(64 * 1024)))
+
+# Compactação do corpo antes do envio para a API externa: HTML -> texto, remoção do
+# histórico citado e de assinaturas e corte em BODY_COMPACTION_MAX_BYTES (0 = sem limite)
+BODY_COMPACTION_ENABLED = env_bool("BODY_COMPACTION_ENABLED", False)
+BODY_COMPACTION_MAX_BYTES = int(os.getenv("BODY_COMPACTION_MAX_BYTES", str(16 * 1024)))
+BODY_COMPACTION_STRIP_QUOTES = env_bool("BODY_COMPACTION_STRIP_QUOTES", True)
+BODY_COMPACTION_STRIP_SIGNATURES = env_bool("BODY_COMPACTION_STRIP_SIGNATURES", True)
+# Envia também o corpo original (campo original_body do payload)
+BODY_COMPACTION_KEEP_ORIGINAL = env_bool("BODY_COMPACTION_KEEP_ORIGINAL", False)
+
+# Cria subscriptions com dados criptografados na notificação (rich notifications)
+RICH_NOTIFICATIONS_ENABLED = env_bool("RICH_NOTIFICATIONS_ENABLED", False)
 
 ENCRYPTION_CERTIFICATE = os.getenv("ENCRYPTION_CERTIFICATE")
 ENCRYPTION_CERTIFICATE_ID = os.getenv("ENCRYPTION_CERTIFICATE_ID")
+# Certificados adicionais para rotação: "id1:/caminho/chave1.pem,id2:/caminho/chave2.pem"
+ENCRYPTION_PRIVATE_KEY_FILES = os.getenv("ENCRYPTION_PRIVATE_KEY_FILES", "")
+ENCRYPTION_WORKERS = int(os.getenv("ENCRYPTION_WORKERS", "4"))
+ENCRYPTION_DATA_KEY_CACHE_SIZE = int(os.getenv("ENCRYPTION_DATA_KEY_CACHE_SIZE", "1024"))
 
 GRAPH_API_ENDPOINT = "https://graph.microsoft.com/v1.0"
+
+# Pool de conexões do cliente compartilhado do Graph
+GRAPH_HTTP_MAX_CONNECTIONS = int(os.getenv("GRAPH_HTTP_MAX_CONNECTIONS", "100"))
+GRAPH_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GRAPH_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GRAPH_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GRAPH_HTTP_KEEPALIVE_EXPIRY", "30"))
+GRAPH_HTTP_TIMEOUT = float(os.getenv("GRAPH_HTTP_TIMEOUT", "30"))
 GRAPH_API_SCOPE = [
     "https://graph.microsoft.com/.default", 
     "User.Read", 
@@ -39,5 +137,64 @@ GRAPH_API_SCOPE = [
 
 SUBSCRIPTION_EXPIRATION_DAYS = 3
 
+# Registro local (SQLite) das subscriptions
+SUBSCRIPTION_REGISTRY_PATH = os.getenv("SUBSCRIPTION_REGISTRY_PATH", "subscriptions.db")
+# Descarta notificações de subscriptions que não estão no registro
+SUBSCRIPTION_REGISTRY_ENFORCE = env_bool("SUBSCRIPTION_REGISTRY_ENFORCE", False)
+
+# Provisionamento em massa de subscriptions
+SUBSCRIPTION_PROVISIONING_CONCURRENCY = int(os.getenv("SUBSCRIPTION_PROVISIONING_CONCURRENCY", "5"))
+# Limites de subscriptions ativas por caixa de correio e no total da aplicação
+SUBSCRIPTION_MAX_PER_MAILBOX = int(os.getenv("SUBSCRIPTION_MAX_PER_MAILBOX", "1000"))
+SUBSCRIPTION_MAX_TOTAL = int(os.getenv("SUBSCRIPTION_MAX_TOTAL", "10000"))
+
+# Renovação automática das subscriptions
+SUBSCRIPTION_RENEWAL_LEAD_MINUTES = float(os.getenv("SUBSCRIPTION_RENEWAL_LEAD_MINUTES", "360"))
+SUBSCRIPTION_RENEWAL_CHECK_INTERVAL = float(os.getenv("SUBSCRIPTION_RENEWAL_CHECK_INTERVAL", "300"))
+SUBSCRIPTION_RENEWAL_BATCH_SIZE = int(os.getenv("SUBSCRIPTION_RENEWAL_BATCH_SIZE", "10"))
+SUBSCRIPTION_RENEWAL_BATCH_INTERVAL = float(os.getenv("SUBSCRIPTION_RENEWAL_BATCH_INTERVAL", "2"))
+# Antecipação aleatória (em minutos) da expiração, para espalhar as renovações no tempo
+SUBSCRIPTION_RENEWAL_JITTER_MINUTES = float(os.getenv("SUBSCRIPTION_RENEWAL_JITTER_MINUTES", "60"))
+
+# Recuperação de mensagens perdidas via delta query (messages/delta) das caixas com subscription:
+# roda no startup, nos eventos "missed" e a cada DELTA_SYNC_INTERVAL_SECONDS
+DELTA_SYNC_ENABLED = env_bool("DELTA_SYNC_ENABLED", False)
+DELTA_SYNC_SQLITE_PATH = os.getenv("DELTA_SYNC_SQLITE_PATH", "delta_sync.db")
+DELTA_SYNC_FOLDER = os.getenv("DELTA_SYNC_FOLDER", "inbox")
+DELTA_SYNC_INTERVAL_SECONDS = float(os.getenv("DELTA_SYNC_INTERVAL_SECONDS", "900"))
+DELTA_SYNC_CONCURRENCY = int(os.getenv("DELTA_SYNC_CONCURRENCY", "4"))
+DELTA_SYNC_PAGE_SIZE = int(os.getenv("DELTA_SYNC_PAGE_SIZE", "200"))
+# Janela buscada quando a caixa ainda não tem delta token (0 = apenas a partir de agora)
+DELTA_SYNC_INITIAL_LOOKBACK_MINUTES = float(os.getenv("DELTA_SYNC_INITIAL_LOOKBACK_MINUTES", "0"))
+# Folga sobre a última sincronização ao filtrar por receivedDateTime (atrasos de entrega, relógio)
+DELTA_SYNC_GRACE_SECONDS = float(os.getenv("DELTA_SYNC_GRACE_SECONDS", "300"))
+
+# Cache de usuários do diretório (email/UPN -> id e nome)
+DIRECTORY_CACHE_TTL_SECONDS = float(os.getenv("DIRECTORY_CACHE_TTL_SECONDS", "3600"))
+# Tempo que um usuário inexistente fica em cache
+DIRECTORY_NEGATIVE_TTL_SECONDS = float(os.getenv("DIRECTORY_NEGATIVE_TTL_SECONDS", "300"))
+DIRECTORY_CACHE_MAX_ENTRIES = int(os.getenv("DIRECTORY_CACHE_MAX_ENTRIES", "20000"))
+
+# Cache da resolução usuário -> grupo squad do Planner
+PLANNER_GROUP_NAME_FILTER = os.getenv("PLANNER_GROUP_NAME_FILTER", "squad")
+PLANNER_GROUP_CACHE_TTL_SECONDS = float(os.getenv("PLANNER_GROUP_CACHE_TTL_SECONDS", "3600"))
+PLANNER_GROUP_CACHE_MAX_ENTRIES = int(os.getenv("PLANNER_GROUP_CACHE_MAX_ENTRIES", "5000"))
+
+# Plano e bucket onde as tarefas são criadas (por nome; se não encontrado, usa o primeiro)
+PLANNER_PLAN_NAME = os.getenv("PLANNER_PLAN_NAME", "Backlog")
+PLANNER_BUCKET_NAME = os.getenv("PLANNER_BUCKET_NAME", "")
+PLANNER_PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLANNER_PLAN_CACHE_TTL_SECONDS", "3600"))
+# Mapeamento dos labels das tarefas para as categorias (category1..category25) dos planos
+PLANNER_LABEL_CACHE_TTL_SECONDS = float(os.getenv("PLANNER_LABEL_CACHE_TTL_SECONDS", "3600"))
+# Cria no plano os labels que ainda não existem, usando as categorias livres
+PLANNER_CREATE_MISSING_LABELS = env_bool("PLANNER_CREATE_MISSING_LABELS", False)
+# Envia os detalhes (descrição) junto com a criação da tarefa, evitando o GET do ETag e o PATCH
+PLANNER_INLINE_TASK_DETAILS = env_bool("PLANNER_INLINE_TASK_DETAILS", True)
+# Tentativas do PATCH dos detalhes quando o ETag fica desatualizado (412)
+PLANNER_ETAG_MAX_RETRIES = int(os.getenv("PLANNER_ETAG_MAX_RETRIES", "3"))
+# Criação de tarefas em massa
+PLANNER_BULK_CONCURRENCY = int(os.getenv("PLANNER_BULK_CONCURRENCY", "5"))
+PLANNER_BULK_MAX_TASKS = int(os.getenv("PLANNER_BULK_MAX_TASKS", "200"))
+
 PRIVATE_KEY = bytes(os.getenv("PRIVATE_KEY"), 'utf-8') if os.getenv("PRIVATE_KEY") else None
 CLIENT_SECRET_STATE = os.getenv("CLIENT_SECRET_STATE")
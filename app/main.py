@@ -1,4 +1,7 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from functools import partial
 from fastapi import FastAPI
 import sys
 import os
@@ -9,21 +12,79 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from api.subscription import router as webhook_router
 from api.notification import router as notification_router
 from api.planner import router as planner_router
-from config import EXTERNAL_API_URL, WEBHOOK_NOTIFICATION_ENDPOINT 
+from api.lifecycle import router as lifecycle_router
+from config import DELTA_SYNC_ENABLED, EXTERNAL_API_URL, WEBHOOK_NOTIFICATION_ENDPOINT
+from services.attachment_service import get_attachment_service
+from services.client import close_graph_clients, get_or_create_graph_client
+from services.dedup_cache import close_dedup_cache, get_dedup_cache
+from services.delta_sync import start_delta_sync, stop_delta_sync
+from services.email_service import EmailService
+from services.external_service import ExternalService, close_external_http_client, get_external_http_client
+from services.message_batch_fetcher import close_message_batch_fetcher, get_message_batch_fetcher
+from services.notification_processor import process_notification
+from services.notification_queue import start_notification_queue, stop_notification_queue
+from services.subscription_registry import close_subscription_registry, get_subscription_registry
+from services.subscription_renewal import start_renewal_scheduler, stop_renewal_scheduler
+from services.subscription_service import SubscriptionService
+from utils.audit_log import get_audit_log_writer, stop_audit_log_writer
+from utils.decrypt_notification import close_notification_decryptor, get_notification_decryptor
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria os clientes compartilhados no startup e os fecha no shutdown."""
+
+    graph_client = get_or_create_graph_client()
+    http_client = get_external_http_client()
+    get_audit_log_writer()
+
+    notification_queue = start_notification_queue(
+        partial(
+            process_notification,
+            graph_api=EmailService(graph_client, get_message_batch_fetcher()),
+            external_service=ExternalService(http_client),
+            dedup_cache=get_dedup_cache(),
+            decryptor=get_notification_decryptor(),
+            attachment_service=get_attachment_service()
+        )
+    )
+
+    scheduler = start_renewal_scheduler(SubscriptionService(graph_client, get_subscription_registry()))
+
+    if DELTA_SYNC_ENABLED:
+        # Recupera o que chegou com o serviço fora do ar e reage aos eventos "missed"
+        delta_sync = start_delta_sync(graph_client, get_subscription_registry(), notification_queue.put)
+        scheduler.on_missed(delta_sync.handle_missed)
+
+    yield
+
+    await stop_delta_sync()
+    await stop_renewal_scheduler()
+    await stop_notification_queue()
+    await close_message_batch_fetcher()
+    close_dedup_cache()
+    close_notification_decryptor()
+    close_subscription_registry()
+    await asyncio.to_thread(stop_audit_log_writer)
+    await close_external_http_client()
+    await close_graph_clients()
+
+
 app = FastAPI(
     title="Microsoft Graph Webhook API",
     description="API para receber notificações de novos e-mails via Microsoft Graph API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(webhook_router, prefix="/webhook")
 app.include_router(notification_router, prefix="/webhook")
+app.include_router(lifecycle_router, prefix="/webhook")
 app.include_router(planner_router, prefix="/api")
 
 
@@ -1,40 +1,41 @@
-from fastapi import Request, HTTPException
+import hmac
 import logging
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
 
-from fastapi.responses import PlainTextResponse
 from config import CLIENT_SECRET_STATE
 from models.webhook import NotificationPayload
 
 logger = logging.getLogger(__name__)
 
-async def validate_graph_request(request: Request):
+_EXPECTED_CLIENT_STATE = (CLIENT_SECRET_STATE or "").encode()
+
+
+def client_state_matches(client_state: Optional[str]) -> bool:
     """
-    Dependencia que valida webhook do Microsoft Graph
+    Compara o clientState recebido com o configurado em tempo constante.
     """
-    # 1. Validação da subscription (usada quando esta criando a subscription apenas)
-    validation_token = request.query_params.get("validationToken")
+    return hmac.compare_digest((client_state or "").encode(), _EXPECTED_CLIENT_STATE)
 
-    if validation_token:
-        return PlainTextResponse(content=validation_token, status_code=200)
-    
-    # 2. Validação do payload para notificações reais
+
+def parse_notification_body(body: bytes) -> NotificationPayload:
+    """
+    Valida o corpo bruto de uma notificação do Microsoft Graph.
+
+    O JSON é decodificado uma única vez direto para o modelo, e o clientState de
+    cada item precisa ser o mesmo passado no momento da criação da subscription.
+    """
     try:
-        payload = await request.json()
-
-        logger.info("Recebida notificação do webhook")
-        
-        notification = NotificationPayload(**payload)
-        
-        # Valida clientState, o mesmo passado no momento da criaçao da subscription
-        for item in notification.value:
-            if item.clientState != CLIENT_SECRET_STATE:
-                raise HTTPException(status_code=400, detail="ClientState inválido")
-            
-        
-        return {
-            "payload": payload
-        }
-        
-    except Exception as e:
+        notification = NotificationPayload.model_validate_json(body)
+    except ValidationError as e:
         logger.error(f"Erro ao validar webhook: {e}")
         raise HTTPException(status_code=400, detail="Payload inválido")
+
+    for item in notification.value:
+        if not client_state_matches(item.clientState):
+            logger.error(f"ClientState inválido na notificação da subscription {item.subscriptionId}")
+            raise HTTPException(status_code=400, detail="ClientState inválido")
+
+    return notification
@@ -1,28 +1,42 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 
-@dataclass
+import orjson
+
+@dataclass(slots=True)
 class EmailAddress:
     name: str
     address: str
 
-@dataclass
+@dataclass(slots=True)
 class EmailBody:
     content: str
     content_type: str  # "html" ou "text"
 
-@dataclass
+@dataclass(slots=True)
 class Email:
+    """
+    E-mail normalizado. Os campos referenciam as strings recebidas do Graph
+    (sem cópias do corpo) e to_json serializa direto para bytes com orjson.
+    """
     id: str
-    subject: str
-    from_: EmailAddress
+    subject: Optional[str] = None
+    from_: Optional[EmailAddress] = None
     to_recipients: List[EmailAddress] = field(default_factory=list)
-    body: EmailBody = None
+    cc_recipients: List[EmailAddress] = field(default_factory=list)
+    bcc_recipients: List[EmailAddress] = field(default_factory=list)
+    body: Optional[EmailBody] = None  # None quando o perfil de $select não inclui o corpo
     received_date_time: datetime = None
     sent_date_time: datetime = None
     is_read: bool = False
     has_attachments: bool = False
+    conversation_id: Optional[str] = None
+    importance: Optional[str] = None  # "low", "normal" ou "high"
+    internet_message_id: Optional[str] = None
+    attachments: List[Any] = field(default_factory=list)  # Resultados da etapa de anexos (AttachmentResult)
+    original_body: Optional[EmailBody] = None  # Corpo antes da compactação (BODY_COMPACTION_KEEP_ORIGINAL)
+    body_truncated: bool = False
 
     def to_dict(self):
         return {
@@ -31,49 +45,156 @@ class Email:
             "from": {
                 "name": self.from_.name,
                 "address": self.from_.address
-            },
-            "to": [{
-                "name": recipient.name,
-                "address": recipient.address
-            } for recipient in self.to_recipients],
+            } if self.from_ else None,
+            "to": _addresses_to_list(self.to_recipients),
+            "cc": _addresses_to_list(self.cc_recipients),
+            "bcc": _addresses_to_list(self.bcc_recipients),
             "body": {
                 "content": self.body.content,
                 "content_type": self.body.content_type
-            },
+            } if self.body else None,
             "received_date_time": self.received_date_time.isoformat() if self.received_date_time else None,
             "sent_date_time": self.sent_date_time.isoformat() if self.sent_date_time else None,
             "is_read": self.is_read,
-            "has_attachments": self.has_attachments
+            "has_attachments": self.has_attachments,
+            "conversation_id": self.conversation_id,
+            "importance": self.importance,
+            "internet_message_id": self.internet_message_id,
+            "attachments": [attachment.to_dict() for attachment in self.attachments],
+            "original_body": {
+                "content": self.original_body.content,
+                "content_type": self.original_body.content_type
+            } if self.original_body else None,
+            "body_truncated": self.body_truncated
         }
 
+    def to_json(self) -> bytes:
+        """Serializa o e-mail (no formato de to_dict) direto para bytes UTF-8"""
+        return orjson.dumps(self, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+
     @classmethod
     def from_graph_data(cls, email_data):
         """Cria um objeto Email a partir dos dados retornados pelo Microsoft Graph API"""
-        from_address = EmailAddress(
-            name=email_data.from_.email_address.name,
-            address=email_data.from_.email_address.address
-        )
+        from_address = None
+        if email_data.from_ and email_data.from_.email_address:
+            from_address = EmailAddress(
+                name=email_data.from_.email_address.name,
+                address=email_data.from_.email_address.address
+            )
 
-        to_recipients = [
-            EmailAddress(
-                name=recipient.email_address.name,
-                address=recipient.email_address.address
-            ) for recipient in email_data.to_recipients
-        ]
-
-        body = EmailBody(
-            content=email_data.body.content,
-            content_type=email_data.body.content_type.value
-        )
+        body = None
+        if email_data.body:
+            body = EmailBody(
+                content=email_data.body.content,
+                content_type=email_data.body.content_type.value if email_data.body.content_type else None
+            )
 
         return cls(
             id=email_data.id,
             subject=email_data.subject,
             from_=from_address,
-            to_recipients=to_recipients,
+            to_recipients=_recipients_from_graph_data(email_data.to_recipients),
+            cc_recipients=_recipients_from_graph_data(email_data.cc_recipients),
+            bcc_recipients=_recipients_from_graph_data(email_data.bcc_recipients),
             body=body,
             received_date_time=email_data.received_date_time,
             sent_date_time=email_data.sent_date_time,
-            is_read=email_data.is_read,
-            has_attachments=email_data.has_attachments
-        )
\ No newline at end of file
+            is_read=bool(email_data.is_read),
+            has_attachments=bool(email_data.has_attachments),
+            conversation_id=email_data.conversation_id,
+            importance=email_data.importance.value if email_data.importance else None,
+            internet_message_id=email_data.internet_message_id
+        )
+
+    @classmethod
+    def from_graph_json(cls, email_data: dict):
+        """Cria um objeto Email a partir do JSON bruto de uma mensagem do Microsoft Graph API ($batch, delta)"""
+        from_address = (email_data.get("from") or {}).get("emailAddress")
+        body = email_data.get("body")
+
+        return cls(
+            id=email_data.get("id"),
+            subject=email_data.get("subject"),
+            from_=EmailAddress(
+                name=from_address.get("name"),
+                address=from_address.get("address")
+            ) if from_address else None,
+            to_recipients=_recipients_from_graph_json(email_data.get("toRecipients")),
+            cc_recipients=_recipients_from_graph_json(email_data.get("ccRecipients")),
+            bcc_recipients=_recipients_from_graph_json(email_data.get("bccRecipients")),
+            body=EmailBody(
+                content=body.get("content"),
+                content_type=body.get("contentType")
+            ) if body else None,
+            received_date_time=_parse_datetime(email_data.get("receivedDateTime")),
+            sent_date_time=_parse_datetime(email_data.get("sentDateTime")),
+            is_read=bool(email_data.get("isRead")),
+            has_attachments=bool(email_data.get("hasAttachments")),
+            conversation_id=email_data.get("conversationId"),
+            importance=email_data.get("importance"),
+            internet_message_id=email_data.get("internetMessageId")
+        )
+
+
+def _json_default(value: Any):
+    """
+    Serializador do orjson para to_json: renomeia os campos do Email (from_ -> from,
+    to_recipients -> to...) sem montar o dicionário completo de to_dict. As datas
+    ficam com o orjson; endereços e corpo viram dicionários rasos, mais rápidos que
+    a serialização nativa de dataclasses com slots.
+    """
+    if isinstance(value, EmailAddress):
+        return {"name": value.name, "address": value.address}
+    if isinstance(value, EmailBody):
+        return {"content": value.content, "content_type": value.content_type}
+    if isinstance(value, Email):
+        return {
+            "id": value.id,
+            "subject": value.subject,
+            "from": value.from_,
+            "to": value.to_recipients,
+            "cc": value.cc_recipients,
+            "bcc": value.bcc_recipients,
+            "body": value.body,
+            "received_date_time": value.received_date_time,
+            "sent_date_time": value.sent_date_time,
+            "is_read": value.is_read,
+            "has_attachments": value.has_attachments,
+            "conversation_id": value.conversation_id,
+            "importance": value.importance,
+            "internet_message_id": value.internet_message_id,
+            "attachments": value.attachments,
+            "original_body": value.original_body,
+            "body_truncated": value.body_truncated
+        }
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Tipo {type(value).__name__} não serializável")
+
+
+def _addresses_to_list(addresses: List[EmailAddress]) -> List[dict]:
+    return [{"name": address.name, "address": address.address} for address in addresses]
+
+
+def _recipients_from_graph_data(recipients) -> List[EmailAddress]:
+    return [
+        EmailAddress(
+            name=recipient.email_address.name,
+            address=recipient.email_address.address
+        ) for recipient in recipients or [] if recipient.email_address
+    ]
+
+
+def _recipients_from_graph_json(recipients: Optional[list]) -> List[EmailAddress]:
+    return [
+        EmailAddress(
+            name=recipient.get("emailAddress", {}).get("name"),
+            address=recipient.get("emailAddress", {}).get("address")
+        ) for recipient in recipients or []
+    ]
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
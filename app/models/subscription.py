@@ -0,0 +1,17 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BulkSubscriptionRequest(BaseModel):
+    users: List[str] = []
+    group_id: Optional[str] = None
+    resource_template: str = "users/{user}/messages"
+    change_type: str = "created"
+
+
+class MailboxSubscriptionResult(BaseModel):
+    user: str
+    resource: str
+    status: str  # "created", "existing", "limit_reached" ou "failed"
+    subscription_id: Optional[str] = None
+    error: Optional[str] = None
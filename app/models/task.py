@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -8,4 +9,17 @@ class Task(BaseModel):
     contract: str
     responsible_email: str
     requester_email: str
-    labels: list[str]
\ No newline at end of file
+    labels: list[str]
+
+class BulkTaskRequest(BaseModel):
+    tasks: list[Task]
+
+
+class TaskCreationResult(BaseModel):
+    index: int
+    title: str
+    responsible_email: str
+    status: str  # "created" ou "failed"
+    task_id: Optional[str] = None
+    group_id: Optional[str] = None
+    error: Optional[str] = None
@@ -23,4 +23,15 @@ class NotificationItem(BaseModel):
     encryptedContent: Optional[EncryptedContent] = None
 
 class NotificationPayload(BaseModel):
-    value: List[NotificationItem] 
\ No newline at end of file
+    value: List[NotificationItem]
+
+class LifecycleNotificationItem(BaseModel):
+    subscriptionId: str
+    lifecycleEvent: str
+    clientState: Optional[str] = None
+    subscriptionExpirationDateTime: Optional[str] = None
+    tenantId: Optional[str] = None
+    resource: Optional[str] = None
+
+class LifecycleNotificationPayload(BaseModel):
+    value: List[LifecycleNotificationItem]
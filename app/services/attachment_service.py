@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+from config import (
+    ATTACHMENTS_ENABLED,
+    ATTACHMENTS_UPLOAD_URL,
+    ATTACHMENTS_SPOOL_DIR,
+    ATTACHMENTS_MAX_BYTES,
+    ATTACHMENTS_ALLOWED_TYPES,
+    ATTACHMENTS_BLOCKED_TYPES,
+    ATTACHMENTS_SKIP_INLINE,
+    ATTACHMENTS_CONCURRENCY,
+    ATTACHMENTS_CHUNK_SIZE,
+)
+from services.client import GraphClient, get_or_create_graph_client
+from services.external_service import get_external_http_client
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_SELECT = "id,name,size,contentType,isInline"
+
+_FILE_ATTACHMENT = "#microsoft.graph.fileAttachment"
+_UNSAFE_FILENAME = re.compile(r"[^\w.\-]+")
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class AttachmentResult:
+    id: str
+    name: Optional[str]
+    content_type: Optional[str]
+    size: Optional[int]
+    status: str  # "uploaded", "spooled", "too_large", "filtered", "unsupported" ou "failed"
+    location: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class AttachmentService:
+    """
+    Etapa de anexos do processamento de e-mails.
+
+    Lista os anexos da mensagem com $select (sem o conteúdo) e transfere o $value
+    de cada um em partes de ATTACHMENTS_CHUNK_SIZE: para a API externa como upload
+    chunked, ou para um arquivo em disco. Nenhum anexo é carregado inteiro em
+    memória, e o número de transferências simultâneas é limitado no processo todo.
+    """
+
+    def __init__(
+        self,
+        graph_client: GraphClient,
+        http_client: httpx.AsyncClient,
+        upload_url: str = ATTACHMENTS_UPLOAD_URL,
+        spool_dir: str = ATTACHMENTS_SPOOL_DIR,
+        max_bytes: int = ATTACHMENTS_MAX_BYTES,
+        concurrency: int = ATTACHMENTS_CONCURRENCY,
+        chunk_size: int = ATTACHMENTS_CHUNK_SIZE
+    ):
+        self.graph_client = graph_client
+        self.http_client = http_client
+        self.upload_url = upload_url
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+        self.allowed_types = _parse_types(ATTACHMENTS_ALLOWED_TYPES)
+        self.blocked_types = _parse_types(ATTACHMENTS_BLOCKED_TYPES)
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def process_message(self, user_id: str, message_id: str) -> List[AttachmentResult]:
+        """
+        Transfere os anexos da mensagem. Falhas ficam restritas a cada anexo; se a
+        listagem falhar o e-mail segue sem anexos.
+        """
+        base_url = f"/users/{quote(user_id)}/messages/{quote(message_id)}/attachments"
+
+        try:
+            response = await self.graph_client.request("GET", base_url, params={"$select": ATTACHMENT_SELECT})
+            response.raise_for_status()
+            attachments = response.json().get("value", [])
+        except Exception as e:
+            logger.error(f"Erro ao listar anexos da mensagem {message_id}: {e}")
+            return []
+
+        return list(await asyncio.gather(*(
+            self._process_attachment(base_url, message_id, attachment) for attachment in attachments
+        )))
+
+    async def _process_attachment(self, base_url: str, message_id: str, attachment: dict) -> AttachmentResult:
+        result = AttachmentResult(
+            id=attachment.get("id"),
+            name=attachment.get("name"),
+            content_type=attachment.get("contentType"),
+            size=attachment.get("size"),
+            status="failed"
+        )
+
+        if attachment.get("@odata.type") != _FILE_ATTACHMENT:
+            # Anexos de item (e-mail/evento) e de referência (OneDrive) não têm arquivo para transferir
+            result.status = "unsupported"
+            return result
+
+        if (ATTACHMENTS_SKIP_INLINE and attachment.get("isInline")) or not self._type_allowed(result.content_type):
+            result.status = "filtered"
+            return result
+
+        # O tamanho informado inclui metadados; o limite é verificado de novo durante a transferência
+        if (result.size or 0) > self.max_bytes:
+            result.status = "too_large"
+            return result
+
+        value_url = f"{base_url}/{quote(result.id)}/$value"
+
+        async with self._semaphore:
+            try:
+                async with self.graph_client.stream("GET", value_url) as response:
+                    response.raise_for_status()
+                    chunks = self._limited_chunks(response)
+
+                    if self.upload_url:
+                        result.location = await self._upload(chunks, message_id, result)
+                        result.status = "uploaded"
+                    else:
+                        result.location = await self._spool(chunks, message_id, result)
+                        result.status = "spooled"
+
+            except AttachmentTooLarge as e:
+                result.status = "too_large"
+                result.error = str(e)
+            except Exception as e:
+                result.error = str(e)
+                logger.error(f"Erro ao transferir anexo {result.name} da mensagem {message_id}: {e}")
+
+        return result
+
+    async def _limited_chunks(self, response: httpx.Response) -> AsyncIterator[bytes]:
+        transferred = 0
+        async for chunk in response.aiter_bytes(self.chunk_size):
+            transferred += len(chunk)
+            if transferred > self.max_bytes:
+                raise AttachmentTooLarge(f"Anexo excede {self.max_bytes} bytes")
+            yield chunk
+
+    async def _upload(self, chunks: AsyncIterator[bytes], message_id: str, result: AttachmentResult) -> str:
+        """
+        Envia o anexo para a API externa com Transfer-Encoding: chunked;
+        os metadados seguem nos headers.
+        """
+        response = await self.http_client.post(
+            self.upload_url,
+            content=chunks,
+            headers={
+                "Content-Type": result.content_type or "application/octet-stream",
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(result.name or result.id)}",
+                "X-Message-Id": message_id,
+                "X-Attachment-Id": result.id
+            }
+        )
+        response.raise_for_status()
+
+        return response.headers.get("Location") or self.upload_url
+
+    async def _spool(self, chunks: AsyncIterator[bytes], message_id: str, result: AttachmentResult) -> str:
+        directory = os.path.join(self.spool_dir, _safe_filename(message_id))
+        path = os.path.join(directory, f"{_safe_filename(result.id)[-32:]}_{_safe_filename(result.name or 'anexo')}")
+
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+        file = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(_remove_quietly, path)
+            raise
+
+        await asyncio.to_thread(file.close)
+        return path
+
+    def _type_allowed(self, content_type: Optional[str]) -> bool:
+        content_type = (content_type or "").lower()
+
+        if any(_type_matches(content_type, pattern) for pattern in self.blocked_types):
+            return False
+        if self.allowed_types:
+            return any(_type_matches(content_type, pattern) for pattern in self.allowed_types)
+        return True
+
+
+def _parse_types(value: str) -> List[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+def _type_matches(content_type: str, pattern: str) -> bool:
+    if pattern.endswith("/*") or pattern.endswith("/"):
+        return content_type.startswith(pattern.rstrip("*"))
+    return content_type == pattern
+
+
+def _safe_filename(name: str) -> str:
+    return _UNSAFE_FILENAME.sub("_", name).strip("._")[:100] or "anexo"
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_attachment_service: Optional[AttachmentService] = None
+
+
+def get_attachment_service() -> Optional[AttachmentService]:
+    """
+    Retorna a etapa de anexos compartilhada, ou None se ela estiver desabilitada.
+    """
+    global _attachment_service
+
+    if not ATTACHMENTS_ENABLED:
+        return None
+
+    if _attachment_service is None:
+        _attachment_service = AttachmentService(get_or_create_graph_client(), get_external_http_client())
+
+    return _attachment_service
@@ -1,12 +1,44 @@
 import logging
-from msgraph import GraphServiceClient
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Tuple
+
+import httpx
+from msgraph import GraphServiceClient, GraphRequestAdapter
+from msgraph_core import GraphClientFactory
 from azure.identity.aio import ClientSecretCredential
-from config import TENANT_ID, CLIENT_ID, CLIENT_SECRET
+from kiota_authentication_azure.azure_identity_authentication_provider import AzureIdentityAuthenticationProvider
+from config import (
+    GRAPH_API_ENDPOINT,
+    TENANT_ID,
+    CLIENT_ID,
+    CLIENT_SECRET,
+    GRAPH_HTTP_MAX_CONNECTIONS,
+    GRAPH_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    GRAPH_HTTP_KEEPALIVE_EXPIRY,
+    GRAPH_HTTP_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
+GRAPH_DEFAULT_SCOPES = ["https://graph.microsoft.com/.default"]
+
+
 class GraphClient:
-    def __init__(self):
+    """
+    Cliente do Microsoft Graph API compartilhado pelo processo.
+
+    A credencial (com cache de tokens) e o pool de conexões HTTP são criados
+    uma única vez e fechados no shutdown da aplicação.
+    """
+
+    def __init__(self, tenant_id: str = TENANT_ID, client_id: str = CLIENT_ID, client_secret: str = CLIENT_SECRET):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+
+        self.credentials: ClientSecretCredential
+        self.http_client: httpx.AsyncClient
+        self.raw_client: httpx.AsyncClient
         self.client: GraphServiceClient
         self.initialize_graph_client()
 
@@ -18,17 +50,117 @@ class GraphClient:
         try:
             logger.info("Criando credenciais usando Azure Identity...")
 
-            credentials = ClientSecretCredential(
-                tenant_id=TENANT_ID,
-                client_id=CLIENT_ID,
-                client_secret=CLIENT_SECRET
+            self.credentials = ClientSecretCredential(
+                tenant_id=self.tenant_id,
+                client_id=self.client_id,
+                client_secret=self.client_secret
             )
-            
+
+            limits = httpx.Limits(
+                max_connections=GRAPH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=GRAPH_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GRAPH_HTTP_KEEPALIVE_EXPIRY
+            )
+
+            # Pool de conexões reutilizado por todas as requisições do SDK
+            self.http_client = GraphClientFactory.create_with_default_middleware(
+                client=httpx.AsyncClient(limits=limits, timeout=GRAPH_HTTP_TIMEOUT)
+            )
+
+            # Pool para chamadas JSON diretas ($batch, delta, downloads), fora do pipeline do SDK
+            self.raw_client = httpx.AsyncClient(
+                base_url=GRAPH_API_ENDPOINT,
+                limits=limits,
+                timeout=GRAPH_HTTP_TIMEOUT
+            )
+
+            auth_provider = AzureIdentityAuthenticationProvider(self.credentials, scopes=GRAPH_DEFAULT_SCOPES)
+            request_adapter = GraphRequestAdapter(auth_provider, self.http_client)
+
             # Inicializa o cliente Graph
-            self.client = GraphServiceClient(credentials=credentials)
+            self.client = GraphServiceClient(request_adapter=request_adapter)
 
             logger.info("Cliente do Microsoft Graph API inicializado com sucesso.")
 
         except Exception as e:
             logger.error(f"Erro ao inicializar cliente do Microsoft Graph Client: {e}")
             raise
+
+    async def get_access_token(self) -> str:
+        """
+        Retorna um token de acesso válido (a credencial mantém o cache até expirar).
+        """
+        token = await self.credentials.get_token(*GRAPH_DEFAULT_SCOPES)
+        return token.token
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Executa uma requisição autenticada diretamente na API do Graph.
+
+        Args:
+            method: Método HTTP
+            url: Caminho relativo a GRAPH_API_ENDPOINT (ex: "/$batch") ou URL absoluta
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {await self.get_access_token()}"
+
+        return await self.raw_client.request(method, url, headers=headers, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Executa uma requisição autenticada cuja resposta é lida em partes (ex: $value de anexos).
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {await self.get_access_token()}"
+
+        async with self.raw_client.stream(method, url, headers=headers, **kwargs) as response:
+            yield response
+
+    async def close(self):
+        """
+        Fecha os pools de conexões e a credencial.
+        """
+        await self.raw_client.aclose()
+        await self.http_client.aclose()
+        await self.credentials.close()
+
+
+_graph_clients: Dict[Tuple[str, str], GraphClient] = {}
+
+
+def get_or_create_graph_client(
+    tenant_id: str = TENANT_ID,
+    client_id: str = CLIENT_ID,
+    client_secret: str = CLIENT_SECRET
+) -> GraphClient:
+    """
+    Retorna o GraphClient do tenant/credencial, criando-o na primeira chamada.
+    """
+    key = (tenant_id, client_id)
+    graph_client = _graph_clients.get(key)
+
+    if graph_client is None:
+        graph_client = GraphClient(tenant_id, client_id, client_secret)
+        _graph_clients[key] = graph_client
+
+    return graph_client
+
+
+def get_graph_client() -> GraphClient:
+    """
+    Dependência do FastAPI que entrega o GraphClient compartilhado.
+    """
+    return get_or_create_graph_client()
+
+
+async def close_graph_clients():
+    """
+    Fecha todos os GraphClients abertos (usado no shutdown da aplicação).
+    """
+    while _graph_clients:
+        _, graph_client = _graph_clients.popitem()
+        try:
+            await graph_client.close()
+        except Exception as e:
+            logger.error(f"Erro ao fechar cliente do Microsoft Graph: {e}")
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import DEDUP_ENABLED, DEDUP_TTL_SECONDS, DEDUP_LEASE_SECONDS, DEDUP_MAX_ENTRIES, DEDUP_SQLITE_PATH
+from models.webhook import NotificationItem
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteDedupBackend:
+    """
+    Persistência das chaves já processadas em SQLite, para sobreviver a reinícios.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def claim(self, key: str, expires_at: float, now: float) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM dedup WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO dedup (key, expires_at) VALUES (?, ?)", (key, expires_at)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def confirm(self, key: str, expires_at: float):
+        with self._lock:
+            self._conn.execute("UPDATE dedup SET expires_at = ? WHERE key = ?", (expires_at, key))
+            self._conn.commit()
+
+    def release(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM dedup WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge(self, now: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM dedup WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DedupCache:
+    """
+    Cache LRU com TTL das notificações já recebidas.
+
+    A chave combina subscriptionId + resourceData.id + changeType; uma notificação
+    repetida dentro do TTL é descartada antes de qualquer chamada ao Graph.
+
+    claim reserva a chave só pelo lease (processamento em andamento); confirm estende
+    a reserva para o TTL após a entrega. Se o processo cair no meio do caminho, a
+    chave volta a ser aceita quando o lease vence, em vez de bloquear as reentregas.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEDUP_TTL_SECONDS,
+        max_entries: int = DEDUP_MAX_ENTRIES,
+        backend: Optional[SqliteDedupBackend] = None,
+        lease: float = DEDUP_LEASE_SECONDS
+    ):
+        self.ttl = ttl
+        self.lease = min(lease, ttl)
+        self.max_entries = max_entries
+        self.backend = backend
+
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._claims_since_purge = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    async def claim(self, key: str) -> bool:
+        """
+        Reserva a chave pelo lease. Retorna False se ela já foi vista ou está em
+        processamento (duplicata).
+        """
+        now = time.time()
+        expires_at = self._entries.get(key)
+
+        if expires_at is not None and expires_at > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return False
+
+        self._remember(key, now + self.lease)
+
+        if self.backend and not await asyncio.to_thread(self.backend.claim, key, now + self.lease, now):
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._maybe_purge(now)
+        return True
+
+    async def confirm(self, key: str):
+        """
+        Mantém a chave pelo TTL completo (usado quando o item foi entregue).
+        """
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at)
+        if self.backend:
+            await asyncio.to_thread(self.backend.confirm, key, expires_at)
+
+    async def release(self, key: str):
+        """
+        Remove a chave para que uma nova entrega da mesma notificação seja processada
+        (usado quando o processamento falha).
+        """
+        self._entries.pop(key, None)
+        if self.backend:
+            await asyncio.to_thread(self.backend.release, key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "persistent": self.backend is not None
+        }
+
+    def close(self):
+        if self.backend:
+            self.backend.close()
+
+    def _remember(self, key: str, expires_at: float):
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _maybe_purge(self, now: float):
+        self._claims_since_purge += 1
+        if self._claims_since_purge < 1000:
+            return
+
+        self._claims_since_purge = 0
+        for key in [key for key, expires_at in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if self.backend:
+            asyncio.get_running_loop().run_in_executor(None, self.backend.purge, now)
+
+
+def notification_dedup_key(item: NotificationItem) -> str:
+    """
+    Monta a chave de deduplicação de um item de notificação.
+    """
+    resource_id = (item.resourceData.id if item.resourceData else None) or item.resource
+    return f"{item.subscriptionId}:{resource_id}:{item.changeType}"
+
+
+_dedup_cache: Optional[DedupCache] = None
+
+
+def get_dedup_cache() -> Optional[DedupCache]:
+    """
+    Retorna o cache compartilhado, ou None quando DEDUP_ENABLED está desligado.
+    """
+    global _dedup_cache
+
+    if DEDUP_ENABLED and _dedup_cache is None:
+        backend = SqliteDedupBackend(DEDUP_SQLITE_PATH) if DEDUP_SQLITE_PATH else None
+        _dedup_cache = DedupCache(backend=backend)
+
+    return _dedup_cache
+
+
+def close_dedup_cache():
+    """
+    Fecha o backend persistente (usado no shutdown da aplicação).
+    """
+    global _dedup_cache
+
+    if _dedup_cache is not None:
+        _dedup_cache.close()
+        _dedup_cache = None
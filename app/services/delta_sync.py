@@ -0,0 +1,390 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from config import (
+    CLIENT_SECRET_STATE,
+    DELTA_SYNC_SQLITE_PATH,
+    DELTA_SYNC_FOLDER,
+    DELTA_SYNC_INTERVAL_SECONDS,
+    DELTA_SYNC_CONCURRENCY,
+    DELTA_SYNC_PAGE_SIZE,
+    DELTA_SYNC_INITIAL_LOOKBACK_MINUTES,
+    DELTA_SYNC_GRACE_SECONDS,
+)
+from models.webhook import NotificationItem, NotificationPayload, ResourceData
+from services.client import GraphClient
+from services.message_batch_fetcher import GRAPH_BATCH_LIMIT
+from services.subscription_registry import SubscriptionRegistry, mailbox_from_resource
+
+logger = logging.getLogger(__name__)
+
+# A delta só precisa identificar as mensagens; o conteúdo é buscado pelo pipeline (via $batch)
+DELTA_SELECT = "id,receivedDateTime"
+
+
+class DeltaTokenExpired(Exception):
+    """
+    O Graph não reconhece mais o delta token (410 Gone); a caixa precisa de uma nova sincronização inicial.
+    """
+
+
+class DeltaTokenStore:
+    """
+    Persistência (SQLite) do deltaLink e do horário da última sincronização de cada caixa.
+    """
+
+    def __init__(self, path: str = DELTA_SYNC_SQLITE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS delta_tokens (mailbox TEXT PRIMARY KEY, delta_link TEXT, synced_at TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, mailbox: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM delta_tokens WHERE mailbox = ?", (mailbox.lower(),)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def save(self, mailbox: str, delta_link: Optional[str], synced_at: datetime):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO delta_tokens (mailbox, delta_link, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(mailbox) DO UPDATE SET delta_link = excluded.delta_link, synced_at = excluded.synced_at",
+                (mailbox.lower(), delta_link, _to_iso(synced_at))
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class MailboxSyncResult:
+    mailbox: str
+    subscription_id: Optional[str]
+    status: str = "failed"  # "synced", "reset" (token expirado, refeito) ou "failed"
+    pages: int = 0
+    changes: int = 0
+    enqueued: int = 0
+    error: Optional[str] = None
+
+
+class DeltaSyncService:
+    """
+    Recupera mensagens que chegaram sem notificação (serviço fora do ar, subscription
+    expirada, evento "missed") usando a delta query da pasta monitorada de cada caixa.
+
+    As páginas trazem apenas id e receivedDateTime; as mensagens novas desde a última
+    sincronização viram itens de notificação com o mesmo subscriptionId e id das
+    notificações reais, então passam pelo pipeline normal e pela deduplicação.
+    """
+
+    def __init__(
+        self,
+        graph_client: GraphClient,
+        registry: SubscriptionRegistry,
+        token_store: DeltaTokenStore,
+        enqueue: Callable[[NotificationPayload], Awaitable[None]],
+        folder: str = DELTA_SYNC_FOLDER,
+        interval: float = DELTA_SYNC_INTERVAL_SECONDS,
+        concurrency: int = DELTA_SYNC_CONCURRENCY,
+        page_size: int = DELTA_SYNC_PAGE_SIZE,
+        initial_lookback: timedelta = timedelta(minutes=DELTA_SYNC_INITIAL_LOOKBACK_MINUTES),
+        grace: timedelta = timedelta(seconds=DELTA_SYNC_GRACE_SECONDS)
+    ):
+        self.graph_client = graph_client
+        self.registry = registry
+        self.token_store = token_store
+        self.enqueue = enqueue
+        self.folder = folder
+        self.interval = interval
+        self.page_size = page_size
+        self.initial_lookback = initial_lookback
+        self.grace = grace
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.mailboxes_synced = 0
+        self.failures = 0
+        self.resets = 0
+        self.enqueued = 0
+        self.last_run_at: Optional[datetime] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="delta-sync")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "mailboxes_synced": self.mailboxes_synced,
+            "failures": self.failures,
+            "resets": self.resets,
+            "enqueued": self.enqueued,
+            "last_run_at": _to_iso(self.last_run_at) if self.last_run_at else None,
+            "interval_seconds": self.interval,
+            "folder": self.folder
+        }
+
+    async def sync_all(self) -> List[MailboxSyncResult]:
+        """
+        Sincroniza todas as caixas com subscription de mensagens no registro,
+        com no máximo DELTA_SYNC_CONCURRENCY caixas ao mesmo tempo.
+        """
+        mailboxes = await self.mailbox_subscriptions()
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc)
+
+        results = list(await asyncio.gather(*(
+            self.sync_mailbox(mailbox, subscription_id) for mailbox, subscription_id in mailboxes.items()
+        )))
+
+        enqueued = sum(result.enqueued for result in results)
+        failed = sum(1 for result in results if result.status == "failed")
+        logger.info(f"Sincronização delta de {len(results)} caixas: {enqueued} mensagens recuperadas, {failed} falhas")
+        return results
+
+    async def sync_mailbox(self, mailbox: str, subscription_id: Optional[str] = None) -> MailboxSyncResult:
+        """
+        Percorre a delta da caixa a partir do último deltaLink e enfileira as mensagens
+        recebidas desde a última sincronização. Falhas ficam restritas à caixa; o
+        deltaLink só é salvo ao fim da sincronização.
+        """
+        if subscription_id is None:
+            subscription_id = (await self.mailbox_subscriptions()).get(mailbox.lower())
+
+        result = MailboxSyncResult(mailbox=mailbox, subscription_id=subscription_id)
+        if subscription_id is None:
+            result.error = "Caixa sem subscription de mensagens no registro"
+            logger.warning(f"Sincronização delta ignorada para {mailbox}: sem subscription no registro")
+            return result
+
+        # Eventos "missed" e o ciclo periódico podem pedir a mesma caixa; as execuções são serializadas
+        async with self._mailbox_lock(mailbox), self._semaphore:
+            started = datetime.now(timezone.utc)
+
+            try:
+                state = await asyncio.to_thread(self.token_store.get, mailbox)
+                since = _parse_datetime(state["synced_at"]) - self.grace if state else started - self.initial_lookback
+
+                try:
+                    delta_link = await self._walk(mailbox, state["delta_link"] if state else None, since, result)
+                    result.status = "synced"
+                except DeltaTokenExpired:
+                    logger.warning(f"Delta token da caixa {mailbox} expirou; refazendo a partir de {_to_iso(since)}")
+                    self.resets += 1
+                    result.status = "reset"
+                    delta_link = await self._walk(mailbox, None, since, result)
+
+                await asyncio.to_thread(self.token_store.save, mailbox, delta_link, started)
+                self.mailboxes_synced += 1
+
+            except Exception as e:
+                self.failures += 1
+                result.status = "failed"
+                result.error = str(e)
+                logger.error(f"Erro na sincronização delta da caixa {mailbox}: {e}")
+
+        if result.enqueued:
+            logger.info(f"{result.enqueued} mensagens da caixa {mailbox} recuperadas pela sincronização delta")
+        return result
+
+    @asynccontextmanager
+    async def _mailbox_lock(self, mailbox: str):
+        """
+        Lock da caixa; a entrada sai de _locks quando ninguém mais usa ou aguarda o lock.
+        """
+        key = mailbox.lower()
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def handle_missed(self, item: dict):
+        """
+        Handler do evento de ciclo de vida "missed": sincroniza a caixa da subscription.
+        """
+        subscription_id = item.get("subscriptionId")
+        record = await self.registry.get(subscription_id) if subscription_id else None
+        mailbox = (record or {}).get("mailbox") or mailbox_from_resource(item.get("resource"))
+
+        if not mailbox:
+            logger.warning(f"Evento missed sem caixa identificável (subscription {subscription_id})")
+            return
+
+        await self.sync_mailbox(mailbox, subscription_id)
+
+    async def mailbox_subscriptions(self) -> Dict[str, str]:
+        """
+        Retorna caixa (em minúsculas) -> id da subscription de mensagens criadas,
+        preferindo a que expira por último.
+        """
+        subscriptions: Dict[str, dict] = {}
+
+        for record in await self.registry.all():
+            mailbox = record.get("mailbox")
+            if not mailbox or "messages" not in (record.get("resource") or "").lower():
+                continue
+            if "created" not in (record.get("change_type") or ""):
+                continue
+
+            current = subscriptions.get(mailbox.lower())
+            if current is None or (record.get("expiration") or "") > (current.get("expiration") or ""):
+                subscriptions[mailbox.lower()] = record
+
+        return {mailbox: record["id"] for mailbox, record in subscriptions.items()}
+
+    async def _walk(
+        self,
+        mailbox: str,
+        delta_link: Optional[str],
+        since: datetime,
+        result: MailboxSyncResult
+    ) -> Optional[str]:
+        """
+        Percorre as páginas da delta e retorna o novo deltaLink.
+        """
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            # Sem token, a delta começa em "since" em vez de varrer a pasta inteira
+            url = f"/users/{quote(mailbox)}/mailFolders/{quote(self.folder)}/messages/delta"
+            params = {"$select": DELTA_SELECT, "$filter": f"receivedDateTime ge {_to_iso(since)}"}
+
+        headers = {"Prefer": f"odata.maxpagesize={self.page_size}"}
+        pending: List[NotificationItem] = []
+
+        while url:
+            response = await self.graph_client.request("GET", url, params=params, headers=headers)
+            if response.status_code == 410:
+                raise DeltaTokenExpired()
+            response.raise_for_status()
+
+            data = response.json()
+            result.pages += 1
+
+            for message in data.get("value", []):
+                result.changes += 1
+                if not self._is_new(message, since):
+                    continue
+
+                pending.append(self._notification_item(mailbox, result.subscription_id, message["id"]))
+                if len(pending) >= GRAPH_BATCH_LIMIT:
+                    await self._enqueue(pending, result)
+                    pending = []
+
+            url, params = data.get("@odata.nextLink"), None
+            delta_link = data.get("@odata.deltaLink") or delta_link
+
+        if pending:
+            await self._enqueue(pending, result)
+
+        return delta_link
+
+    async def _enqueue(self, items: List[NotificationItem], result: MailboxSyncResult):
+        # Lotes do tamanho do $batch, para o pipeline buscar as mensagens em uma só chamada
+        await self.enqueue(NotificationPayload(value=items))
+        result.enqueued += len(items)
+        self.enqueued += len(items)
+
+    @staticmethod
+    def _is_new(message: dict, since: datetime) -> bool:
+        # Itens removidos e alterações de mensagens antigas (lida, movida) não são reprocessados
+        if "@removed" in message or not message.get("id"):
+            return False
+
+        received = message.get("receivedDateTime")
+        return received is None or _parse_datetime(received) >= since
+
+    @staticmethod
+    def _notification_item(mailbox: str, subscription_id: str, message_id: str) -> NotificationItem:
+        return NotificationItem(
+            subscriptionId=subscription_id,
+            changeType="created",
+            clientState=CLIENT_SECRET_STATE or "",
+            resource=f"Users/{mailbox}/Messages/{message_id}",
+            resourceData=ResourceData(id=message_id)
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_all()
+            except Exception as e:
+                logger.error(f"Erro na sincronização delta: {e}")
+            await asyncio.sleep(self.interval)
+
+
+def _parse_datetime(value: str) -> datetime:
+    value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _to_iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+_delta_sync: Optional[DeltaSyncService] = None
+
+
+def start_delta_sync(
+    graph_client: GraphClient,
+    registry: SubscriptionRegistry,
+    enqueue: Callable[[NotificationPayload], Awaitable[None]]
+) -> DeltaSyncService:
+    """
+    Cria o serviço e inicia o ciclo periódico, que começa com uma sincronização
+    de todas as caixas (usado no startup da aplicação).
+    """
+    global _delta_sync
+
+    _delta_sync = DeltaSyncService(graph_client, registry, DeltaTokenStore(), enqueue)
+    _delta_sync.start()
+    return _delta_sync
+
+
+def get_delta_sync() -> Optional[DeltaSyncService]:
+    return _delta_sync
+
+
+async def stop_delta_sync():
+    """
+    Encerra o ciclo periódico e fecha o SQLite (usado no shutdown da aplicação).
+    """
+    global _delta_sync
+
+    if _delta_sync is not None:
+        await _delta_sync.stop()
+        _delta_sync.token_store.close()
+        _delta_sync = None
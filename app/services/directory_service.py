@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from fastapi import Depends
+from kiota_abstractions.base_request_configuration import RequestConfiguration
+from msgraph.generated.users.item.user_item_request_builder import UserItemRequestBuilder
+
+from config import (
+    DIRECTORY_CACHE_TTL_SECONDS,
+    DIRECTORY_NEGATIVE_TTL_SECONDS,
+    DIRECTORY_CACHE_MAX_ENTRIES,
+)
+from services.client import GraphClient, get_graph_client
+from services.message_batch_fetcher import GRAPH_BATCH_LIMIT
+from utils.ttl_cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+USER_SELECT = ["id", "displayName", "mail", "userPrincipalName"]
+
+
+@dataclass(frozen=True)
+class DirectoryUser:
+    id: str
+    display_name: Optional[str] = None
+    mail: Optional[str] = None
+    user_principal_name: Optional[str] = None
+
+
+# Compartilhado por todos os serviços; usuários inexistentes ficam em cache como None
+_users_cache = AsyncTTLCache(
+    ttl=DIRECTORY_CACHE_TTL_SECONDS,
+    max_entries=DIRECTORY_CACHE_MAX_ENTRIES,
+    negative_ttl=DIRECTORY_NEGATIVE_TTL_SECONDS
+)
+
+
+class DirectoryService:
+    """
+    Resolve emails/UPNs em usuários do diretório com cache compartilhado.
+
+    Consultas simultâneas do mesmo usuário são agrupadas em uma única chamada,
+    e resolve_many busca os usuários que faltam no cache via $batch.
+    """
+
+    def __init__(self, graph_client: GraphClient = Depends(get_graph_client)):
+        self.graph_client = graph_client
+
+    async def resolve(self, email: str) -> Optional[DirectoryUser]:
+        """
+        Retorna o usuário do email/UPN informado, ou None se ele não existir.
+        """
+        key = _cache_key(email)
+        return await _users_cache.get_or_load(key, lambda: self._fetch_user(key))
+
+    async def get_user_id(self, email: str) -> str:
+        """
+        Retorna o id do usuário, falhando se ele não existir no diretório.
+        """
+        user = await self.resolve(email)
+        if user is None:
+            raise ValueError(f"Usuário {email} não encontrado no diretório")
+
+        return user.id
+
+    async def resolve_many(self, emails: Iterable[str]) -> Dict[str, Optional[DirectoryUser]]:
+        """
+        Resolve vários emails de uma vez; os que não estão em cache são buscados
+        em chamadas $batch de até 20 usuários.
+
+        Returns:
+            Dicionário email (em minúsculas) -> usuário ou None
+        """
+        keys = list(dict.fromkeys(_cache_key(email) for email in emails if email and email.strip()))
+        missing = [key for key in keys if key not in _users_cache]
+
+        batch = None
+        if missing:
+            batch = asyncio.ensure_future(self._fetch_many(missing))
+            # Evita aviso de exceção não lida caso todos os usuários já estivessem sendo buscados
+            batch.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        async def load_from_batch(key: str) -> Optional[DirectoryUser]:
+            return (await batch)[key]
+
+        users = await asyncio.gather(*(
+            _users_cache.get_or_load(
+                key,
+                (lambda key=key: load_from_batch(key)) if batch is not None and key in missing
+                else (lambda key=key: self._fetch_user(key))
+            )
+            for key in keys
+        ))
+
+        return dict(zip(keys, users))
+
+    async def _fetch_user(self, key: str) -> Optional[DirectoryUser]:
+        request_configuration = RequestConfiguration(
+            query_parameters=UserItemRequestBuilder.UserItemRequestBuilderGetQueryParameters(
+                select=USER_SELECT
+            )
+        )
+
+        try:
+            user = await self.graph_client.client.users.by_user_id(key).get(
+                request_configuration=request_configuration
+            )
+        except Exception as e:
+            if getattr(e, "response_status_code", None) == 404:
+                logger.warning(f"Usuário {key} não encontrado no diretório")
+                return None
+            logger.error(f"Erro ao buscar usuário {key}: {e}")
+            raise
+
+        return DirectoryUser(
+            id=user.id,
+            display_name=user.display_name,
+            mail=user.mail,
+            user_principal_name=user.user_principal_name
+        )
+
+    async def _fetch_many(self, keys: List[str]) -> Dict[str, Optional[DirectoryUser]]:
+        chunks = [keys[i:i + GRAPH_BATCH_LIMIT] for i in range(0, len(keys), GRAPH_BATCH_LIMIT)]
+        results: Dict[str, Optional[DirectoryUser]] = {}
+
+        for chunk_results in await asyncio.gather(*(self._fetch_chunk(chunk) for chunk in chunks)):
+            results.update(chunk_results)
+
+        return results
+
+    async def _fetch_chunk(self, keys: List[str]) -> Dict[str, Optional[DirectoryUser]]:
+        select = ",".join(USER_SELECT)
+        body = {
+            "requests": [
+                {"id": str(index), "method": "GET", "url": f"/users/{quote(key, safe='@')}?$select={select}"}
+                for index, key in enumerate(keys)
+            ]
+        }
+
+        response = await self.graph_client.request("POST", "/$batch", json=body)
+        response.raise_for_status()
+
+        results: Dict[str, Optional[DirectoryUser]] = {}
+        retry = []
+
+        for item in response.json().get("responses", []):
+            key = keys[int(item["id"])]
+            status = item.get("status")
+            data = item.get("body") or {}
+
+            if status == 200:
+                results[key] = DirectoryUser(
+                    id=data["id"],
+                    display_name=data.get("displayName"),
+                    mail=data.get("mail"),
+                    user_principal_name=data.get("userPrincipalName")
+                )
+            elif status == 404:
+                results[key] = None
+            else:
+                retry.append(key)
+
+        # Itens sem resposta ou com erro (ex: 429) são buscados individualmente pelo SDK,
+        # que aplica o retry com Retry-After
+        retry.extend(key for key in keys if key not in results and key not in retry)
+        if retry:
+            logger.info(f"{len(retry)} usuários do $batch serão buscados individualmente")
+            for key, user in zip(retry, await asyncio.gather(*(self._fetch_user(key) for key in retry))):
+                results[key] = user
+
+        return results
+
+
+def _cache_key(email: str) -> str:
+    return email.strip().lower()
+
+
+def get_cached_user(email: str) -> Optional[DirectoryUser]:
+    """
+    Retorna o usuário em cache, sem consultar o Graph.
+    """
+    return _users_cache.get(_cache_key(email))
+
+
+def invalidate_directory_cache(email: Optional[str] = None):
+    """
+    Remove um usuário do cache, ou todos quando nenhum email é informado.
+    """
+    if email:
+        _users_cache.invalidate(_cache_key(email))
+    else:
+        _users_cache.clear()
+
+
+def directory_cache_stats() -> dict:
+    return _users_cache.stats()
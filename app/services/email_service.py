@@ -1,35 +1,116 @@
 import logging
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import Depends
-from services.client import GraphClient
+from kiota_abstractions.base_request_configuration import RequestConfiguration
+from msgraph.generated.users.item.messages.item.message_item_request_builder import MessageItemRequestBuilder
+from config import GRAPH_MESSAGE_SELECT_PROFILE, GRAPH_MESSAGE_BODY_CONTENT_TYPE
+from models.email import Email
+from models.webhook import NotificationItem
+from services.client import GraphClient, get_graph_client
+from services.message_batch_fetcher import MessageBatchFetcher, get_message_batch_fetcher
 from utils.normalize_email_data import normalize_email_data
 
 logger = logging.getLogger(__name__)
 
+# Campos retornados pelo Graph em cada perfil ($select). None busca o recurso completo.
+MESSAGE_SELECT_PROFILES: Dict[str, Optional[List[str]]] = {
+    "minimal": [
+        "id", "subject", "from", "toRecipients", "receivedDateTime",
+        "sentDateTime", "isRead", "hasAttachments"
+    ],
+    "standard": [
+        "id", "subject", "from", "toRecipients", "ccRecipients", "bccRecipients", "body",
+        "receivedDateTime", "sentDateTime", "isRead", "hasAttachments", "conversationId",
+        "importance", "internetMessageId"
+    ],
+    "full": None
+}
+
+# Campos que precisam vir na rich notification para dispensar a busca no Graph.
+# Os demais são opcionais: o Graph omite propriedades nulas (ex: bccRecipients vazio)
+RESOURCE_DATA_REQUIRED_FIELDS = ("id", "subject", "body", "from")
+
+def message_ids_from_resource(resource: str) -> Tuple[str, str]:
+    """
+    Extrai o usuário e a mensagem de um recurso como "Users/{id}/Messages/{id}".
+    """
+    parts = resource.split("/")
+    return parts[1], parts[3]
+
+
 class EmailService:
-    def __init__(self, graph_client: GraphClient = Depends(GraphClient)):
+    def __init__(
+        self,
+        graph_client: GraphClient = Depends(get_graph_client),
+        batch_fetcher: Optional[MessageBatchFetcher] = Depends(get_message_batch_fetcher)
+    ):
         self.client = graph_client.client
+        self.batch_fetcher = batch_fetcher
+
+        if GRAPH_MESSAGE_SELECT_PROFILE not in MESSAGE_SELECT_PROFILES:
+            raise ValueError(f"Perfil de $select desconhecido: {GRAPH_MESSAGE_SELECT_PROFILE}")
 
-    async def get_email_data(self, payload: dict) -> dict: 
+        self.select = MESSAGE_SELECT_PROFILES[GRAPH_MESSAGE_SELECT_PROFILE]
+        self.headers = {}
+        if GRAPH_MESSAGE_BODY_CONTENT_TYPE:
+            self.headers["Prefer"] = f'outlook.body-content-type="{GRAPH_MESSAGE_BODY_CONTENT_TYPE}"'
+
+    async def get_email_data(self, item: NotificationItem) -> Email:
         """
         Obtém os dados de uma mensagem de e-mail específica.
-        
+
         Args:
-            resource: O recurso da mensagem de e-mail a ser obtido
+            item: Item da notificação (um elemento de payload.value) com o recurso da mensagem
         """
 
-        resource = payload.get("value")[0].get("resource").split("/")
-        user_id = resource[1]
-        message_id = resource[3]
-        
+        user_id, message_id = message_ids_from_resource(item.resource)
+
         try:
             logger.info(f"Obtendo dados da mensagem de e-mail {user_id} {message_id}...")
 
-            email_data = await self.client.users.by_user_id(user_id).messages.by_message_id(message_id).get()
+            if self.batch_fetcher:
+                query = f"?$select={','.join(self.select)}" if self.select else ""
+                email_data = await self.batch_fetcher.fetch_message(user_id, message_id, query, self.headers or None)
+            else:
+                email_data = await self.client.users.by_user_id(user_id).messages.by_message_id(message_id).get(
+                    request_configuration=self._build_request_configuration()
+                )
 
             logger.info(f"Dados da mensagem de e-mail obtidos com sucesso.")
-            
+
             return normalize_email_data(email_data)
         except Exception as e:
             logger.error(f"Erro ao obter dados da mensagem de e-mail {user_id} {message_id}: {e}")
             raise
+
+    def email_from_resource_data(self, resource_data: dict) -> Optional[Email]:
+        """
+        Normaliza a mensagem recebida descriptografada na própria notificação (rich notification).
+
+        Returns:
+            O e-mail normalizado, ou None se faltarem campos obrigatórios do perfil
+            configurado (nesse caso a mensagem deve ser buscada no Graph)
+        """
+        missing_fields = [
+            field for field in RESOURCE_DATA_REQUIRED_FIELDS
+            if (self.select is None or field in self.select) and field not in resource_data
+        ]
+
+        if missing_fields:
+            logger.info(f"Notificação sem os campos {missing_fields}, buscando mensagem no Graph")
+            return None
+
+        return normalize_email_data(resource_data)
+
+    def _build_request_configuration(self) -> RequestConfiguration:
+        request_configuration = RequestConfiguration(
+            query_parameters=MessageItemRequestBuilder.MessageItemRequestBuilderGetQueryParameters(
+                select=self.select
+            )
+        )
+
+        for name, value in self.headers.items():
+            request_configuration.headers.add(name, value)
+
+        return request_configuration
@@ -1,33 +1,113 @@
+import asyncio
+import gzip
 import httpx
 import logging
-from config import EXTERNAL_API_URL
+import orjson
+from typing import Optional, Union
+
+from fastapi import Depends
+from models.email import Email
+from config import (
+    EXTERNAL_API_URL,
+    EXTERNAL_HTTP_MAX_CONNECTIONS,
+    EXTERNAL_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    EXTERNAL_HTTP_KEEPALIVE_EXPIRY,
+    EXTERNAL_HTTP2,
+    EXTERNAL_HTTP_CONNECT_TIMEOUT,
+    EXTERNAL_HTTP_READ_TIMEOUT,
+    EXTERNAL_HTTP_WRITE_TIMEOUT,
+    EXTERNAL_HTTP_POOL_TIMEOUT,
+    EXTERNAL_HTTP_GZIP,
+    EXTERNAL_HTTP_GZIP_MIN_BYTES,
+    EXTERNAL_HTTP_GZIP_THREAD_MIN_BYTES,
+)
 
 
 logger = logging.getLogger(__name__)
 
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_external_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP compartilhado para a API externa, criando-o na primeira chamada.
+    """
+    global _http_client
+
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=EXTERNAL_HTTP2,
+            limits=httpx.Limits(
+                max_connections=EXTERNAL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=EXTERNAL_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=EXTERNAL_HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=EXTERNAL_HTTP_CONNECT_TIMEOUT,
+                read=EXTERNAL_HTTP_READ_TIMEOUT,
+                write=EXTERNAL_HTTP_WRITE_TIMEOUT,
+                pool=EXTERNAL_HTTP_POOL_TIMEOUT
+            )
+        )
+
+    return _http_client
+
+
+async def close_external_http_client():
+    """
+    Fecha o cliente HTTP compartilhado (usado no shutdown da aplicação).
+    """
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 class ExternalService:
     """
     Classe para enviar requisições para a API externa (agente)
     """
 
-    def __init__(self):
-        self.client = httpx.AsyncClient()
+    def __init__(self, client: httpx.AsyncClient = Depends(get_external_http_client)):
+        self.client = client
         self.base_url = EXTERNAL_API_URL
 
-    async def send_email(self, payload: dict):
+    async def _build_request_body(self, payload: Union[Email, dict]):
+        """
+        Serializa o payload direto para bytes JSON (orjson), comprimindo com gzip quando habilitado.
+
+        O gzip é CPU-bound: corpos grandes são comprimidos numa thread para não bloquear o event loop.
+        """
+        content = payload.to_json() if isinstance(payload, Email) else orjson.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+
+        if EXTERNAL_HTTP_GZIP and len(content) >= EXTERNAL_HTTP_GZIP_MIN_BYTES:
+            if len(content) >= EXTERNAL_HTTP_GZIP_THREAD_MIN_BYTES:
+                content = await asyncio.to_thread(gzip.compress, content, compresslevel=5)
+            else:
+                content = gzip.compress(content, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        return content, headers
+
+    async def send_email(self, payload: Union[Email, dict]):
 
         # endpoint = f"{self.base_url}/graph-microsoft"
         endpoint = EXTERNAL_API_URL
         try:
+            content, headers = await self._build_request_body(payload)
+
             response = await self.client.post(
                 endpoint,
-                json=payload
+                content=content,
+                headers=headers
             )
 
             response.raise_for_status()
             logger.info(f"Notificação enviada com sucesso para {self.base_url}")
             return True
-        
+
         except httpx.HTTPError as e:
             logger.error(f"Erro ao enviar notificação: {str(e)}")
             return False
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from services.client import GraphClient, get_or_create_graph_client
+from config import (
+    GRAPH_BATCH_ENABLED,
+    GRAPH_BATCH_WINDOW_MS,
+    GRAPH_BATCH_MAX_SIZE,
+    GRAPH_BATCH_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Limite de requisições por chamada $batch imposto pelo Graph
+GRAPH_BATCH_LIMIT = 20
+
+RETRYABLE_STATUS = (429, 503, 504)
+
+
+class GraphBatchItemError(Exception):
+    """
+    Erro de uma requisição individual dentro de um $batch.
+    """
+
+    def __init__(self, status: int, body: Optional[dict]):
+        self.status = status
+        self.body = body or {}
+        message = self.body.get("error", {}).get("message", "")
+        super().__init__(f"Graph retornou {status} no $batch: {message}")
+
+
+class MessageBatchFetcherClosed(Exception):
+    """
+    Levantada para requisições que aguardavam retry quando o fetcher foi encerrado.
+    """
+
+
+@dataclass(eq=False)
+class _PendingRequest:
+    url: str
+    future: asyncio.Future
+    headers: Optional[Dict[str, str]] = None
+    attempts: int = 0
+
+
+@dataclass
+class BatchStats:
+    batches_sent: int = 0
+    requests_sent: int = 0
+    retries: int = 0
+    failures: int = 0
+
+
+class MessageBatchFetcher:
+    """
+    Agrupa buscas de mensagens feitas dentro de uma janela curta em uma única
+    chamada JSON $batch do Graph e devolve cada resposta para quem a aguarda.
+
+    Itens com 429/503/504 dentro do lote são reenfileirados individualmente
+    respeitando o Retry-After.
+    """
+
+    def __init__(
+        self,
+        graph_client: GraphClient,
+        window_ms: float = GRAPH_BATCH_WINDOW_MS,
+        max_size: int = GRAPH_BATCH_MAX_SIZE,
+        max_retries: int = GRAPH_BATCH_MAX_RETRIES
+    ):
+        self.graph_client = graph_client
+        self.window = window_ms / 1000
+        self.max_size = max(1, min(max_size, GRAPH_BATCH_LIMIT))
+        self.max_retries = max_retries
+
+        self.stats = BatchStats()
+
+        self._pending: List[_PendingRequest] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._retries: Dict[_PendingRequest, asyncio.TimerHandle] = {}
+        self._closing = False
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Agenda um GET no próximo lote e aguarda o corpo da resposta.
+
+        Args:
+            url: Caminho relativo à versão da API (ex: "/users/{id}/messages/{id}")
+            headers: Cabeçalhos específicos desta requisição dentro do lote
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._add(_PendingRequest(url=url, future=future, headers=headers))
+        return await future
+
+    async def fetch_message(
+        self,
+        user_id: str,
+        message_id: str,
+        query: str = "",
+        headers: Optional[Dict[str, str]] = None
+    ) -> dict:
+        """
+        Busca uma mensagem de e-mail pelo lote.
+        """
+        return await self.get(f"/users/{user_id}/messages/{message_id}{query}", headers)
+
+    async def close(self):
+        """
+        Envia o que estiver pendente e aguarda os lotes em andamento. Requisições
+        que aguardavam um retry (ou que pedirem retry durante o encerramento) falham.
+        """
+        self._closing = True
+
+        for pending, handle in self._retries.items():
+            handle.cancel()
+            self._fail(pending, MessageBatchFetcherClosed("Fetcher de $batch encerrado antes do retry da requisição"))
+        self._retries.clear()
+
+        while self._pending or self._inflight:
+            if self._pending:
+                self._flush()
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _add(self, pending: _PendingRequest):
+        self._pending.append(pending)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = [p for p in self._pending[:self.max_size] if not p.future.done()]
+            self._pending = self._pending[self.max_size:]
+
+            if batch:
+                task = asyncio.create_task(self._send(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    def _retry_later(self, pending: _PendingRequest, retry_after: float):
+        if self._closing:
+            self._fail(pending, MessageBatchFetcherClosed("Fetcher de $batch encerrado antes do retry da requisição"))
+            return
+
+        pending.attempts += 1
+        self.stats.retries += 1
+        self._retries[pending] = asyncio.get_running_loop().call_later(retry_after, self._retry_now, pending)
+
+    def _retry_now(self, pending: _PendingRequest):
+        self._retries.pop(pending, None)
+        self._add(pending)
+
+    def _fail(self, pending: _PendingRequest, error: Exception):
+        self.stats.failures += 1
+        if not pending.future.done():
+            pending.future.set_exception(error)
+
+    async def _send(self, batch: List[_PendingRequest]):
+        requests = []
+        for index, pending in enumerate(batch):
+            request = {"id": str(index), "method": "GET", "url": pending.url}
+            if pending.headers:
+                request["headers"] = pending.headers
+            requests.append(request)
+
+        body = {"requests": requests}
+
+        self.stats.batches_sent += 1
+        self.stats.requests_sent += len(batch)
+
+        try:
+            response = await self.graph_client.request("POST", "/$batch", json=body)
+
+            if response.status_code in RETRYABLE_STATUS:
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                for pending in batch:
+                    if pending.attempts < self.max_retries:
+                        self._retry_later(pending, retry_after)
+                    else:
+                        self._fail(pending, GraphBatchItemError(response.status_code, None))
+                return
+
+            response.raise_for_status()
+            responses = {item.get("id"): item for item in response.json().get("responses", [])}
+
+        except Exception as e:
+            logger.error(f"Erro ao enviar $batch com {len(batch)} requisições: {e}")
+            for pending in batch:
+                self._fail(pending, e)
+            return
+
+        for index, pending in enumerate(batch):
+            if pending.future.done():
+                continue
+
+            item = responses.get(str(index))
+            status = item.get("status", 500) if item else 500
+            item_body = item.get("body") if item else None
+
+            if 200 <= status < 300:
+                pending.future.set_result(item_body)
+            elif status in RETRYABLE_STATUS and pending.attempts < self.max_retries:
+                headers = item.get("headers") or {}
+                self._retry_later(pending, _parse_retry_after(headers.get("Retry-After")))
+            else:
+                self._fail(pending, GraphBatchItemError(status, item_body))
+
+
+def _parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+_batch_fetcher: Optional[MessageBatchFetcher] = None
+
+
+def get_message_batch_fetcher() -> Optional[MessageBatchFetcher]:
+    """
+    Retorna o fetcher compartilhado, ou None quando GRAPH_BATCH_ENABLED está desligado.
+    """
+    global _batch_fetcher
+
+    if GRAPH_BATCH_ENABLED and _batch_fetcher is None:
+        _batch_fetcher = MessageBatchFetcher(get_or_create_graph_client())
+
+    return _batch_fetcher
+
+
+async def close_message_batch_fetcher():
+    """
+    Envia os lotes pendentes (usado no shutdown da aplicação).
+    """
+    global _batch_fetcher
+
+    if _batch_fetcher is not None:
+        await _batch_fetcher.close()
+        _batch_fetcher = None
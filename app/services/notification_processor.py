@@ -1,25 +1,168 @@
-import logging
 import asyncio
-from services.email_service import EmailService
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional
+
+from config import (
+    NOTIFICATION_BATCH_CONCURRENCY,
+    NOTIFICATION_MAX_CONCURRENT_ITEMS,
+    SUBSCRIPTION_REGISTRY_ENFORCE,
+    BODY_COMPACTION_ENABLED,
+)
+from models.email import Email
+from models.webhook import NotificationItem, NotificationPayload
+from services.dedup_cache import DedupCache, notification_dedup_key
+from services.attachment_service import AttachmentService
+from services.email_service import EmailService, message_ids_from_resource
 from services.external_service import ExternalService
-from utils.functions import save_request_to_json
+from services.subscription_registry import get_subscription_registry
+from utils.body_compaction import compact_email
+from utils.decrypt_notification import NotificationDecryptor, NotificationSignatureError
+from utils.audit_log import write_audit_record
 
 logger = logging.getLogger(__name__)
 
-async def process_notification_async(
-    payload: dict,
+# Limite global de itens em processamento simultâneo (todas as notificações)
+_items_semaphore = asyncio.Semaphore(NOTIFICATION_MAX_CONCURRENT_ITEMS)
+
+# Contadores de resultado por item
+item_stats: Counter = Counter()
+
+
+@dataclass
+class ItemOutcome:
+    subscription_id: Optional[str]
+    resource: Optional[str]
+    status: str  # "delivered", "delivery_failed", "duplicate", "unknown_subscription" ou "failed"
+    error: Optional[str] = None
+
+
+async def process_notification(
+    payload: NotificationPayload,
+    graph_api: EmailService,
+    external_service: ExternalService,
+    dedup_cache: Optional[DedupCache] = None,
+    decryptor: Optional[NotificationDecryptor] = None,
+    attachment_service: Optional[AttachmentService] = None
+) -> List[ItemOutcome]:
+    """
+    Processa uma notificação retirada da fila: cada item do lote é buscado no Graph,
+    normalizado e entregue para a API externa de forma concorrente e independente.
+    """
+    items = payload.value
+    batch_semaphore = asyncio.Semaphore(NOTIFICATION_BATCH_CONCURRENCY)
+
+    outcomes = await asyncio.gather(*(
+        process_notification_item(
+            item, graph_api, external_service, batch_semaphore, dedup_cache, decryptor, attachment_service
+        )
+        for item in items
+    ))
+
+    failures = [outcome for outcome in outcomes if outcome.status not in ("delivered", "duplicate")]
+    if failures:
+        logger.warning(f"{len(failures)} de {len(outcomes)} itens da notificação não foram entregues")
+
+    return outcomes
+
+
+async def process_notification_item(
+    item: NotificationItem,
+    graph_api: EmailService,
+    external_service: ExternalService,
+    batch_semaphore: asyncio.Semaphore,
+    dedup_cache: Optional[DedupCache] = None,
+    decryptor: Optional[NotificationDecryptor] = None,
+    attachment_service: Optional[AttachmentService] = None
+) -> ItemOutcome:
+    """
+    Processa um único item da notificação. Erros ficam restritos ao item.
+    Itens repetidos (reentregas do Graph) são descartados antes de qualquer chamada ao Graph,
+    e itens com encryptedContent são entregues sem buscar a mensagem quando possível.
+    Com BODY_COMPACTION_ENABLED o corpo é compactado antes da auditoria e da entrega.
+    A entrega para a API externa acontece fora dos semáforos, limitada pelo pool HTTP.
+    """
+    outcome = ItemOutcome(
+        subscription_id=item.subscriptionId,
+        resource=item.resource,
+        status="failed"
+    )
+
+    if SUBSCRIPTION_REGISTRY_ENFORCE and not get_subscription_registry().contains(outcome.subscription_id):
+        logger.warning("Notificação de subscription não registrada: %s", outcome.subscription_id)
+        outcome.status = "unknown_subscription"
+        item_stats[outcome.status] += 1
+        return outcome
+
+    dedup_key = notification_dedup_key(item)
+    if dedup_cache and not await dedup_cache.claim(dedup_key):
+        outcome.status = "duplicate"
+        item_stats[outcome.status] += 1
+        return outcome
+
+    try:
+        async with batch_semaphore, _items_semaphore:
+            email_data = await _email_from_encrypted_content(item, graph_api, decryptor)
+
+            if email_data is None:
+                email_data = await graph_api.get_email_data(item)
+
+        if BODY_COMPACTION_ENABLED:
+            compact_email(email_data)
+
+        # Os anexos têm limite de concorrência próprio, fora dos semáforos dos itens,
+        # para que arquivos grandes não segurem as demais notificações
+        if attachment_service is not None and email_data.has_attachments:
+            email_data.attachments = await attachment_service.process_message(
+                *message_ids_from_resource(item.resource)
+            )
+
+        write_audit_record("email", email_data)
+
+        delivered = await external_service.send_email(email_data)
+        outcome.status = "delivered" if delivered else "delivery_failed"
+
+    except Exception as e:
+        outcome.error = str(e)
+        logger.error("Erro no processamento do item %s: %s", outcome.resource, str(e))
+
+    finally:
+        # Também no cancelamento (shutdown da fila): a reserva não pode sobreviver ao item
+        if dedup_cache:
+            if outcome.status == "delivered":
+                await dedup_cache.confirm(dedup_key)
+            else:
+                await dedup_cache.release(dedup_key)
+
+    item_stats[outcome.status] += 1
+    return outcome
+
+
+async def _email_from_encrypted_content(
+    item: NotificationItem,
     graph_api: EmailService,
-    external_service: ExternalService
-):
+    decryptor: Optional[NotificationDecryptor]
+) -> Optional[Email]:
+    """
+    Descriptografa o encryptedContent do item (rich notification) e normaliza o e-mail.
+    Retorna None quando não há dados suficientes e a mensagem precisa ser buscada no Graph.
+    """
+    encrypted_content = item.encryptedContent
+    if not encrypted_content or decryptor is None:
+        return None
 
-    async def async_task():
-        try:
-            email_data = await graph_api.get_email_data(payload)
-            
-            save_request_to_json(email_data, "email")
+    try:
+        resource_data = await decryptor.decrypt(encrypted_content)
+    except NotificationSignatureError:
+        # Assinatura inválida: o conteúdo não é confiável, então o item falha
+        raise
+    except Exception as e:
+        logger.warning("Falha ao descriptografar item %s, buscando no Graph: %s", item.resource, str(e))
+        return None
 
-            await external_service.send_email(email_data)
-        except Exception as e:
-            logger.error("Erro no processamento assíncrono: %s", str(e))
+    email_data = graph_api.email_from_resource_data(resource_data)
+    if email_data is not None:
+        item_stats["from_resource_data"] += 1
 
-    asyncio.create_task(async_task()) 
\ No newline at end of file
+    return email_data
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from config import (
+    NOTIFICATION_QUEUE_MAXSIZE,
+    NOTIFICATION_WORKERS,
+    NOTIFICATION_QUEUE_DRAIN_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueueFull(Exception):
+    """
+    Levantada quando a fila de notificações está cheia (backpressure).
+    """
+
+
+class NotificationQueue:
+    """
+    Fila limitada de notificações consumida por um pool fixo de workers.
+
+    O webhook apenas enfileira o payload e responde 202; os workers executam
+    o processamento (busca -> normalização -> entrega) com concorrência limitada.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        maxsize: int = NOTIFICATION_QUEUE_MAXSIZE,
+        workers: int = NOTIFICATION_WORKERS
+    ):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._worker_tasks: List[asyncio.Task] = []
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._started_at: Optional[float] = None
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        """
+        Inicia o pool de workers.
+        """
+        self._started_at = time.monotonic()
+        for index in range(self.workers):
+            self._worker_tasks.append(
+                asyncio.create_task(self._worker(), name=f"notification-worker-{index}")
+            )
+        logger.info(f"Fila de notificações iniciada com {self.workers} workers (capacidade {self.maxsize})")
+
+    def enqueue(self, payload: Any):
+        """
+        Enfileira um payload sem bloquear.
+
+        Raises:
+            NotificationQueueFull: se a fila estiver na capacidade máxima
+        """
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise NotificationQueueFull()
+
+        self.enqueued += 1
+
+    async def put(self, payload: Any):
+        """
+        Enfileira um payload aguardando espaço na fila (usado por produtores
+        internos, como a sincronização delta, que podem esperar).
+        """
+        await self._queue.put(payload)
+        self.enqueued += 1
+
+    async def stop(self, drain_timeout: float = NOTIFICATION_QUEUE_DRAIN_TIMEOUT):
+        """
+        Aguarda o esvaziamento da fila (até drain_timeout) e encerra os workers.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Fila de notificações não foi drenada em {drain_timeout}s; {self._queue.qsize()} itens descartados")
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+
+        logger.info("Fila de notificações encerrada")
+
+    def stats(self) -> dict:
+        """
+        Retorna profundidade da fila e utilização dos workers.
+        """
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacity_seconds = uptime * self.workers
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_maxsize": self.maxsize,
+            "workers": self.workers,
+            "busy_workers": self._busy_workers,
+            "worker_utilization": round(self._busy_seconds / capacity_seconds, 4) if capacity_seconds else 0.0,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+    async def _worker(self):
+        while True:
+            payload = await self._queue.get()
+            self._busy_workers += 1
+            started = time.monotonic()
+
+            try:
+                await self.handler(payload)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Erro no processamento da notificação: %s", str(e))
+            finally:
+                self._busy_seconds += time.monotonic() - started
+                self._busy_workers -= 1
+                self._queue.task_done()
+
+
+_notification_queue: Optional[NotificationQueue] = None
+
+
+def start_notification_queue(handler: Callable[[Any], Awaitable[None]]) -> NotificationQueue:
+    """
+    Cria e inicia a fila compartilhada (usado no startup da aplicação).
+    """
+    global _notification_queue
+
+    _notification_queue = NotificationQueue(handler)
+    _notification_queue.start()
+    return _notification_queue
+
+
+def get_notification_queue() -> NotificationQueue:
+    """
+    Dependência do FastAPI que entrega a fila compartilhada.
+    """
+    if _notification_queue is None:
+        raise RuntimeError("Fila de notificações não foi iniciada")
+    return _notification_queue
+
+
+async def stop_notification_queue():
+    """
+    Drena e encerra a fila compartilhada (usado no shutdown da aplicação).
+    """
+    global _notification_queue
+
+    if _notification_queue is not None:
+        await _notification_queue.stop()
+        _notification_queue = None
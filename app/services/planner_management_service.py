@@ -1,6 +1,6 @@
 from fastapi import Depends, HTTPException
 from pydantic import BaseModel
-from services.client import GraphClient
+from services.client import GraphClient, get_graph_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +12,7 @@ class PlannerTask(BaseModel):
 
 
 class PlannerManagementService:
-    def __init__(self, graph_client: GraphClient = Depends(GraphClient)):
+    def __init__(self, graph_client: GraphClient = Depends(get_graph_client)):
         self.graph_client = graph_client.client
 
     def create_planner_task(self, planner_task: PlannerTask):
@@ -1,54 +1,105 @@
-from typing import List
+from typing import List, Optional
 import logging
 
-from fastapi import Depends
-
-from services.client import GraphClient
+from kiota_abstractions.base_request_configuration import RequestConfiguration
 from msgraph import GraphServiceClient
+from msgraph.generated.users.item.member_of.graph_group.graph_group_request_builder import GraphGroupRequestBuilder
+
+from config import (
+    PLANNER_GROUP_NAME_FILTER,
+    PLANNER_GROUP_CACHE_TTL_SECONDS,
+    PLANNER_GROUP_CACHE_MAX_ENTRIES,
+)
+from services.directory_service import DirectoryService
+from utils.ttl_cache import AsyncTTLCache
 
 logger = logging.getLogger(__name__)
 
+# Compartilhado entre as instâncias do serviço (que são criadas a cada requisição)
+_squad_groups_cache = AsyncTTLCache(ttl=PLANNER_GROUP_CACHE_TTL_SECONDS, max_entries=PLANNER_GROUP_CACHE_MAX_ENTRIES)
+
+
 class GroupService:
 
-    def __init__(self, graph_client: GraphClient):
+    def __init__(self, graph_client: GraphServiceClient, directory_service: DirectoryService):
         self.graph_client: GraphServiceClient = graph_client
+        self.directory_service = directory_service
 
     async def get_squad_group_id_by_email(self, user_email: str) -> str:
         group = await self.list_user_groups(user_email)
+        if not group:
+            raise ValueError(f"Nenhum grupo '{PLANNER_GROUP_NAME_FILTER}' encontrado para {user_email}")
+
         squad_group_id = group[0]['id']
 
         return squad_group_id
 
     async def list_user_groups(self, user_email: str) -> List[dict]:
         """
-        Lista os grupos que o usuário participa baseado no email.
+        Lista os grupos squad que o usuário participa baseado no email.
+        O resultado fica em cache por usuário; chamadas simultâneas para o mesmo
+        usuário compartilham uma única consulta ao Graph.
+        """
+        user_id = await self.directory_service.get_user_id(user_email)
+
+        return await _squad_groups_cache.get_or_load(
+            user_id,
+            lambda: self._fetch_user_groups(user_id)
+        )
+
+    async def _fetch_user_groups(self, user_id: str) -> List[dict]:
+        """
+        Busca no Graph os grupos do usuário e filtra pelo nome localmente.
+
+        O filtro não vai para o servidor: memberOf não aceita contains() no $filter
+        e o $search casa prefixos de palavra, então perderia grupos como "MySquad".
         """
+        request_configuration = RequestConfiguration(
+            query_parameters=GraphGroupRequestBuilder.GraphGroupRequestBuilderGetQueryParameters(
+                select=["id", "displayName", "description", "mail", "groupTypes", "visibility"],
+                top=999
+            )
+        )
 
         try:
-            user = await self.graph_client.users.by_user_id(user_email).get()
-            
-            # Depois, buscar os grupos que o usuário participa
-            # Usando member_of para obter grupos
-            groups_response = await self.graph_client.users.by_user_id(user.id).member_of.get()
-            
-            groups_data = []
-            if hasattr(groups_response, 'value'):
-                for group in groups_response.value:
-                    if "squad" in group.display_name.lower():
-                        group_info = {
-                            "id": group.id,
-                            "display_name": group.display_name,
-                            "description": getattr(group, 'description', None),
-                            "mail": getattr(group, 'mail', None),
-                            "group_types": getattr(group, 'group_types', []),
-                            "visibility": getattr(group, 'visibility', None)
-                        }
-
-                        groups_data.append(group_info)
-            
-            return groups_data
-            
+            groups_request = self.graph_client.users.by_user_id(user_id).member_of.graph_group
+            groups_response = await groups_request.get(request_configuration=request_configuration)
+            groups = list(groups_response.value or [])
+
+            while groups_response.odata_next_link:
+                groups_response = await groups_request.with_url(groups_response.odata_next_link).get()
+                groups.extend(groups_response.value or [])
+
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"Erro ao buscar grupos para {user_email}: {error_msg}")
-            
+            logger.error(f"Erro ao buscar grupos para o usuário {user_id}: {error_msg}")
+            raise
+
+        name_filter = PLANNER_GROUP_NAME_FILTER.lower()
+
+        return [
+            {
+                "id": group.id,
+                "display_name": group.display_name,
+                "description": group.description,
+                "mail": group.mail,
+                "group_types": group.group_types or [],
+                "visibility": group.visibility
+            }
+            for group in groups
+            if name_filter in (group.display_name or "").lower()
+        ]
+
+
+def invalidate_squad_group_cache(user_id: Optional[str] = None):
+    """
+    Remove do cache o grupo squad de um usuário, ou de todos quando nenhum id é informado.
+    """
+    if user_id:
+        _squad_groups_cache.invalidate(user_id)
+    else:
+        _squad_groups_cache.clear()
+
+
+def squad_group_cache_stats() -> dict:
+    return _squad_groups_cache.stats()
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from kiota_abstractions.base_request_configuration import RequestConfiguration
+from msgraph import GraphServiceClient
+from msgraph.generated.models.planner_category_descriptions import PlannerCategoryDescriptions
+from msgraph.generated.models.planner_plan_details import PlannerPlanDetails
+
+from config import (
+    PLANNER_LABEL_CACHE_TTL_SECONDS,
+    PLANNER_CREATE_MISSING_LABELS,
+    PLANNER_ETAG_MAX_RETRIES,
+)
+from utils.ttl_cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+# O Planner oferece 25 categorias por plano
+CATEGORY_SLOTS = [f"category{number}" for number in range(1, 26)]
+
+_CATEGORY_KEY = re.compile(r"^category([1-9]|1\d|2[0-5])$", re.IGNORECASE)
+
+
+@dataclass
+class PlanCategories:
+    etag: Optional[str]
+    # Nome do label (em minúsculas) -> categoria ("category1".."category25")
+    by_label: Dict[str, str] = field(default_factory=dict)
+    free_slots: List[str] = field(default_factory=list)
+
+
+# Categorias por plano, compartilhado entre as instâncias do serviço
+_categories_cache = AsyncTTLCache(ttl=PLANNER_LABEL_CACHE_TTL_SECONDS)
+_create_locks: Dict[str, asyncio.Lock] = {}
+
+
+class LabelService:
+    """
+    Converte os labels das tarefas (nomes legíveis) nas categorias do plano,
+    usando as categoryDescriptions dos detalhes do plano em cache.
+    """
+
+    def __init__(self, graph_client: GraphServiceClient):
+        self.graph_client: GraphServiceClient = graph_client
+
+    async def map_labels(self, plan_id: str, labels: Iterable[str]) -> Dict[str, bool]:
+        """
+        Retorna o applied_categories da tarefa ({"categoryN": True}).
+        Labels já no formato "categoryN" são mantidos; labels desconhecidos são
+        criados nas categorias livres (PLANNER_CREATE_MISSING_LABELS) ou ignorados.
+        """
+        labels = [label.strip() for label in labels if label and label.strip()]
+        if not labels:
+            return {}
+
+        # Sem nomes para traduzir, não há por que buscar os detalhes do plano
+        if all(_CATEGORY_KEY.match(label) for label in labels):
+            return {label.lower(): True for label in labels}
+
+        categories = await self.get_plan_categories(plan_id)
+        applied: Dict[str, bool] = {}
+        missing: List[str] = []
+
+        for label in labels:
+            category = _category_for(label, categories)
+            if category:
+                applied[category] = True
+            elif label.lower() not in (name.lower() for name in missing):
+                missing.append(label)
+
+        if missing and PLANNER_CREATE_MISSING_LABELS:
+            created = await self.create_labels(plan_id, missing)
+            applied.update({category: True for category in created.values()})
+            missing = [label for label in missing if label.lower() not in created]
+
+        if missing:
+            logger.warning(f"Labels sem categoria no plano {plan_id} foram ignorados: {missing}")
+
+        return applied
+
+    async def get_plan_categories(self, plan_id: str, refresh: bool = False) -> PlanCategories:
+        if refresh:
+            _categories_cache.invalidate(plan_id)
+
+        return await _categories_cache.get_or_load(plan_id, lambda: self._fetch_plan_categories(plan_id))
+
+    async def create_labels(self, plan_id: str, labels: List[str]) -> Dict[str, str]:
+        """
+        Cria os labels nas categorias livres do plano.
+
+        Returns:
+            Dicionário label (em minúsculas) -> categoria atribuída
+        """
+        lock = _create_locks.setdefault(plan_id, asyncio.Lock())
+
+        async with lock:
+            for attempt in range(PLANNER_ETAG_MAX_RETRIES + 1):
+                # Relê do Graph: outra requisição pode ter criado os labels ou ocupado as categorias
+                categories = await self.get_plan_categories(plan_id, refresh=attempt > 0)
+
+                assigned = {}
+                pending = []
+                for label in labels:
+                    category = _category_for(label, categories)
+                    if category:
+                        assigned[label.lower()] = category
+                    else:
+                        pending.append(label)
+
+                if not pending:
+                    return assigned
+
+                slots = categories.free_slots[:len(pending)]
+                if len(slots) < len(pending):
+                    logger.warning(f"Plano {plan_id} sem categorias livres para os labels {pending[len(slots):]}")
+
+                new_labels = dict(zip(slots, pending))
+                if not new_labels:
+                    return assigned
+
+                descriptions = PlannerCategoryDescriptions()
+                for category, label in new_labels.items():
+                    setattr(descriptions, category, label)
+
+                request_configuration = RequestConfiguration()
+                request_configuration.headers.add("If-Match", categories.etag)
+
+                try:
+                    await self.graph_client.planner.plans.by_planner_plan_id(plan_id).details.patch(
+                        PlannerPlanDetails(category_descriptions=descriptions),
+                        request_configuration=request_configuration
+                    )
+                except Exception as e:
+                    if getattr(e, "response_status_code", None) == 412 and attempt < PLANNER_ETAG_MAX_RETRIES:
+                        logger.warning(f"ETag dos detalhes do plano {plan_id} desatualizado; tentando novamente")
+                        continue
+                    logger.error(f"Erro ao criar labels no plano {plan_id}: {e}")
+                    raise
+
+                logger.info(f"Labels criados no plano {plan_id}: {new_labels}")
+
+                # O ETag mudou com o PATCH; a próxima leitura busca os detalhes atualizados
+                _categories_cache.invalidate(plan_id)
+                assigned.update({label.lower(): category for category, label in new_labels.items()})
+                return assigned
+
+        return {}
+
+    async def _fetch_plan_categories(self, plan_id: str) -> PlanCategories:
+        try:
+            details = await self.graph_client.planner.plans.by_planner_plan_id(plan_id).details.get()
+        except Exception as e:
+            logger.error(f"Erro ao buscar categorias do plano {plan_id}: {e}")
+            raise
+
+        descriptions = details.category_descriptions
+        categories = PlanCategories(etag=(details.additional_data or {}).get("@odata.etag"))
+
+        for category in CATEGORY_SLOTS:
+            name = getattr(descriptions, category, None) if descriptions else None
+            if name:
+                categories.by_label.setdefault(name.strip().lower(), category)
+            else:
+                categories.free_slots.append(category)
+
+        return categories
+
+
+def _category_for(label: str, categories: PlanCategories) -> Optional[str]:
+    if _CATEGORY_KEY.match(label):
+        return label.lower()
+
+    return categories.by_label.get(label.lower())
+
+
+def invalidate_label_cache(plan_id: Optional[str] = None):
+    """
+    Remove do cache as categorias de um plano, ou de todos quando nenhum plano é informado.
+    """
+    if plan_id:
+        _categories_cache.invalidate(plan_id)
+    else:
+        _categories_cache.clear()
+
+
+def label_cache_stats() -> dict:
+    return _categories_cache.stats()
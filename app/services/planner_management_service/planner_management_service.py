@@ -1,20 +1,29 @@
+import asyncio
+from collections import defaultdict
+from typing import AsyncIterator, List
+
 from fastapi import Depends, HTTPException
 from pydantic import BaseModel
 from msgraph.generated.models.planner_task import PlannerTask
-from models.task import Task
+from models.task import Task, TaskCreationResult
 from services.planner_management_service.planner_service import PlannerService
 from services.planner_management_service.group_service import GroupService
-from services.client import GraphClient
+from services.client import GraphClient, get_graph_client
+from services.directory_service import DirectoryService
+from utils.step_graph import Step, StepGraph
+from config import PLANNER_BULK_CONCURRENCY
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class PlannerManagementService:
-    def __init__(self, graph_client: GraphClient = Depends(GraphClient)):
+    def __init__(self, graph_client: GraphClient = Depends(get_graph_client)):
         self.graph_client = graph_client.client
-        self.group_service = GroupService(self.graph_client)
-        self.planner_service = PlannerService(self.graph_client)
+        self.directory_service = DirectoryService(graph_client)
+        self.group_service = GroupService(self.graph_client, self.directory_service)
+        self.planner_service = PlannerService(self.graph_client, self.directory_service)
+        self.last_timings: dict = {}
 
     
     async def insert_task(self, task: Task):
@@ -23,11 +32,119 @@ class PlannerManagementService:
 
 
     async def _manage_planner(self, task: Task):
-        group_id = await self.group_service.get_squad_group_id_by_email(task.responsible_email)
+        """
+        Executa a criação da tarefa como um grafo de passos: a busca do responsável
+        e a resolução grupo -> plano/bucket rodam em paralelo, e a tarefa é criada
+        já com os detalhes (o PATCH só acontece se o Graph recusar os detalhes inline).
+        """
+        steps = [
+            Step("responsible", lambda r: self.planner_service.get_user_id_by_email(task.responsible_email)),
+            Step("group", lambda r: self.group_service.get_squad_group_id_by_email(task.responsible_email)),
+            Step("target", lambda r: self.planner_service.resolve_plan_and_bucket(r["group"]), ("group",)),
+            Step(
+                "categories",
+                lambda r: self.planner_service.label_service.map_labels(r["target"]["plan_id"], task.labels),
+                ("target",)
+            ),
+            Step(
+                "task",
+                lambda r: self.planner_service.create_task_with_details(
+                    task, r["group"], r["target"], r["responsible"].id, r["categories"]
+                ),
+                ("responsible", "target", "categories")
+            ),
+            Step("details", lambda r: self._insert_pending_details(task, *r["task"]), ("task",)),
+        ]
+
+        result = await StepGraph(steps).run()
+        self.last_timings = result.timings_dict()
+
+        logger.info(f"Tarefa '{task.title}' criada em {self.last_timings['total_ms']} ms: {self.last_timings['steps']}")
+
+        created_task, _ = result.results["task"]
+        return created_task
+
+    async def _insert_pending_details(self, task: Task, created_task: PlannerTask, details_inserted: bool):
+        if not details_inserted:
+            await self.planner_service.insert_details_in_task(created_task.id, task)
+
+    async def insert_tasks(self, tasks: List[Task]) -> List[TaskCreationResult]:
+        """
+        Cria várias tarefas e retorna o resultado de cada uma, na ordem de entrada.
+        """
+        results = [result async for result in self.iter_insert_tasks(tasks)]
+        return sorted(results, key=lambda result: result.index)
+
+    async def iter_insert_tasks(self, tasks: List[Task]) -> AsyncIterator[TaskCreationResult]:
+        """
+        Cria várias tarefas, entregando cada resultado assim que ele fica pronto.
+
+        Os responsáveis são resolvidos de uma vez (via $batch) e as tarefas são
+        agrupadas por responsável, de modo que grupo, plano e bucket são resolvidos
+        uma única vez por grupo. As criações rodam com concorrência limitada e a
+        falha de uma tarefa não interrompe as demais.
+        """
+        if not tasks:
+            return
+
+        users = await self.directory_service.resolve_many(task.responsible_email for task in tasks)
+
+        by_responsible = defaultdict(list)
+        for index, task in enumerate(tasks):
+            by_responsible[task.responsible_email.strip().lower()].append((index, task))
+
+        semaphore = asyncio.Semaphore(PLANNER_BULK_CONCURRENCY)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def create(index: int, task: Task, group_id: str, target: dict, user_id: str):
+            result = TaskCreationResult(
+                index=index, title=task.title, responsible_email=task.responsible_email,
+                status="failed", group_id=group_id
+            )
+            async with semaphore:
+                try:
+                    categories = await self.planner_service.label_service.map_labels(target["plan_id"], task.labels)
+                    created_task, details_inserted = await self.planner_service.create_task_with_details(
+                        task, group_id, target, user_id, categories
+                    )
+                    await self._insert_pending_details(task, created_task, details_inserted)
+                    result.status = "created"
+                    result.task_id = created_task.id
+                except Exception as e:
+                    logger.error(f"Erro ao criar tarefa '{task.title}': {e}")
+                    result.error = str(e)
+
+            results.put_nowait(result)
+
+        async def create_for_responsible(email: str, indexed_tasks: list):
+            group_id = None
+            try:
+                user = users.get(email)
+                if user is None:
+                    raise ValueError(f"Usuário {email} não encontrado no diretório")
+
+                group_id = await self.group_service.get_squad_group_id_by_email(email)
+                target = await self.planner_service.resolve_plan_and_bucket(group_id)
 
-        plan_task_created = await self.planner_service.create_plan_task(task, group_id)
+            except Exception as e:
+                logger.error(f"Erro ao resolver grupo/plano para {email}: {e}")
+                for index, task in indexed_tasks:
+                    results.put_nowait(TaskCreationResult(
+                        index=index, title=task.title, responsible_email=task.responsible_email,
+                        status="failed", group_id=group_id, error=str(e)
+                    ))
+                return
 
-        return plan_task_created
+            await asyncio.gather(*(create(index, task, group_id, target, user.id) for index, task in indexed_tasks))
 
+        runner = asyncio.gather(*(
+            create_for_responsible(email, indexed_tasks) for email, indexed_tasks in by_responsible.items()
+        ))
 
-            
\ No newline at end of file
+        try:
+            for _ in range(len(tasks)):
+                yield await results.get()
+        finally:
+            # Se o cliente desistir do stream, as criações pendentes são canceladas
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
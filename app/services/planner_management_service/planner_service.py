@@ -1,4 +1,5 @@
 import logging
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from models.task import Task
 from services.client import GraphClient
@@ -8,105 +9,166 @@ from msgraph.generated.models.planner_assignments import PlannerAssignments
 from msgraph.generated.models.planner_task_details import PlannerTaskDetails
 from kiota_abstractions.base_request_configuration import RequestConfiguration
 from msgraph.generated.models.planner_applied_categories import PlannerAppliedCategories
+from msgraph.generated.groups.item.planner.plans.plans_request_builder import PlansRequestBuilder
+from msgraph.generated.planner.plans.item.buckets.buckets_request_builder import BucketsRequestBuilder
 
+from config import (
+    PLANNER_PLAN_NAME,
+    PLANNER_BUCKET_NAME,
+    PLANNER_PLAN_CACHE_TTL_SECONDS,
+    PLANNER_INLINE_TASK_DETAILS,
+    PLANNER_ETAG_MAX_RETRIES,
+)
+from services.directory_service import DirectoryService
+from services.planner_management_service.label_service import LabelService
+from utils.ttl_cache import AsyncTTLCache
 
 
-logger = logging.getLogger(__name__)
 
+logger = logging.getLogger(__name__)
 
-class PlannerService:
-    def __init__(self, graph_client: GraphClient):
-        self.graph_client: GraphServiceClient = graph_client
+# Plano e bucket de destino por grupo, compartilhado entre as instâncias do serviço
+_plan_bucket_cache = AsyncTTLCache(ttl=PLANNER_PLAN_CACHE_TTL_SECONDS)
 
+# Desligado quando o Graph recusar a propriedade details no POST da tarefa
+_inline_details_supported = PLANNER_INLINE_TASK_DETAILS
 
-    async def create_plan_task(self, plan_task: Task, group_id: str):
 
-        labels = {}
-        for label in plan_task.labels:
-            labels[label] = True
+class PlannerService:
+    def __init__(self, graph_client: GraphClient, directory_service: DirectoryService):
+        self.graph_client: GraphServiceClient = graph_client
+        self.directory_service = directory_service
+        self.label_service = LabelService(graph_client)
+
+    async def create_task_with_details(
+        self,
+        plan_task: Task,
+        group_id: str,
+        target: dict,
+        user_id: str,
+        categories: Optional[Dict[str, bool]] = None
+    ):
+        """
+        Cria a tarefa já com os detalhes no corpo do POST (uma única chamada ao Graph).
+        Em um 400, a tarefa é criada sem os detalhes; o modo inline só é desativado
+        para o processo quando o erro se refere à propriedade details.
+
+        Returns:
+            Tupla (tarefa criada, se os detalhes já foram gravados)
+        """
+        global _inline_details_supported
+
+        if not plan_task.description:
+            return await self.create_task(plan_task, group_id, target, user_id, categories), True
+
+        if _inline_details_supported:
+            try:
+                created = await self.create_task(
+                    plan_task, group_id, target, user_id, categories, details=self.build_task_details(plan_task)
+                )
+                return created, True
+            except Exception as e:
+                if _status_code(e) != 400:
+                    raise
+                message = _error_message(e)
+                if "details" in message.lower():
+                    _inline_details_supported = False
+                    logger.warning(f"Detalhes inline recusados pelo Graph ({message}); usando PATCH dos detalhes")
+                else:
+                    logger.warning(f"Erro 400 ao criar a tarefa com detalhes ({message}); tentando sem os detalhes")
+
+        return await self.create_task(plan_task, group_id, target, user_id, categories), False
+
+    async def create_task(
+        self,
+        plan_task: Task,
+        group_id: str,
+        target: dict,
+        user_id: str,
+        categories: Optional[Dict[str, bool]] = None,
+        details: Optional[PlannerTaskDetails] = None
+    ):
+        """
+        Cria a tarefa com o plano/bucket, o responsável e as categorias já resolvidos.
+        Sem categories, os labels da tarefa são enviados como estão.
+        """
+        if categories is None:
+            categories = {label: True for label in plan_task.labels}
 
         try:
-
-            plan = await self.get_backlog_plan_by_group_id(group_id)
-            plan_id = plan["id"]
-
-            bucket = await self.get_bucket_id_by_plan_id(plan_id)
-            bucket_id = bucket["id"]
-
-            user = await self.get_user_id_by_email(plan_task.responsible_email)
-
             task = PlannerTask(
-                plan_id=plan_id,
-                bucket_id=bucket_id,
+                plan_id=target["plan_id"],
+                bucket_id=target["bucket_id"],
                 title=plan_task.title,
                 applied_categories= PlannerAppliedCategories(
-                    additional_data=labels
+                    additional_data=categories
                 ),
                 assignments=PlannerAssignments(
                     additional_data={
-                        user.id: {
+                        user_id: {
                             "@odata.type": "microsoft.graph.plannerAssignment", 
                             "orderHint": " !"
                         },
 
                     }
-                )
+                ),
+                details=details
             )
 
-            plan_task_created = await self.graph_client.planner.tasks.post(body=task)
-
-            if plan_task_created and plan_task.description:
-                await self.insert_details_in_task(plan_task_created.id, plan_task)
-
-            return plan_task_created
+            return await self.graph_client.planner.tasks.post(body=task)
         
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Erro ao salvar task: {error_msg}")
             if "404" in error_msg:
                 logger.error(f"Grupo {group_id} não encontrado ou sem Planner habilitado")
+                # O plano ou bucket em cache pode ter sido removido
+                invalidate_plan_cache(group_id)
             raise
 
     
+    async def resolve_plan_and_bucket(self, group_id: str, refresh: bool = False) -> dict:
+        """
+        Resolve o plano e o bucket onde as tarefas do grupo são criadas.
+        O resultado fica em cache por grupo; refresh força uma nova consulta.
+        """
+        if refresh:
+            _plan_bucket_cache.invalidate(group_id)
+
+        return await _plan_bucket_cache.get_or_load(group_id, lambda: self._load_plan_and_bucket(group_id))
+
+    async def _load_plan_and_bucket(self, group_id: str) -> dict:
+        plan = await self.get_backlog_plan_by_group_id(group_id)
+        if plan is None:
+            raise ValueError(f"Nenhum plano encontrado para o grupo {group_id}")
+
+        bucket = await self.get_bucket_id_by_plan_id(plan["id"])
+        if bucket is None:
+            raise ValueError(f"Nenhum bucket encontrado para o plano {plan['id']}")
+
+        return {"plan_id": plan["id"], "bucket_id": bucket["id"]}
+
     async def get_backlog_plan_by_group_id(self, group_id: str):
+        """
+        Retorna o plano do grupo com o título PLANNER_PLAN_NAME (ou o primeiro, se não houver).
+        """
+        request_configuration = RequestConfiguration(
+            query_parameters=PlansRequestBuilder.PlansRequestBuilderGetQueryParameters(
+                select=["id", "title"]
+            )
+        )
 
         try:
-            plans = await self.graph_client.groups.by_group_id(group_id).planner.plans.get()
-
-            plans_data = []
-            if hasattr(plans, 'value'):
-
-                for plan in plans.value:
-                    created_by_info = {}
-                    if hasattr(plan.created_by, 'user') and plan.created_by.user:
-                        created_by_info = {
-                            "user_id": plan.created_by.user.id,
-                            "display_name": plan.created_by.user.display_name
-                        }
-                    elif hasattr(plan.created_by, 'application') and plan.created_by.application:
-                        created_by_info = {
-                            "application_id": plan.created_by.application.id,
-                            "display_name": plan.created_by.application.display_name
-                        }
-                    
-                    plan_info = {
-                        "id": plan.id,
-                        "title": plan.title,
-                        "description": getattr(plan, 'description', None),
-                        "created_by": created_by_info,
-                        "created_datetime": getattr(plan, 'created_date_time', None),
-                        "owner": getattr(plan, 'owner', None),
-                        "container": {
-                            "container_id": plan.container.container_id,
-                            "type": str(plan.container.type),
-                            "url": getattr(plan.container, 'url', None)
-                        } if hasattr(plan, 'container') and plan.container else None
-                    }
+            plans_request = self.graph_client.groups.by_group_id(group_id).planner.plans
+            plans = await plans_request.get(request_configuration=request_configuration)
+            plans_data = [{"id": plan.id, "title": plan.title} for plan in plans.value or []]
 
-                    plans_data.append(plan_info)
+            while plans.odata_next_link:
+                plans = await plans_request.with_url(plans.odata_next_link).get()
+                plans_data.extend({"id": plan.id, "title": plan.title} for plan in plans.value or [])
+
+            return _select_by_name(plans_data, "title", PLANNER_PLAN_NAME, f"plano do grupo {group_id}")
 
-            return plans_data[0]
-            
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Erro ao buscar plans para grupo {group_id}: {error_msg}")
@@ -117,18 +179,30 @@ class PlannerService:
         
 
     async def get_bucket_id_by_plan_id(self, plan_id: str):
+        """
+        Retorna o bucket do plano com o nome PLANNER_BUCKET_NAME (ou o primeiro, se não houver).
+        """
+        request_configuration = RequestConfiguration(
+            query_parameters=BucketsRequestBuilder.BucketsRequestBuilderGetQueryParameters(
+                select=["id", "name"]
+            )
+        )
+
         try:
-            plan_buckets = await self.graph_client.planner.plans.by_planner_plan_id(plan_id).buckets.get()
+            buckets_request = self.graph_client.planner.plans.by_planner_plan_id(plan_id).buckets
+            plan_buckets = await buckets_request.get(request_configuration=request_configuration)
+            buckets_data = [{"id": bucket.id, "name": bucket.name} for bucket in plan_buckets.value or []]
 
-            if hasattr(plan_buckets, 'value') and plan_buckets.value:
+            while plan_buckets.odata_next_link:
+                plan_buckets = await buckets_request.with_url(plan_buckets.odata_next_link).get()
+                buckets_data.extend({"id": bucket.id, "name": bucket.name} for bucket in plan_buckets.value or [])
 
-                return {
-                    "id": plan_buckets.value[0].id,
-                }
-            else:
+            if not buckets_data:
                 logger.warning(f"Nenhum bucket encontrado para o plan {plan_id}")
                 return None
 
+            return _select_by_name(buckets_data, "name", PLANNER_BUCKET_NAME, f"bucket do plano {plan_id}")
+
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Erro ao buscar buckets para plan {plan_id}: {error_msg}")
@@ -138,41 +212,100 @@ class PlannerService:
             raise
         
 
-    async def insert_details_in_task(self, task_id: str, plan_task: Task):
-        try:
-            
-            details = f"Cliente: {plan_task.client}"
-            details += f"\nContrato: {plan_task.contract}"
-            details += f"\nSolicitante: {plan_task.requester_email}"
-            details += f"\n\nDescrição: {plan_task.description}"
-            
-            updated_details = PlannerTaskDetails()
-            updated_details.description = details
-
-            details_etag = await self.get_task_details_etag(task_id)
+    def build_task_details(self, plan_task: Task) -> PlannerTaskDetails:
+        details = f"Cliente: {plan_task.client}"
+        details += f"\nContrato: {plan_task.contract}"
+        details += f"\nSolicitante: {plan_task.requester_email}"
+        details += f"\n\nDescrição: {plan_task.description}"
+        
+        updated_details = PlannerTaskDetails()
+        updated_details.description = details
 
-            request_configuration = RequestConfiguration()
-            request_configuration.headers.add("If-Match", details_etag)
+        return updated_details
 
-            await self.graph_client.planner.tasks.by_planner_task_id(task_id).details.patch(
-                updated_details, 
-                request_configuration=request_configuration
-            )
-            
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Erro ao inserir detalhes na task {task_id}: {error_msg}")
-            
-            if "400" in error_msg and "format of value" in error_msg.lower():
-                logger.error(f"Formato de ETag inválido para task {task_id}. Verifique se o ETag está sendo obtido corretamente.")
-            
-            raise
+    async def insert_details_in_task(self, task_id: str, plan_task: Task):
+        """
+        Atualiza os detalhes da tarefa; se o ETag ficar desatualizado (412),
+        busca o novo ETag e tenta novamente.
+        """
+        updated_details = self.build_task_details(plan_task)
+        details_request = self.graph_client.planner.tasks.by_planner_task_id(task_id).details
+
+        for attempt in range(PLANNER_ETAG_MAX_RETRIES + 1):
+            try:
+                details_etag = await self.get_task_details_etag(task_id)
+
+                request_configuration = RequestConfiguration()
+                request_configuration.headers.add("If-Match", details_etag)
+
+                await details_request.patch(
+                    updated_details, 
+                    request_configuration=request_configuration
+                )
+                return
+                
+            except Exception as e:
+                if _status_code(e) == 412 and attempt < PLANNER_ETAG_MAX_RETRIES:
+                    logger.warning(f"ETag dos detalhes da task {task_id} desatualizado; tentando novamente")
+                    continue
+
+                error_msg = str(e)
+                logger.error(f"Erro ao inserir detalhes na task {task_id}: {error_msg}")
+                
+                if "400" in error_msg and "format of value" in error_msg.lower():
+                    logger.error(f"Formato de ETag inválido para task {task_id}. Verifique se o ETag está sendo obtido corretamente.")
+                
+                raise
 
     async def get_user_id_by_email(self, email: str):
-        user = await self.graph_client.users.by_user_id(email).get()
+        user = await self.directory_service.resolve(email)
+        if user is None:
+            raise ValueError(f"Usuário {email} não encontrado no diretório")
         return user
 
     async def get_task_details_etag(self, task_id: str):
         existing_details = await self.graph_client.planner.tasks.by_planner_task_id(task_id).details.get()
         etag = existing_details.additional_data.get('@odata.etag')
-        return etag
\ No newline at end of file
+        return etag
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "response_status_code", None)
+
+
+def _error_message(error: Exception) -> str:
+    # ODataError do SDK traz a mensagem do Graph em error.message
+    odata_error = getattr(error, "error", None)
+    return getattr(odata_error, "message", None) or str(error)
+
+
+def _select_by_name(items: List[dict], key: str, name: str, description: str) -> Optional[dict]:
+    """
+    Escolhe o item cujo nome é igual a name (sem diferenciar maiúsculas);
+    sem correspondência, usa o primeiro item da lista.
+    """
+    if not items:
+        return None
+
+    if name:
+        for item in items:
+            if (item[key] or "").strip().lower() == name.strip().lower():
+                return item
+
+        logger.warning(f"'{name}' não encontrado como {description}; usando '{items[0][key]}'")
+
+    return items[0]
+
+
+def invalidate_plan_cache(group_id: Optional[str] = None):
+    """
+    Remove do cache o plano/bucket de um grupo, ou de todos quando nenhum grupo é informado.
+    """
+    if group_id:
+        _plan_bucket_cache.invalidate(group_id)
+    else:
+        _plan_bucket_cache.clear()
+
+
+def plan_cache_stats() -> dict:
+    return _plan_bucket_cache.stats()
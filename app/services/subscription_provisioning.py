@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from fastapi import Depends
+from kiota_abstractions.base_request_configuration import RequestConfiguration
+from msgraph.generated.groups.item.members.graph_user.graph_user_request_builder import GraphUserRequestBuilder
+
+from config import (
+    SUBSCRIPTION_PROVISIONING_CONCURRENCY,
+    SUBSCRIPTION_MAX_PER_MAILBOX,
+    SUBSCRIPTION_MAX_TOTAL,
+)
+from models.subscription import MailboxSubscriptionResult
+from services.client import GraphClient, get_graph_client
+from services.directory_service import DirectoryService, DirectoryUser
+from services.subscription_service import SubscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionProvisioningService:
+    """
+    Cria subscriptions para várias caixas de correio de uma só vez.
+
+    A criação roda com concorrência limitada (o retry de 429 fica a cargo do SDK),
+    respeita os limites de subscriptions por caixa de correio e da aplicação, e é
+    idempotente: as caixas são identificadas pelo id do diretório (informadas por
+    UPN ou por id) e as que já têm subscription ativa para o recurso são ignoradas,
+    então um provisionamento interrompido pode ser simplesmente repetido.
+    """
+
+    def __init__(
+        self,
+        graph_client: GraphClient = Depends(get_graph_client),
+        subscription_service: SubscriptionService = Depends(SubscriptionService),
+        directory_service: DirectoryService = Depends(DirectoryService)
+    ):
+        self.client = graph_client.client
+        self.subscription_service = subscription_service
+        self.directory_service = directory_service
+        self.registry = subscription_service.registry
+
+    async def expand_group_members(self, group_id: str) -> List[str]:
+        """
+        Lista os usuários de um grupo (com paginação) e retorna seus ids.
+        """
+        request_configuration = RequestConfiguration(
+            query_parameters=GraphUserRequestBuilder.GraphUserRequestBuilderGetQueryParameters(
+                select=["id", "userPrincipalName", "mail"],
+                top=999
+            )
+        )
+
+        members_request = self.client.groups.by_group_id(group_id).members.graph_user
+        result = await members_request.get(request_configuration=request_configuration)
+        users = [user.id for user in result.value or []]
+
+        while result.odata_next_link:
+            result = await members_request.with_url(result.odata_next_link).get()
+            users.extend(user.id for user in result.value or [])
+
+        logger.info(f"Grupo {group_id} expandido em {len(users)} usuários")
+        return users
+
+    async def provision(
+        self,
+        users: List[str],
+        resource_template: str = "users/{user}/messages",
+        change_type: str = "created",
+        group_id: Optional[str] = None
+    ) -> List[MailboxSubscriptionResult]:
+        """
+        Cria as subscriptions das caixas de correio informadas e/ou dos membros do grupo.
+
+        Returns:
+            O resultado de cada caixa de correio, na ordem de entrada
+        """
+        requested = list(dict.fromkeys(user.strip() for user in users if user.strip()))
+        if group_id:
+            requested.extend(user for user in await self.expand_group_members(group_id) if user not in requested)
+
+        # UPN e id do mesmo usuário são a mesma caixa de correio: a deduplicação e a
+        # busca de subscriptions existentes usam o usuário resolvido no diretório
+        directory = await self.directory_service.resolve_many(requested)
+        mailboxes: List[Tuple[str, Optional[DirectoryUser]]] = []
+        seen = set()
+        for user in requested:
+            directory_user = directory.get(user.lower())
+            identity = directory_user.id.lower() if directory_user else user.lower()
+            if identity not in seen:
+                seen.add(identity)
+                mailboxes.append((user, directory_user))
+
+        semaphore = asyncio.Semaphore(SUBSCRIPTION_PROVISIONING_CONCURRENCY)
+        remaining = max(SUBSCRIPTION_MAX_TOTAL - await self.registry.count_active(), 0)
+        total_lock = asyncio.Lock()
+
+        async def provision_mailbox(user: str, directory_user: Optional[DirectoryUser]) -> MailboxSubscriptionResult:
+            nonlocal remaining
+            result = MailboxSubscriptionResult(user=user, resource=resource_template, status="failed")
+            reserved = False
+
+            async with semaphore:
+                try:
+                    if directory_user is None:
+                        raise ValueError(f"Usuário {user} não encontrado no diretório")
+
+                    result.resource = resource_template.format(user=directory_user.id)
+
+                    # Subscriptions anteriores podem ter sido criadas pelo UPN ou pelo id
+                    aliases = list(dict.fromkeys(
+                        alias for alias in (directory_user.id, directory_user.user_principal_name) if alias
+                    ))
+                    for alias in aliases:
+                        existing = await self.registry.find_active(resource_template.format(user=alias), change_type)
+                        if existing:
+                            result.status = "existing"
+                            result.subscription_id = existing["id"]
+                            return result
+
+                    active = 0
+                    for alias in aliases:
+                        active += await self.registry.count_active(alias)
+                    if active >= SUBSCRIPTION_MAX_PER_MAILBOX:
+                        result.status = "limit_reached"
+                        result.error = "Limite de subscriptions da caixa de correio atingido"
+                        return result
+
+                    async with total_lock:
+                        if remaining <= 0:
+                            result.status = "limit_reached"
+                            result.error = "Limite de subscriptions da aplicação atingido"
+                            return result
+                        remaining -= 1
+                        reserved = True
+
+                    subscription = await self.subscription_service.create_subscription(result.resource, change_type)
+                    result.status = "created"
+                    result.subscription_id = subscription.id
+
+                except Exception as e:
+                    result.error = str(e)
+                    if reserved:
+                        async with total_lock:
+                            remaining += 1
+
+            return result
+
+        results = await asyncio.gather(*(provision_mailbox(user, directory_user) for user, directory_user in mailboxes))
+
+        summary = {}
+        for result in results:
+            summary[result.status] = summary.get(result.status, 0) + 1
+        logger.info(f"Provisionamento de subscriptions concluído: {summary}")
+
+        return results
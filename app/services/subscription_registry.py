@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import SUBSCRIPTION_REGISTRY_PATH
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "id", "resource", "change_type", "mailbox", "expiration", "client_state",
+    "notification_url", "lifecycle_notification_url", "include_resource_data",
+    "created_at", "updated_at"
+)
+
+
+class SubscriptionRegistry:
+    """
+    Registro local (SQLite) das subscriptions criadas pela aplicação.
+
+    É mantido em sincronia por create/delete/renew e reconciliado com o Graph,
+    permitindo listar e consultar subscriptions sem chamadas ao Graph.
+    """
+
+    def __init__(self, path: str = SUBSCRIPTION_REGISTRY_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                id TEXT PRIMARY KEY,
+                resource TEXT,
+                change_type TEXT,
+                mailbox TEXT,
+                expiration TEXT,
+                client_state TEXT,
+                notification_url TEXT,
+                lifecycle_notification_url TEXT,
+                include_resource_data INTEGER,
+                created_at TEXT,
+                updated_at TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_subscriptions_mailbox ON subscriptions (mailbox)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_subscriptions_expiration ON subscriptions (expiration)")
+        self._conn.commit()
+
+        # Cópia em memória dos ids para a verificação das notificações recebidas
+        self._ids: Set[str] = {row["id"] for row in self._conn.execute("SELECT id FROM subscriptions")}
+
+    def contains(self, subscription_id: str) -> bool:
+        """
+        Verifica (em memória) se a subscription está registrada.
+        """
+        return subscription_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def snapshot_ids(self) -> Set[str]:
+        """
+        Cópia dos ids registrados, tirada antes de listar as subscriptions no Graph (ver reconcile).
+        """
+        return set(self._ids)
+
+    async def upsert(self, subscription):
+        """
+        Registra ou atualiza uma subscription retornada pelo SDK do Graph.
+        """
+        record = subscription_to_record(subscription)
+        await asyncio.to_thread(self._upsert_many, [record])
+
+    async def update_expiration(self, subscription_id: str, expiration: Any):
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE subscriptions SET expiration = ?, updated_at = ? WHERE id = ?",
+            (_to_iso(expiration), _now(), subscription_id)
+        )
+
+    async def delete(self, subscription_id: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM subscriptions WHERE id = ?", (subscription_id,))
+        self._ids.discard(subscription_id)
+
+    async def get(self, subscription_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(self._query, "SELECT * FROM subscriptions WHERE id = ?", (subscription_id,))
+        return rows[0] if rows else None
+
+    async def list(
+        self,
+        resource: Optional[str] = None,
+        change_type: Optional[str] = None,
+        mailbox: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Tuple[List[dict], int]:
+        """
+        Lista as subscriptions registradas com filtros e paginação.
+
+        Returns:
+            Tupla (subscriptions da página, total que atende aos filtros)
+        """
+        conditions, params = [], []
+        if resource:
+            conditions.append("resource LIKE ?")
+            params.append(f"%{resource}%")
+        if change_type:
+            conditions.append("change_type LIKE ?")
+            params.append(f"%{change_type}%")
+        if mailbox:
+            conditions.append("lower(mailbox) = lower(?)")
+            params.append(mailbox)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def query():
+            total = self._query(f"SELECT COUNT(*) AS total FROM subscriptions {where}", params)[0]["total"]
+            rows = self._query(
+                f"SELECT * FROM subscriptions {where} ORDER BY expiration LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            )
+            return rows, total
+
+        return await asyncio.to_thread(query)
+
+    async def find_active(self, resource: str, change_type: str) -> Optional[dict]:
+        """
+        Retorna uma subscription ainda não expirada para o recurso e tipo de alteração
+        (o recurso registrado pode ter um $select adicional).
+        """
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT * FROM subscriptions WHERE (lower(resource) = lower(?) OR lower(resource) LIKE lower(?)) "
+            "AND change_type = ? AND expiration > ? ORDER BY expiration DESC LIMIT 1",
+            (resource, f"{resource}?%", change_type, _now())
+        )
+        return rows[0] if rows else None
+
+    async def count_active(self, mailbox: Optional[str] = None) -> int:
+        """
+        Conta as subscriptions não expiradas, no total ou de uma caixa de correio.
+        """
+        sql = "SELECT COUNT(*) AS total FROM subscriptions WHERE expiration > ?"
+        params: list = [_now()]
+        if mailbox:
+            sql += " AND lower(mailbox) = lower(?)"
+            params.append(mailbox)
+
+        rows = await asyncio.to_thread(self._query, sql, params)
+        return rows[0]["total"]
+
+    async def all(self) -> List[dict]:
+        return await asyncio.to_thread(self._query, "SELECT * FROM subscriptions", ())
+
+    async def reconcile(self, subscriptions: Iterable, known_ids: Optional[Set[str]] = None) -> dict:
+        """
+        Sincroniza o registro com a lista completa de subscriptions do Graph:
+        atualiza as existentes e remove as que não existem mais.
+
+        Args:
+            subscriptions: Subscriptions retornadas pela listagem do Graph
+            known_ids: Ids registrados antes da listagem (snapshot_ids). Só eles podem ser
+                removidos: uma subscription criada enquanto a listagem paginada rodava
+                não aparece nela e não deve sair do registro. Por padrão, os ids atuais.
+        """
+        records = [subscription_to_record(subscription) for subscription in subscriptions]
+        remote_ids = {record["id"] for record in records}
+        removed = (self._ids if known_ids is None else known_ids & self._ids) - remote_ids
+
+        def sync():
+            self._upsert_many(records)
+            with self._lock:
+                self._conn.executemany("DELETE FROM subscriptions WHERE id = ?", [(i,) for i in removed])
+                self._conn.commit()
+
+        await asyncio.to_thread(sync)
+        self._ids -= removed
+
+        logger.info(f"Registro de subscriptions reconciliado: {len(records)} ativas, {len(removed)} removidas")
+        return {"active": len(records), "removed": len(removed)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _upsert_many(self, records: List[dict]):
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS if column not in ("id", "created_at"))
+
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO subscriptions ({', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                [tuple(record[column] for column in _COLUMNS) for record in records]
+            )
+            self._conn.commit()
+
+        self._ids.update(record["id"] for record in records)
+
+    def _execute(self, sql: str, params: Iterable):
+        with self._lock:
+            self._conn.execute(sql, tuple(params))
+            self._conn.commit()
+
+    def _query(self, sql: str, params: Iterable) -> List[dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, tuple(params))]
+
+
+def mailbox_from_resource(resource: Optional[str]) -> Optional[str]:
+    """
+    Extrai o usuário (id ou UPN) de um recurso como "users/{id}/messages".
+    """
+    parts = (resource or "").strip("/").split("/")
+    if len(parts) > 1 and parts[0].lower() == "users":
+        return parts[1]
+    return None
+
+
+def subscription_to_record(subscription) -> Dict[str, Any]:
+    """
+    Converte uma subscription do SDK do Graph em um registro do SQLite.
+    """
+    now = _now()
+    return {
+        "id": subscription.id,
+        "resource": subscription.resource,
+        "change_type": subscription.change_type,
+        "mailbox": mailbox_from_resource(subscription.resource),
+        "expiration": _to_iso(subscription.expiration_date_time),
+        "client_state": subscription.client_state,
+        "notification_url": subscription.notification_url,
+        "lifecycle_notification_url": subscription.lifecycle_notification_url,
+        "include_resource_data": int(bool(subscription.include_resource_data)),
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def _to_iso(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+    return value
+
+
+def _now() -> str:
+    return _to_iso(datetime.now(timezone.utc))
+
+
+_registry: Optional[SubscriptionRegistry] = None
+
+
+def get_subscription_registry() -> SubscriptionRegistry:
+    """
+    Retorna o registro compartilhado, abrindo o SQLite na primeira chamada.
+    """
+    global _registry
+
+    if _registry is None:
+        _registry = SubscriptionRegistry()
+
+    return _registry
+
+
+def close_subscription_registry():
+    """
+    Fecha o SQLite (usado no shutdown da aplicação).
+    """
+    global _registry
+
+    if _registry is not None:
+        _registry.close()
+        _registry = None
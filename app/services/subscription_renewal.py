@@ -0,0 +1,270 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from config import (
+    SUBSCRIPTION_RENEWAL_LEAD_MINUTES,
+    SUBSCRIPTION_RENEWAL_CHECK_INTERVAL,
+    SUBSCRIPTION_RENEWAL_BATCH_SIZE,
+    SUBSCRIPTION_RENEWAL_BATCH_INTERVAL,
+)
+
+if TYPE_CHECKING:
+    from services.subscription_service import SubscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrackedSubscription:
+    id: str
+    resource: Optional[str]
+    change_type: Optional[str]
+    expiration: datetime
+
+
+class SubscriptionRenewalScheduler:
+    """
+    Acompanha a expiração das subscriptions e as renova antes do vencimento,
+    em lotes pequenos e espaçados para manter constante a carga no Graph.
+
+    Também reage às notificações de ciclo de vida (lifecycle) enviadas pelo Graph.
+    """
+
+    def __init__(
+        self,
+        subscription_service: "SubscriptionService",
+        lead_time: timedelta = timedelta(minutes=SUBSCRIPTION_RENEWAL_LEAD_MINUTES),
+        check_interval: float = SUBSCRIPTION_RENEWAL_CHECK_INTERVAL,
+        batch_size: int = SUBSCRIPTION_RENEWAL_BATCH_SIZE,
+        batch_interval: float = SUBSCRIPTION_RENEWAL_BATCH_INTERVAL
+    ):
+        self.subscription_service = subscription_service
+        self.lead_time = lead_time
+        self.check_interval = check_interval
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self._subscriptions: Dict[str, TrackedSubscription] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._event_tasks: Set[asyncio.Task] = set()
+        self._missed_handlers: List[Callable[[dict], Awaitable[None]]] = []
+
+        self.renewed = 0
+        self.renewal_failures = 0
+        self.recreated = 0
+
+    def track(self, subscription_id: str, expiration: Union[datetime, str], resource: str = None, change_type: str = None):
+        """
+        Passa a acompanhar (ou atualiza) a expiração de uma subscription.
+        """
+        self._subscriptions[subscription_id] = TrackedSubscription(
+            id=subscription_id,
+            resource=resource,
+            change_type=change_type,
+            expiration=_parse_expiration(expiration)
+        )
+
+    def track_subscription(self, subscription):
+        """
+        Acompanha uma subscription retornada pelo SDK do Graph.
+        """
+        self.track(subscription.id, subscription.expiration_date_time, subscription.resource, subscription.change_type)
+
+    def untrack(self, subscription_id: str):
+        self._subscriptions.pop(subscription_id, None)
+
+    def on_missed(self, handler: Callable[[dict], Awaitable[None]]):
+        """
+        Registra um handler chamado quando o Graph avisa que notificações foram perdidas.
+        """
+        self._missed_handlers.append(handler)
+
+    async def load(self):
+        """
+        Reconcilia o registro local com o Graph e acompanha as subscriptions registradas.
+        Se o Graph estiver indisponível, usa o que já está no registro.
+        """
+        try:
+            await self.subscription_service.reconcile_subscriptions()
+        except Exception as e:
+            logger.error(f"Erro ao reconciliar subscriptions, usando o registro local: {e}")
+
+        for record in await self.subscription_service.registry.all():
+            self.track(record["id"], record["expiration"], record["resource"], record["change_type"])
+        logger.info(f"{len(self._subscriptions)} subscriptions acompanhadas para renovação")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="subscription-renewal")
+
+    async def stop(self):
+        tasks = list(self._event_tasks)
+        if self._task:
+            tasks.append(self._task)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        now = datetime.now(timezone.utc)
+        next_expiration = min((s.expiration for s in self._subscriptions.values()), default=None)
+        return {
+            "tracked": len(self._subscriptions),
+            "due": len(self._due(now)),
+            "next_expiration": next_expiration.isoformat() if next_expiration else None,
+            "renewed": self.renewed,
+            "renewal_failures": self.renewal_failures,
+            "recreated": self.recreated
+        }
+
+    async def renew_due(self):
+        """
+        Renova as subscriptions que expiram dentro do lead_time, em lotes espaçados.
+        """
+        due = self._due(datetime.now(timezone.utc))
+        if not due:
+            return
+
+        logger.info(f"Renovando {len(due)} subscriptions")
+        for start in range(0, len(due), self.batch_size):
+            if start:
+                await asyncio.sleep(self.batch_interval)
+            batch = due[start:start + self.batch_size]
+            await asyncio.gather(*(self.renew(subscription.id) for subscription in batch))
+
+    async def renew(self, subscription_id: str) -> bool:
+        """
+        Renova uma subscription; se ela não existir mais no Graph, tenta recriá-la.
+        """
+        try:
+            response = await self.subscription_service.renew_subscription(subscription_id)
+            tracked = self._subscriptions.get(subscription_id)
+            if tracked:
+                tracked.expiration = _parse_expiration(response.expiration_date_time)
+            self.renewed += 1
+            return True
+
+        except Exception as e:
+            self.renewal_failures += 1
+            if getattr(e, "response_status_code", None) == 404:
+                logger.warning(f"Subscription {subscription_id} não existe mais no Graph")
+                await self.recreate(subscription_id)
+            return False
+
+    async def recreate(self, subscription_id: str):
+        """
+        Recria uma subscription removida com o mesmo recurso e tipo de alteração.
+        """
+        tracked = self._subscriptions.pop(subscription_id, None)
+        # A subscription antiga não existe mais no Graph: sai do registro antes de criar a nova
+        await self.subscription_service.registry.delete(subscription_id)
+
+        if not tracked or not tracked.resource:
+            logger.warning(f"Sem dados para recriar a subscription {subscription_id}")
+            return None
+
+        subscription = await self.subscription_service.create_subscription(
+            resource=tracked.resource,
+            change_type=tracked.change_type or "created"
+        )
+        self.recreated += 1
+        logger.info(f"Subscription {subscription_id} recriada como {subscription.id}")
+        return subscription
+
+    def handle_lifecycle_event(self, item: dict):
+        """
+        Agenda o tratamento de um item de notificação de ciclo de vida sem bloquear a resposta ao Graph.
+        """
+        task = asyncio.create_task(self._handle_lifecycle_event(item))
+        self._event_tasks.add(task)
+        task.add_done_callback(self._event_tasks.discard)
+
+    async def _handle_lifecycle_event(self, item: dict):
+        event = item.get("lifecycleEvent")
+        subscription_id = item.get("subscriptionId")
+
+        try:
+            logger.info(f"Evento de ciclo de vida {event} para subscription {subscription_id}")
+
+            if event == "reauthorizationRequired":
+                # Renovar a subscription também a reautoriza
+                await self.renew(subscription_id)
+
+            elif event == "subscriptionRemoved":
+                await self.recreate(subscription_id)
+
+            elif event == "missed":
+                if not self._missed_handlers:
+                    logger.warning(
+                        f"Notificações perdidas na subscription {subscription_id} sem recuperação "
+                        f"configurada (DELTA_SYNC_ENABLED desligado)"
+                    )
+                for handler in self._missed_handlers:
+                    await handler(item)
+
+            else:
+                logger.warning(f"Evento de ciclo de vida desconhecido: {event}")
+
+        except Exception as e:
+            logger.error(f"Erro ao tratar evento {event} da subscription {subscription_id}: {e}")
+
+    def _due(self, now: datetime) -> List[TrackedSubscription]:
+        limit = now + self.lead_time
+        return sorted(
+            (s for s in self._subscriptions.values() if s.expiration <= limit),
+            key=lambda s: s.expiration
+        )
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Erro ao carregar subscriptions para renovação: {e}")
+
+        while True:
+            try:
+                await self.renew_due()
+            except Exception as e:
+                logger.error(f"Erro na renovação de subscriptions: {e}")
+            await asyncio.sleep(self.check_interval)
+
+
+def _parse_expiration(value: Union[datetime, str, None]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+_scheduler: Optional[SubscriptionRenewalScheduler] = None
+
+
+def start_renewal_scheduler(subscription_service: "SubscriptionService") -> SubscriptionRenewalScheduler:
+    """
+    Cria o scheduler e inicia o loop de renovação, que começa carregando as
+    subscriptions existentes (usado no startup da aplicação).
+    """
+    global _scheduler
+
+    _scheduler = SubscriptionRenewalScheduler(subscription_service)
+    _scheduler.start()
+    return _scheduler
+
+
+def get_renewal_scheduler() -> Optional[SubscriptionRenewalScheduler]:
+    return _scheduler
+
+
+async def stop_renewal_scheduler():
+    global _scheduler
+
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
@@ -1,17 +1,56 @@
 import logging
+import random
+from typing import List, Optional
 
 from fastapi import Depends
-from services.client import GraphClient
+from services.client import GraphClient, get_graph_client
 from datetime import datetime, timedelta, timezone
 from msgraph.generated.models.subscription import Subscription
 
-from config import CLIENT_SECRET_STATE, SUBSCRIPTION_EXPIRATION_DAYS, WEBHOOK_LIFECYCLE_ENDPOINT, WEBHOOK_NOTIFICATION_ENDPOINT
+from config import (
+    CLIENT_SECRET_STATE,
+    SUBSCRIPTION_EXPIRATION_DAYS,
+    WEBHOOK_LIFECYCLE_ENDPOINT,
+    WEBHOOK_NOTIFICATION_ENDPOINT,
+    RICH_NOTIFICATIONS_ENABLED,
+    ENCRYPTION_CERTIFICATE,
+    ENCRYPTION_CERTIFICATE_ID,
+    SUBSCRIPTION_RENEWAL_JITTER_MINUTES,
+)
+from services.email_service import MESSAGE_SELECT_PROFILES
+from services.subscription_registry import SubscriptionRegistry, get_subscription_registry
+from services.subscription_renewal import get_renewal_scheduler
+
+# Subscriptions de mensagens com dados (rich notifications) expiram em no máximo 1 dia
+RICH_SUBSCRIPTION_MAX_EXPIRATION = timedelta(minutes=1440 - 5)
 
 logger = logging.getLogger(__name__)
 
+
+def build_expiration_date(jitter_minutes: float = 0) -> str:
+    """
+    Calcula a data de expiração de uma subscription (máximo de 3 dias, ou 1 dia com
+    rich notifications), antecipada em até jitter_minutes para espalhar as renovações.
+    """
+    expiration_delta = timedelta(days=SUBSCRIPTION_EXPIRATION_DAYS)
+    if RICH_NOTIFICATIONS_ENABLED:
+        expiration_delta = min(expiration_delta, RICH_SUBSCRIPTION_MAX_EXPIRATION)
+
+    if jitter_minutes:
+        expiration_delta -= timedelta(minutes=random.uniform(0, jitter_minutes))
+
+    expiration_date = datetime.now(timezone.utc) + expiration_delta
+    return expiration_date.isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
 class SubscriptionService:
-    def __init__(self, graph_client: GraphClient = Depends(GraphClient)):
+    def __init__(
+        self,
+        graph_client: GraphClient = Depends(get_graph_client),
+        registry: SubscriptionRegistry = Depends(get_subscription_registry)
+    ):
         self.client = graph_client.client
+        self.registry = registry
 
     async def create_subscription(self, resource: str, change_type: str = "created"):
         """
@@ -28,9 +67,8 @@ class SubscriptionService:
         # Link para documentaçao https://learn.microsoft.com/en-us/graph/api/resources/subscription?view=graph-rest-1.0
 
         try:
-            # Data de expiração (máximo de 3 dias)
-            expiration_date = datetime.now(timezone.utc) + timedelta(days=SUBSCRIPTION_EXPIRATION_DAYS)
-            expiration_string = expiration_date.isoformat(timespec='seconds').replace('+00:00', 'Z')
+            # Data de expiração, com jitter para que subscriptions criadas juntas não expirem juntas
+            expiration_string = build_expiration_date(SUBSCRIPTION_RENEWAL_JITTER_MINUTES)
 
             subscription = Subscription()
 
@@ -43,13 +81,16 @@ class SubscriptionService:
 
             # URL opcional para onde o Microsoft Graph enviará notificações sobre o ciclo de vida da subscription.
             # Ex: Notificações de expiração iminente, problemas de validação, etc.
-            # subscription.lifecycle_notification_url = WEBHOOK_LIFECYCLE_ENDPOINT
+            subscription.lifecycle_notification_url = WEBHOOK_LIFECYCLE_ENDPOINT
 
             # O recurso do Microsoft Graph a ser monitorado para alterações em algum recurso.
 
             # subscription.resource = f"{resource}?$select=Subject,bodyPreview,importance,receivedDateTime,from,toRecipients,ccRecipients,bccRecipients,hasAttachments,conversationId,conversationIndex,isRead,parentFolderId,receivedDateTime,replyTo,internetMessageId,Id"
             subscription.resource = resource
-            
+
+            if RICH_NOTIFICATIONS_ENABLED and "?" not in resource:
+                # Rich notifications de mensagens exigem $select com os campos que virão na notificação
+                subscription.resource = f"{resource}?$select={','.join(MESSAGE_SELECT_PROFILES['standard'])}"
 
             # A data e hora em que a subscription irá expirar, no formato ISO 8601 (com 'Z' para UTC).
             subscription.expiration_date_time = expiration_string
@@ -59,35 +100,99 @@ class SubscriptionService:
             subscription.client_state = CLIENT_SECRET_STATE
             subscription.latest_supported_tls_version = "v1_2"
 
-            subscription.include_resource_data = False
-            # subscription.encryption_certificate = ENCRYPTION_CERTIFICATE
-            # subscription.encryption_certificate_id = ENCRYPTION_CERTIFICATE_ID
+            # Com rich notifications o Graph envia a mensagem criptografada na própria notificação,
+            # dispensando a busca posterior (ver utils/decrypt_notification.py).
+            subscription.include_resource_data = RICH_NOTIFICATIONS_ENABLED
+            if RICH_NOTIFICATIONS_ENABLED:
+                subscription.encryption_certificate = ENCRYPTION_CERTIFICATE
+                subscription.encryption_certificate_id = ENCRYPTION_CERTIFICATE_ID
             
             logging.info("Criando subscription...")
 
             response = await self.client.subscriptions.post(subscription)
 
             logging.info("Subscription criada com sucesso.")
+
+            await self.registry.upsert(response)
+
+            scheduler = get_renewal_scheduler()
+            if scheduler and response:
+                scheduler.track_subscription(response)
+
             return response
                         
         except Exception as e:
             logging.error(f"Erro ao criar subscription: {e}")
             raise
 
-    async def list_subscriptions(self):
+    async def renew_subscription(self, subscription_id: str, expiration_date_time: Optional[str] = None):
+        """
+        Renova uma subscription, estendendo a data de expiração (também a reautoriza).
+
+        Args:
+            subscription_id: ID da subscription a ser renovada
+            expiration_date_time: Nova data de expiração (ISO 8601); por padrão o máximo permitido
+        """
+        try:
+            subscription = Subscription()
+            subscription.expiration_date_time = expiration_date_time or build_expiration_date(SUBSCRIPTION_RENEWAL_JITTER_MINUTES)
+
+            logging.info(f"Renovando subscription {subscription_id}...")
+            response = await self.client.subscriptions.by_subscription_id(subscription_id).patch(subscription)
+            logging.info(f"Subscription {subscription_id} renovada até {response.expiration_date_time}.")
+
+            await self.registry.update_expiration(subscription_id, response.expiration_date_time)
+            return response
+
+        except Exception as e:
+            logging.error(f"Erro ao renovar subscription {subscription_id}: {e}")
+            raise
+
+    async def fetch_subscriptions(self) -> List[Subscription]:
+        """
+        Busca no Graph todas as subscriptions ativas da aplicação, seguindo o @odata.nextLink.
+        """
+        result = await self.client.subscriptions.get()
+        subscriptions = list(result.value or [])
+
+        while result.odata_next_link:
+            result = await self.client.subscriptions.with_url(result.odata_next_link).get()
+            subscriptions.extend(result.value or [])
+
+        return subscriptions
+
+    async def reconcile_subscriptions(self) -> dict:
+        """
+        Sincroniza o registro local com as subscriptions existentes no Graph.
+        """
+        try:
+            logging.info("Reconciliando subscriptions com o Graph...")
+            known_ids = self.registry.snapshot_ids()
+            return await self.registry.reconcile(await self.fetch_subscriptions(), known_ids)
+        except Exception as e:
+            logging.error(f"Erro ao reconciliar subscriptions: {e}")
+            raise
+
+    async def list_subscriptions(
+        self,
+        resource: Optional[str] = None,
+        change_type: Optional[str] = None,
+        mailbox: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ):
             """
-            Lista todas as subscriptions ativas.
+            Lista as subscriptions ativas a partir do registro local (sem chamadas ao Graph).
+
+            Returns:
+                Tupla (subscriptions da página, total que atende aos filtros)
             """
             try:
                 logging.info("Listando subscriptions...")
-                result = await self.client.subscriptions.get()
+                subscriptions_list, total = await self.registry.list(resource, change_type, mailbox, limit, offset)
 
-                subscriptions_list = []
-                for subscription in result.value:
-                    subscriptions_list.append(subscription.id)
-
-                logging.info(f"Subscriptions encontradas: {len(subscriptions_list)}")
-                return subscriptions_list
+                logging.info(f"Subscriptions encontradas: {total}")
+                return subscriptions_list, total
             except Exception as e:
                 logging.error(f"Erro ao listar subscriptions: {e}")
                 raise
@@ -102,6 +207,11 @@ class SubscriptionService:
         try:
             logging.info(f"Deletando subscription {subscription_id}...")
             await self.client.subscriptions.by_subscription_id(subscription_id).delete()
+            await self.registry.delete(subscription_id)
+
+            scheduler = get_renewal_scheduler()
+            if scheduler:
+                scheduler.untrack(subscription_id)
             logging.info(f"Subscription {subscription_id} deletada com sucesso.")
             return True
         except Exception as e:
@@ -0,0 +1,240 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from config import (
+    AUDIT_LOG_ENABLED,
+    AUDIT_LOG_DIR,
+    AUDIT_LOG_MAX_BYTES,
+    AUDIT_LOG_MAX_AGE_SECONDS,
+    AUDIT_LOG_COMPRESS,
+    AUDIT_LOG_BUFFER_SIZE,
+    AUDIT_LOG_FLUSH_INTERVAL,
+    AUDIT_LOG_SAMPLE_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Grava registros de auditoria em arquivos JSONL (um registro por linha) a partir
+    de uma thread dedicada, sem bloquear o event loop.
+
+    Os segmentos são rotacionados por tamanho ou idade e, opcionalmente,
+    comprimidos com gzip ao serem fechados.
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIT_LOG_DIR,
+        max_bytes: int = AUDIT_LOG_MAX_BYTES,
+        max_age_seconds: float = AUDIT_LOG_MAX_AGE_SECONDS,
+        compress: bool = AUDIT_LOG_COMPRESS,
+        buffer_size: int = AUDIT_LOG_BUFFER_SIZE,
+        flush_interval: float = AUDIT_LOG_FLUSH_INTERVAL,
+        sample_rate: float = AUDIT_LOG_SAMPLE_RATE
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._thread: Optional[threading.Thread] = None
+
+        self._file = None
+        self._file_path: Optional[str] = None
+        self._file_opened_at = 0.0
+        self._file_bytes = 0
+        self._segment = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, endpoint: str, data: Any) -> bool:
+        """
+        Enfileira um registro sem bloquear. Retorna False se foi descartado
+        (amostragem ou buffer cheio).
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+
+        try:
+            self._queue.put_nowait((endpoint, time.time(), data))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Grava o que estiver no buffer e encerra a thread.
+        """
+        if self._thread is None:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "buffered": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "segment": self._file_path
+        }
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._rotate_if_needed()
+                continue
+
+            # Agrupa tudo o que já está no buffer em uma única escrita
+            batch = [first]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(record is _STOP for record in batch)
+            records = [record for record in batch if record is not _STOP]
+
+            try:
+                if records:
+                    self._write_batch(records)
+            except Exception as e:
+                logger.error(f"Erro ao gravar log de auditoria: {e}")
+
+            if stop:
+                self._close_segment()
+                return
+
+    def _write_batch(self, records):
+        self._rotate_if_needed()
+        if self._file is None:
+            self._open_segment()
+
+        lines = []
+        for endpoint, timestamp, data in records:
+            lines.append(json.dumps(
+                {"endpoint": endpoint, "timestamp": timestamp, "data": data},
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=_json_default
+            ))
+
+        chunk = ("\n".join(lines) + "\n").encode("utf-8")
+        self._file.write(chunk)
+        self._file.flush()
+
+        self._file_bytes += len(chunk)
+        self.written += len(records)
+
+    def _rotate_if_needed(self):
+        if self._file is None:
+            return
+
+        too_big = self._file_bytes >= self.max_bytes
+        too_old = time.monotonic() - self._file_opened_at >= self.max_age_seconds
+        if too_big or too_old:
+            self._close_segment()
+
+    def _open_segment(self):
+        self._segment += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._file_path = os.path.join(self.directory, f"audit_{timestamp}_{os.getpid()}_{self._segment}.jsonl")
+        self._file = open(self._file_path, "ab")
+        self._file_opened_at = time.monotonic()
+        self._file_bytes = 0
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+
+        if self.compress and self._file_bytes:
+            with open(self._file_path, "rb") as source, gzip.open(f"{self._file_path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self._file_path)
+
+
+_audit_log_writer: Optional[AuditLogWriter] = None
+
+
+def get_audit_log_writer() -> Optional[AuditLogWriter]:
+    """
+    Retorna o writer compartilhado (iniciado na primeira chamada), ou None quando
+    AUDIT_LOG_ENABLED está desligado.
+    """
+    global _audit_log_writer
+
+    if AUDIT_LOG_ENABLED and _audit_log_writer is None:
+        _audit_log_writer = AuditLogWriter()
+        _audit_log_writer.start()
+
+    return _audit_log_writer
+
+
+def write_audit_record(endpoint: str, data: Any) -> bool:
+    """
+    Registra os dados recebidos/gerados por um endpoint no log de auditoria.
+
+    Args:
+        endpoint: Nome do endpoint ou etapa que gerou o registro
+        data: Dados serializáveis em JSON
+    """
+    writer = get_audit_log_writer()
+    return writer.write(endpoint, data) if writer else False
+
+
+def stop_audit_log_writer():
+    """
+    Grava os registros pendentes e encerra o writer (usado no shutdown da aplicação).
+    """
+    global _audit_log_writer
+
+    if _audit_log_writer is not None:
+        _audit_log_writer.stop()
+        _audit_log_writer = None
+
+
+def _json_default(value: Any) -> Any:
+    # Modelos, headers e e-mails chegam sem conversão; a serialização fica na thread de escrita
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True, exclude_none=True)
+    if isinstance(value, Mapping):
+        return dict(value)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
@@ -0,0 +1,315 @@
+import re
+from html import unescape
+from typing import List, Optional, Tuple
+
+from config import (
+    BODY_COMPACTION_MAX_BYTES,
+    BODY_COMPACTION_STRIP_QUOTES,
+    BODY_COMPACTION_STRIP_SIGNATURES,
+    BODY_COMPACTION_KEEP_ORIGINAL,
+)
+from models.email import Email, EmailBody
+
+TRUNCATION_MARKER = "\n[...]"
+
+# Tokens do HTML: comentário/declaração, tag (abertura/fechamento) ou texto
+_TOKEN = re.compile(r"<!--.*?(?:-->|$)|<[!?][^>]*>|<(/?)([a-zA-Z][^\s/>]*)([^>]*)>|[^<]+|<", re.DOTALL)
+_ATTRIBUTE = re.compile(r"\b(id|class|type)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))", re.IGNORECASE)
+
+# Elementos cujo conteúdo não é texto visível; são pulados até o fechamento
+_RAW_TEXT_CLOSING = {
+    tag: re.compile(f"</{tag}\\s*>", re.IGNORECASE)
+    for tag in ("head", "script", "style", "noscript", "template", "title")
+}
+
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"
+})
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"
+})
+
+# Marcadores do histórico citado: a partir deles o restante do HTML é a conversa anterior
+_REPLY_HEADER_IDS = frozenset({"divrplyfwdmsg", "appendonsend", "mail-editor-reference-message-container"})
+_QUOTE_CLASSES = frozenset({"gmail_quote", "yahoo_quoted", "moz-cite-prefix"})
+_SIGNATURE_IDS = frozenset({"signature", "ms-outlook-mobile-signature"})
+_SIGNATURE_CLASSES = frozenset({"gmail_signature", "moz-signature"})
+# Filtro rápido: só tags com algum desses trechos nos atributos são classificadas
+_MARKER_HINTS = ("rplyfwd", "appendonsend", "reference-message", "quote", "cite", "signature")
+
+# Quebras de linha dos elementos de bloco, preservadas na normalização dos espaços
+_NEWLINE = "\x00"
+_LIST_ITEM = _NEWLINE + "- "
+
+_WHITESPACE = re.compile(r"[ \t\r\n\f\v\u00a0\u200b]+")
+_SPACES = re.compile(r" {2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Cabeçalhos de resposta/encaminhamento em texto (português e inglês)
+_QUOTE_HEADER = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:Em|On)\s[^\n]{0,300}?(?:\n[^\n]{0,200}?)?(?:escreveu|wrote)\s*:[ \t]*$"
+    r"|-{2,}\s*(?:Mensagem original|Original Message|Mensagem encaminhada|Forwarded message)\s*-{2,}"
+    r"|_{10,}\s*$"
+    r"|(?:De|From)\s*:[^\n]*\n[ \t]*(?:Enviado|Enviada|Sent|Data|Date)\s*:"
+    r")",
+    re.IGNORECASE | re.MULTILINE
+)
+_SIGNATURE_DELIMITER = re.compile(r"^-- ?$", re.MULTILINE)
+_MOBILE_SIGNATURE = re.compile(
+    r"^[ \t]*(?:Enviado do meu|Enviado de meu|Sent from my|Obter o Outlook para|Get Outlook for)\b.*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def html_to_text(
+    html: str,
+    strip_quotes: bool = True,
+    strip_signatures: bool = True,
+    max_chars: Optional[int] = None
+) -> Tuple[str, bool]:
+    """
+    Converte HTML em texto simples, quebrando linhas nos elementos de bloco e
+    descartando as subárvores de citação e assinatura.
+
+    Usa um tokenizador por expressão regular em vez de html.parser: e-mails são
+    HTML tolerante, só interessam o nome da tag e os atributos id/class/type, e o
+    texto é decodificado e normalizado uma única vez no final. Com max_chars a
+    conversão para assim que o texto extraído passa do limite.
+
+    Returns:
+        Tupla (texto, interrompido antes do fim do HTML)
+    """
+    parts: List[str] = []
+    append = parts.append
+    length = 0
+    skip_depth = 0
+    skip_until = 0
+    pre_depth = 0
+    cut = False
+
+    for token in _TOKEN.finditer(html):
+        if token.start() < skip_until:
+            continue
+
+        tag = token.group(2)
+
+        if tag is None:
+            if skip_depth:
+                continue
+            text = token.group(0)
+            if text.startswith(("<!", "<?")):
+                continue
+            if pre_depth:
+                text = text.replace("\n", _NEWLINE)
+            append(text)
+            length += len(text)
+            if max_chars is not None and length > max_chars:
+                cut = token.end() < len(html)
+                break
+            continue
+
+        tag = tag.lower()
+
+        if token.group(1):
+            if skip_depth:
+                if tag not in _VOID_TAGS:
+                    skip_depth -= 1
+            elif tag in _BLOCK_TAGS:
+                if tag == "pre" and pre_depth:
+                    pre_depth -= 1
+                if tag not in ("td", "th", "li"):
+                    append(_NEWLINE)
+            continue
+
+        if tag in _RAW_TEXT_CLOSING:
+            closing = _RAW_TEXT_CLOSING[tag].search(html, token.end())
+            skip_until = closing.end() if closing else len(html)
+            continue
+
+        if tag in _VOID_TAGS:
+            if not skip_depth and tag in _BLOCK_TAGS:
+                append(_NEWLINE)
+            continue
+
+        attrs = token.group(3)
+        self_closing = attrs.endswith("/")
+
+        if skip_depth:
+            if not self_closing:
+                skip_depth += 1
+            continue
+
+        if attrs and not self_closing and _has_marker_hint(attrs):
+            action = _classify(tag, attrs, strip_quotes, strip_signatures)
+            if action == "stop":
+                # Início do histórico citado: o restante do documento é descartado
+                break
+            if action == "skip":
+                skip_depth = 1
+                continue
+
+        if tag == "li":
+            append(_LIST_ITEM)
+        elif tag in ("td", "th"):
+            append(" ")
+        elif tag in _BLOCK_TAGS:
+            if tag == "pre" and not self_closing:
+                pre_depth += 1
+            append(_NEWLINE)
+
+    text = "".join(parts)
+    if "&" in text:
+        text = unescape(text)
+    text = _WHITESPACE.sub(" ", text).replace(_NEWLINE, "\n")
+
+    return _tidy(text), cut
+
+
+def _has_marker_hint(attrs: str) -> bool:
+    lowered = attrs.lower()
+    return any(hint in lowered for hint in _MARKER_HINTS)
+
+
+def _classify(tag: str, attrs: str, strip_quotes: bool, strip_signatures: bool) -> Optional[str]:
+    element_id = ""
+    classes = ()
+    cite = False
+
+    for name, *values in _ATTRIBUTE.findall(attrs):
+        value = next((value for value in values if value), "").lower()
+        name = name.lower()
+        if name == "id":
+            element_id = value
+        elif name == "class":
+            classes = value.split()
+        elif value == "cite":
+            cite = True
+
+    if strip_quotes:
+        if element_id in _REPLY_HEADER_IDS:
+            return "stop"
+        if (tag == "blockquote" and cite) or any(name in _QUOTE_CLASSES for name in classes):
+            return "skip"
+
+    if strip_signatures:
+        if element_id in _SIGNATURE_IDS or any(name in _SIGNATURE_CLASSES for name in classes):
+            return "skip"
+
+    return None
+
+
+def strip_quoted_text(text: str, strip_quotes: bool = True, strip_signatures: bool = True) -> str:
+    """
+    Remove do texto o histórico citado ("Em ... escreveu:", "-----Mensagem original-----",
+    linhas com ">") e as assinaturas. Se nada restar, o texto é mantido como veio
+    (ex: encaminhamento sem mensagem nova).
+    """
+    stripped = text
+
+    if strip_quotes:
+        match = _QUOTE_HEADER.search(stripped)
+        if match:
+            stripped = stripped[:match.start()]
+        if ">" in stripped:
+            stripped = "\n".join(line for line in stripped.split("\n") if not line.lstrip().startswith(">"))
+
+    if strip_signatures:
+        match = _SIGNATURE_DELIMITER.search(stripped)
+        if match:
+            stripped = stripped[:match.start()]
+        stripped = _MOBILE_SIGNATURE.sub("", stripped)
+
+    stripped = _tidy(stripped)
+    return stripped or text
+
+
+def truncate_utf8(text: str, max_bytes: int) -> Tuple[str, bool]:
+    """
+    Corta o texto em até max_bytes bytes UTF-8 (marcador incluído), preferindo
+    terminar em uma quebra de linha ou espaço.
+
+    Returns:
+        Tupla (texto, foi cortado)
+    """
+    # Cada caractere ocupa no máximo 4 bytes: textos curtos dispensam a codificação
+    if max_bytes <= 0 or len(text) * 4 <= max_bytes:
+        return text, False
+
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text, False
+
+    budget = max(max_bytes - len(TRUNCATION_MARKER.encode("utf-8")), 0)
+    truncated = encoded[:budget].decode("utf-8", errors="ignore")
+
+    # Recua até o último separador, se ele estiver nos 10% finais
+    boundary = max(truncated.rfind("\n"), truncated.rfind(" "))
+    if boundary >= len(truncated) * 0.9:
+        truncated = truncated[:boundary]
+
+    return truncated.rstrip() + TRUNCATION_MARKER, True
+
+
+def compact_body(
+    body: EmailBody,
+    max_bytes: int = BODY_COMPACTION_MAX_BYTES,
+    strip_quotes: bool = BODY_COMPACTION_STRIP_QUOTES,
+    strip_signatures: bool = BODY_COMPACTION_STRIP_SIGNATURES
+) -> Tuple[EmailBody, bool]:
+    """
+    Compacta o corpo do e-mail: HTML vira texto, histórico citado e assinaturas
+    são removidos e o resultado é cortado em max_bytes.
+
+    Returns:
+        Tupla (corpo em texto, foi cortado)
+    """
+    content = body.content or ""
+    cut = False
+
+    if (body.content_type or "").lower() == "html":
+        # Margem para o que a remoção de citações ainda vai tirar do texto
+        content, cut = html_to_text(
+            content,
+            strip_quotes=strip_quotes,
+            strip_signatures=strip_signatures,
+            max_chars=max_bytes * 2 if max_bytes > 0 else None
+        )
+        if not content and (strip_quotes or strip_signatures):
+            # Só havia citação (ex: encaminhamento sem mensagem nova): mantém o histórico
+            content, cut = html_to_text(
+                body.content or "",
+                strip_quotes=False,
+                strip_signatures=False,
+                max_chars=max_bytes * 2 if max_bytes > 0 else None
+            )
+
+    content = strip_quoted_text(content, strip_quotes, strip_signatures)
+    content, truncated = truncate_utf8(content, max_bytes)
+
+    if cut and not truncated:
+        content += TRUNCATION_MARKER
+
+    return EmailBody(content=content, content_type="text"), cut or truncated
+
+
+def compact_email(email: Email, keep_original: bool = BODY_COMPACTION_KEEP_ORIGINAL) -> Email:
+    """
+    Aplica compact_body ao corpo do e-mail (sem efeito quando o corpo não foi buscado).
+    """
+    if email.body is None or not email.body.content:
+        return email
+
+    if keep_original:
+        email.original_body = email.body
+
+    email.body, email.body_truncated = compact_body(email.body)
+    return email
+
+
+def _tidy(text: str) -> str:
+    lines = [_SPACES.sub(" ", line.strip()) for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
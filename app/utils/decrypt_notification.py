@@ -1,86 +1,207 @@
+import asyncio
 import base64
+import hashlib
+import hmac
 import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-import hmac
-import hashlib
-import logging
 
-from config import PRIVATE_KEY
+from config import (
+    PRIVATE_KEY,
+    ENCRYPTION_CERTIFICATE_ID,
+    ENCRYPTION_PRIVATE_KEY_FILES,
+    ENCRYPTION_WORKERS,
+    ENCRYPTION_DATA_KEY_CACHE_SIZE,
+)
+from models.webhook import EncryptedContent, NotificationItem, NotificationPayload
 
 logger = logging.getLogger(__name__)
 
-def decrypt_data(encrypted_data: str, encrypted_key: str) -> str:
+_OAEP_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA1()),
+    algorithm=hashes.SHA1(),
+    label=None
+)
+
+
+class NotificationSignatureError(ValueError):
+    """
+    O dataSignature não confere com o HMAC-SHA256 dos dados criptografados.
     """
-    Descriptografa os dados do email usando a chave privada do certificado.
-    """    
-    try:
-        # Validação dos parâmetros de entrada
+
+
+class NotificationDecryptor:
+    """
+    Descriptografa o encryptedContent das notificações com dados (rich notifications).
+
+    As chaves privadas são carregadas uma única vez e selecionadas pelo
+    encryptionCertificateId, permitindo a rotação de certificados. O RSA-OAEP roda
+    em um pool de threads e as chaves simétricas já descriptografadas são memorizadas.
+
+    Link para documentação https://learn.microsoft.com/en-us/graph/change-notifications-with-resource-data
+    """
+
+    def __init__(
+        self,
+        private_keys: Dict[str, bytes],
+        default_certificate_id: Optional[str] = None,
+        workers: int = ENCRYPTION_WORKERS,
+        data_key_cache_size: int = ENCRYPTION_DATA_KEY_CACHE_SIZE
+    ):
+        if not private_keys:
+            raise ValueError("Chave privada não configurada")
+
+        self._private_keys = {
+            certificate_id: serialization.load_pem_private_key(pem, password=None)
+            for certificate_id, pem in private_keys.items()
+        }
+        self.default_certificate_id = default_certificate_id or next(iter(self._private_keys))
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decrypt")
+        self._data_keys: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._data_keys_lock = threading.Lock()
+        self._data_key_cache_size = data_key_cache_size
+
+    def decrypt_content(self, encrypted_content: EncryptedContent) -> str:
+        """
+        Valida a assinatura e descriptografa um encryptedContent (chamada síncrona).
+
+        Args:
+            encrypted_content: encryptedContent do item, com data, dataKey, dataSignature e encryptionCertificateId
+        """
+        encrypted_data = encrypted_content.data
+        encrypted_key = encrypted_content.dataKey
+
         if not encrypted_data or not encrypted_key:
             raise ValueError("Dados criptografados ou chave não podem ser nulos")
 
-        if not PRIVATE_KEY:
-            raise ValueError("Chave privada não configurada")
+        data_key = self._get_data_key(encrypted_content.encryptionCertificateId, encrypted_key)
+        encrypted_data_bytes = base64.b64decode(encrypted_data)
+
+        # A assinatura é o HMAC-SHA256 dos dados criptografados usando a chave simétrica
+        expected_signature = hmac.new(data_key, encrypted_data_bytes, hashlib.sha256).digest()
+        signature = base64.b64decode(encrypted_content.dataSignature)
+        if not hmac.compare_digest(expected_signature, signature):
+            raise NotificationSignatureError("Assinatura dos dados criptografados inválida")
+
+        # AES-CBC com IV igual aos primeiros 16 bytes da chave simétrica
+        decryptor = Cipher(algorithms.AES(data_key), modes.CBC(data_key[:16])).decryptor()
+        decrypted_data = decryptor.update(encrypted_data_bytes) + decryptor.finalize()
+
+        # Remove o padding PKCS7
+        padding_length = decrypted_data[-1]
+        if not 1 <= padding_length <= 16:
+            raise ValueError("Padding inválido nos dados descriptografados")
+
+        return decrypted_data[:-padding_length].decode("utf-8")
+
+    async def decrypt(self, encrypted_content: EncryptedContent) -> dict:
+        """
+        Descriptografa um encryptedContent no pool de threads e retorna o JSON do recurso.
+        """
+        loop = asyncio.get_running_loop()
+        decoded_data = await loop.run_in_executor(self._executor, self.decrypt_content, encrypted_content)
+        return json.loads(decoded_data)
 
-        private_key = serialization.load_pem_private_key(
-            PRIVATE_KEY,
-            password=None
+    async def decrypt_notification(self, payload: NotificationPayload) -> List[Union[dict, Exception, None]]:
+        """
+        Descriptografa todos os itens de uma notificação em paralelo.
+
+        Returns:
+            Lista na mesma ordem de payload.value: o recurso descriptografado, a exceção
+            do item que falhou, ou None para itens sem encryptedContent
+        """
+        async def decrypt_item(item: NotificationItem):
+            encrypted_content = item.encryptedContent
+            if not encrypted_content:
+                return None
+            return await self.decrypt(encrypted_content)
+
+        return await asyncio.gather(
+            *(decrypt_item(item) for item in payload.value),
+            return_exceptions=True
         )
 
-        # Descriptografa a chave de dados
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_data_key(self, certificate_id: Optional[str], encrypted_key: str) -> bytes:
+        certificate_id = certificate_id or self.default_certificate_id
+        cache_key = (certificate_id, encrypted_key)
+
+        with self._data_keys_lock:
+            data_key = self._data_keys.get(cache_key)
+            if data_key is not None:
+                self._data_keys.move_to_end(cache_key)
+                return data_key
+
+        private_key = self._private_keys.get(certificate_id)
+        if private_key is None:
+            raise ValueError(f"Nenhuma chave privada configurada para o certificado {certificate_id}")
+
         try:
-            encrypted_key_bytes = base64.b64decode(encrypted_key)
-            data_key = private_key.decrypt(
-                encrypted_key_bytes,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA1()),
-                    algorithm=hashes.SHA1(),
-                    label=None
-                )
-            )
+            data_key = private_key.decrypt(base64.b64decode(encrypted_key), _OAEP_PADDING)
         except Exception as e:
             raise ValueError(f"Erro ao descriptografar a chave de dados: {str(e)}")
 
-        # Descriptografa os dados usando a chave de dados
-        try:
-            from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-            from cryptography.hazmat.backends import default_backend
-
-            # Decodifica os dados criptografados
-            encrypted_data_bytes = base64.b64decode(encrypted_data)
-            
-            # Extrai o IV (primeiros 16 bytes) e os dados criptografados
-            iv = encrypted_data_bytes[:16]
-            ciphertext = encrypted_data_bytes[16:]
-
-            # Cria o cipher usando AES em modo CBC
-            cipher = Cipher(
-                algorithms.AES(data_key),
-                modes.CBC(iv),
-                backend=default_backend()
-            )
-            decryptor = cipher.decryptor()
-
-            # Descriptografa os dados
-            decrypted_data = decryptor.update(ciphertext) + decryptor.finalize()
-
-            # Remove o padding PKCS7
-            padding_length = decrypted_data[-1]
-            decrypted_data = decrypted_data[:-padding_length]
-
-            # Decodifica para string
-            decoded_data = decrypted_data.decode('utf-8')
-            logger.debug("Dados descriptografados com sucesso")
-            return decoded_data
+        with self._data_keys_lock:
+            self._data_keys[cache_key] = data_key
+            while len(self._data_keys) > self._data_key_cache_size:
+                self._data_keys.popitem(last=False)
 
-        except Exception as e:
-            raise ValueError(f"Erro ao descriptografar os dados: {str(e)}")
-
-    except ValueError as ve:
-        logger.error(f"Erro de validação ao descriptografar dados: {str(ve)}")
-        raise
-    except Exception as e:
-        logger.error(f"Erro inesperado ao descriptografar dados: {str(e)}")
-        raise
\ No newline at end of file
+        return data_key
+
+
+def load_private_keys() -> Dict[str, bytes]:
+    """
+    Carrega as chaves privadas configuradas, indexadas pelo id do certificado.
+
+    PRIVATE_KEY é associada a ENCRYPTION_CERTIFICATE_ID; ENCRYPTION_PRIVATE_KEY_FILES
+    aceita pares "id:caminho.pem" separados por vírgula para certificados adicionais.
+    """
+    private_keys = {}
+
+    if PRIVATE_KEY:
+        private_keys[ENCRYPTION_CERTIFICATE_ID or "default"] = PRIVATE_KEY
+
+    for entry in filter(None, (ENCRYPTION_PRIVATE_KEY_FILES or "").split(",")):
+        certificate_id, _, path = entry.strip().partition(":")
+        with open(path, "rb") as key_file:
+            private_keys[certificate_id] = key_file.read()
+
+    return private_keys
+
+
+_decryptor: Optional[NotificationDecryptor] = None
+
+
+def get_notification_decryptor() -> Optional[NotificationDecryptor]:
+    """
+    Retorna o decryptor compartilhado, ou None quando nenhuma chave privada está configurada.
+    """
+    global _decryptor
+
+    if _decryptor is None:
+        private_keys = load_private_keys()
+        if private_keys:
+            _decryptor = NotificationDecryptor(private_keys, ENCRYPTION_CERTIFICATE_ID)
+
+    return _decryptor
+
+
+def close_notification_decryptor():
+    """
+    Encerra o pool de threads (usado no shutdown da aplicação).
+    """
+    global _decryptor
+
+    if _decryptor is not None:
+        _decryptor.close()
+        _decryptor = None
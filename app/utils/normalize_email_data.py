@@ -1,15 +1,16 @@
 from models.email import Email
 
 
-def normalize_email_data(email_data: dict) -> Email:
+def normalize_email_data(email_data) -> Email:
     """
     Normaliza os dados do email em um formato padronizado.
     
     Args:
-        email_data: Objeto contendo os dados do email
+        email_data: Objeto do SDK ou JSON bruto do Graph contendo os dados do email
         
     Returns:
-        dict: Dicionário com os dados do email normalizados
+        Email: E-mail normalizado (serializável com to_dict/to_json)
     """
-    email = Email.from_graph_data(email_data)
-    return email.to_dict()
+    if isinstance(email_data, dict):
+        return Email.from_graph_json(email_data)
+    return Email.from_graph_data(email_data)
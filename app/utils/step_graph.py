@@ -0,0 +1,112 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+
+@dataclass
+class Step:
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: tuple = ()
+
+
+@dataclass
+class StepTiming:
+    started_ms: float
+    duration_ms: float
+    status: str = "ok"
+
+
+@dataclass
+class StepGraphResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, StepTiming] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    def timings_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_ms, 1),
+            "steps": {
+                name: {
+                    "started_ms": round(timing.started_ms, 1),
+                    "duration_ms": round(timing.duration_ms, 1),
+                    "status": timing.status
+                }
+                for name, timing in self.timings.items()
+            }
+        }
+
+
+class StepGraphError(Exception):
+    """
+    Falha de um passo do grafo; carrega os tempos medidos até a falha.
+    """
+
+    def __init__(self, step: str, error: BaseException, result: StepGraphResult):
+        self.step = step
+        self.error = error
+        self.result = result
+        super().__init__(f"Passo '{step}' falhou: {error}")
+
+
+class StepGraph:
+    """
+    Executa passos assíncronos respeitando as dependências entre eles: cada passo
+    inicia assim que suas dependências terminam, então passos independentes rodam
+    em paralelo. Cada passo recebe o dicionário com os resultados anteriores.
+
+    Na primeira falha os passos restantes são cancelados e StepGraphError é lançado.
+    """
+
+    def __init__(self, steps: Iterable[Step]):
+        self.steps: Dict[str, Step] = {}
+        for step in steps:
+            unknown = [dep for dep in step.depends_on if dep not in self.steps]
+            if unknown:
+                raise ValueError(f"Passo '{step.name}' depende de passos não declarados antes: {unknown}")
+            self.steps[step.name] = step
+
+    async def run(self) -> StepGraphResult:
+        result = StepGraphResult()
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        failure: Dict[str, BaseException] = {}
+
+        def record(name: str, step_started: float, status: str = "ok"):
+            result.timings[name] = StepTiming(
+                started_ms=(step_started - started) * 1000,
+                duration_ms=(time.perf_counter() - step_started) * 1000,
+                status=status
+            )
+
+        async def run_step(step: Step):
+            if step.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in step.depends_on))
+
+            step_started = time.perf_counter()
+            try:
+                result.results[step.name] = await step.run(result.results)
+            except Exception as e:
+                record(step.name, step_started, "failed")
+                failure.setdefault(step.name, e)
+                raise
+
+            record(step.name, step_started)
+
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.create_task(run_step(step))
+
+        try:
+            await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            result.total_ms = (time.perf_counter() - started) * 1000
+
+        if failure:
+            step, error = next(iter(failure.items()))
+            raise StepGraphError(step, error, result)
+
+        return result
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """
+    Cache LRU em memória com TTL por entrada e carregamento single-flight.
+
+    Chamadas concorrentes de get_or_load para a mesma chave aguardam um único
+    carregamento (evita o efeito manada). Resultados None podem ser guardados com
+    um TTL próprio (cache negativo).
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000, negative_ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None and self.negative_ttl is not None else self.ttl
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Retorna o valor em cache ou executa loader uma única vez para as chamadas concorrentes.
+        Exceções do loader não são guardadas. Se a chamada que carrega for cancelada, as
+        demais tentam de novo em vez de receber o cancelamento.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+
+        while True:
+            loading = self._loading.get(key)
+            if loading is None:
+                break
+            value = await asyncio.shield(loading)
+            if value is not _RETRY:
+                return value
+
+            # Quem carregava foi cancelado; outro waiter pode já ter assumido e concluído
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # O cancelamento é de quem chamou, não do carregamento: os waiters não são
+            # cancelados junto, e um deles executa o próprio loader
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marca a exceção como consumida caso ninguém mais esteja aguardando
+            future.exception()
+            raise
+        else:
+            if value is not None or self.negative_ttl is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+_MISSING = object()
+_RETRY = object()
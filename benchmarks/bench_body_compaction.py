@@ -0,0 +1,110 @@
+"""
+Benchmark da compactação do corpo: mede o tempo por e-mail e a redução do
+payload enviado à API externa para newsletters HTML grandes e para respostas
+com histórico citado.
+
+Uso (na raiz do repositório):
+    python benchmarks/bench_body_compaction.py [--sizes-kb 64,256,1024] [--iterations 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+# config exige as URLs do webhook; valores fictícios bastam para o benchmark
+os.environ.setdefault("WEBHOOK_BASE_URL", "http://localhost")
+os.environ.setdefault("WEBHOOK_NOTIFICATION", "notification")
+os.environ.setdefault("WEBHOOK_LIFECYCLE", "lifecycle")
+
+from models.email import Email, EmailBody  # noqa: E402
+from utils.body_compaction import compact_body  # noqa: E402
+
+NEWSLETTER_HEAD = (
+    "<html><head><meta charset=\"utf-8\"><style>"
+    + ".col{width:50%;font-family:Arial}" * 200
+    + "</style></head><body><!--[if mso]><table><tr><td>Outlook</td></tr></table><![endif]-->"
+)
+NEWSLETTER_BLOCK = (
+    "<table role=\"presentation\" width=\"100%\" style=\"border-collapse:collapse;background:#ffffff\">"
+    "<tr><td class=\"col\" style=\"padding:12px 24px;font-size:14px;line-height:20px;color:#333333\">"
+    "<a href=\"https://click.contoso.com/track?u=8f3a9c&amp;id=2b71e0&amp;e=pessoa%40contoso.com\" "
+    "style=\"color:#0078d4;text-decoration:none\"><img src=\"https://cdn.contoso.com/banner.png\" width=\"600\" "
+    "alt=\"\" style=\"display:block;border:0\"></a>"
+    "<h2 style=\"margin:0 0 8px 0;font-size:18px\">Novidades da semana</h2>"
+    "<p style=\"margin:0\">Confira as atualizações do produto, com melhorias de desempenho e correções.</p>"
+    "</td></tr></table>\n"
+)
+NEWSLETTER_FOOTER = (
+    "<div style=\"font-size:11px;color:#999999\">Você recebeu este e-mail porque se inscreveu. "
+    "<a href=\"https://click.contoso.com/unsubscribe\">Cancelar inscrição</a></div></body></html>"
+)
+
+REPLY_NEW = "<div style=\"font-family:Calibri\">Pessoal, segue minha resposta sobre o item 3.</div>"
+REPLY_SIGNATURE = "<div id=\"Signature\"><p>Fulano de Tal<br>Gerente de Projetos<br>+55 11 0000-0000</p></div>"
+REPLY_HISTORY = (
+    "<div id=\"appendonsend\"></div><hr style=\"display:inline-block;width:98%\">"
+    "<div id=\"divRplyFwdMsg\"><b>De:</b> Beltrano<br><b>Enviado:</b> segunda-feira</div>"
+    "<div><p style=\"margin:0\">Mensagem anterior da conversa, citada por completo.</p></div>\n"
+)
+
+
+def build_newsletter(size_kb: int) -> str:
+    size = size_kb * 1024
+    blocks = max((size - len(NEWSLETTER_HEAD) - len(NEWSLETTER_FOOTER)) // len(NEWSLETTER_BLOCK), 1)
+    return NEWSLETTER_HEAD + NEWSLETTER_BLOCK * blocks + NEWSLETTER_FOOTER
+
+
+def build_reply_thread(size_kb: int) -> str:
+    history = size_kb * 1024 // len(REPLY_HISTORY) + 1
+    return "<html><body>" + REPLY_NEW + REPLY_SIGNATURE + REPLY_HISTORY * history + "</body></html>"
+
+
+def payload_size(body: EmailBody) -> int:
+    return len(Email(id="AAMkAGI2TG93AAA=", subject="Benchmark", body=body).to_json())
+
+
+def measure(html: str, max_bytes: int, iterations: int) -> dict:
+    body = EmailBody(content=html, content_type="html")
+    compacted, truncated = compact_body(body, max_bytes=max_bytes)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        compact_body(body, max_bytes=max_bytes)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "ms_per_email": elapsed / iterations * 1000,
+        "original_bytes": payload_size(body),
+        "compacted_bytes": payload_size(compacted),
+        "truncated": truncated
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", default="64,256,1024")
+    parser.add_argument("--max-bytes", type=int, default=16 * 1024)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Limite do corpo: {args.max_bytes} bytes (0 = sem limite)")
+    print(f"{'caso':<22} {'ms/e-mail':>10} {'payload':>12} {'compactado':>12} {'redução':>9} {'cortado':>8}")
+
+    for size_kb in (int(size) for size in args.sizes_kb.split(",")):
+        for name, html in (("newsletter", build_newsletter(size_kb)), ("resposta c/ histórico", build_reply_thread(size_kb))):
+            for max_bytes in (0, args.max_bytes):
+                result = measure(html, max_bytes, args.iterations)
+                label = f"{name} {size_kb}KB" + ("" if max_bytes else " *")
+                print(
+                    f"{label:<22} {result['ms_per_email']:>10.2f} {result['original_bytes']:>12} "
+                    f"{result['compacted_bytes']:>12} "
+                    f"{result['original_bytes'] / result['compacted_bytes']:>8.1f}x {str(result['truncated']):>8}"
+                )
+
+    print("* sem limite de bytes: apenas conversão para texto e remoção de citações/assinaturas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Micro-benchmark do modelo Email: compara o caminho anterior (dataclasses comuns,
+to_dict + json.dumps + encode) com o atual (dataclasses com __slots__ + orjson
+direto para bytes), medindo tempo e memória por e-mail.
+
+Uso (na raiz do repositório):
+    python benchmarks/bench_email_model.py [--body-kb 256] [--iterations 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from models.email import Email  # noqa: E402
+
+
+# Réplica do modelo anterior, usada como referência
+@dataclass
+class LegacyEmailAddress:
+    name: str
+    address: str
+
+
+@dataclass
+class LegacyEmailBody:
+    content: str
+    content_type: str
+
+
+@dataclass
+class LegacyEmail:
+    id: str
+    subject: Optional[str] = None
+    from_: Optional[LegacyEmailAddress] = None
+    to_recipients: List[LegacyEmailAddress] = field(default_factory=list)
+    body: Optional[LegacyEmailBody] = None
+    received_date_time: datetime = None
+    sent_date_time: datetime = None
+    is_read: bool = False
+    has_attachments: bool = False
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "subject": self.subject,
+            "from": {"name": self.from_.name, "address": self.from_.address} if self.from_ else None,
+            "to": [{"name": r.name, "address": r.address} for r in self.to_recipients],
+            "body": {"content": self.body.content, "content_type": self.body.content_type} if self.body else None,
+            "received_date_time": self.received_date_time.isoformat() if self.received_date_time else None,
+            "sent_date_time": self.sent_date_time.isoformat() if self.sent_date_time else None,
+            "is_read": self.is_read,
+            "has_attachments": self.has_attachments
+        }
+
+    @classmethod
+    def from_graph_json(cls, data: dict):
+        from_address = (data.get("from") or {}).get("emailAddress")
+        body = data.get("body")
+        return cls(
+            id=data.get("id"),
+            subject=data.get("subject"),
+            from_=LegacyEmailAddress(from_address.get("name"), from_address.get("address")) if from_address else None,
+            to_recipients=[
+                LegacyEmailAddress(r["emailAddress"].get("name"), r["emailAddress"].get("address"))
+                for r in data.get("toRecipients") or []
+            ],
+            body=LegacyEmailBody(body.get("content"), body.get("contentType")) if body else None,
+            received_date_time=datetime.fromisoformat(data["receivedDateTime"].replace("Z", "+00:00")),
+            sent_date_time=datetime.fromisoformat(data["sentDateTime"].replace("Z", "+00:00")),
+            is_read=bool(data.get("isRead")),
+            has_attachments=bool(data.get("hasAttachments"))
+        )
+
+
+def legacy_pipeline(message: dict) -> bytes:
+    email = LegacyEmail.from_graph_json(message)
+    return json.dumps(email.to_dict(), ensure_ascii=False).encode("utf-8")
+
+
+def current_pipeline(message: dict) -> bytes:
+    return Email.from_graph_json(message).to_json()
+
+
+def build_message(body_kb: int, recipients: int) -> dict:
+    paragraph = "<p>Olá equipe, segue o relatório de integridade com acentuação: ção, é, ü.</p>\n"
+    content = (paragraph * (body_kb * 1024 // len(paragraph) + 1))[:body_kb * 1024]
+
+    def address(index: int) -> dict:
+        return {"emailAddress": {"name": f"Pessoa {index}", "address": f"pessoa{index}@contoso.com"}}
+
+    return {
+        "id": "AAMkAGI2TG93AAA=",
+        "subject": "Relatório semanal",
+        "from": address(0),
+        "toRecipients": [address(i) for i in range(1, recipients + 1)],
+        "ccRecipients": [address(i) for i in range(recipients + 1, recipients * 2 + 1)],
+        "bccRecipients": [],
+        "body": {"contentType": "html", "content": content},
+        "receivedDateTime": "2024-05-01T12:00:00Z",
+        "sentDateTime": "2024-05-01T11:59:58Z",
+        "isRead": False,
+        "hasAttachments": True,
+        "conversationId": "AAQkAGI2TG93AAA=",
+        "importance": "normal",
+        "internetMessageId": "<abc@contoso.com>"
+    }
+
+
+def measure(pipeline, message: dict, iterations: int) -> dict:
+    pipeline(message)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        pipeline(message)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    pipeline(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"us_per_email": elapsed / iterations * 1e6, "peak_kb": peak / 1024}
+
+
+def instance_size(email) -> int:
+    return sys.getsizeof(email) + (sys.getsizeof(email.__dict__) if hasattr(email, "__dict__") else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--body-kb", type=int, default=256)
+    parser.add_argument("--recipients", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    message = build_message(args.body_kb, args.recipients)
+
+    legacy = measure(legacy_pipeline, message, args.iterations)
+    current = measure(current_pipeline, message, args.iterations)
+
+    print(f"Corpo: {args.body_kb} KB, destinatários: {args.recipients} (to) + {args.recipients} (cc)")
+    print(f"{'pipeline':<10} {'µs/e-mail':>12} {'pico KB':>10}")
+    print(f"{'anterior':<10} {legacy['us_per_email']:>12.1f} {legacy['peak_kb']:>10.1f}")
+    print(f"{'atual':<10} {current['us_per_email']:>12.1f} {current['peak_kb']:>10.1f}")
+    print(f"Ganho de CPU: {legacy['us_per_email'] / current['us_per_email']:.1f}x, "
+          f"memória de pico: {legacy['peak_kb'] - current['peak_kb']:.1f} KB a menos por e-mail")
+    print(f"Tamanho da instância (sem campos aninhados): anterior {instance_size(LegacyEmail.from_graph_json(message))} B, "
+          f"atual {instance_size(Email.from_graph_json(message))} B")
+
+
+if __name__ == "__main__":
+    main()
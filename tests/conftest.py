@@ -0,0 +1,6 @@
+import os
+
+# config exige as URLs do webhook; valores fictícios bastam para os testes
+os.environ.setdefault("WEBHOOK_BASE_URL", "http://localhost")
+os.environ.setdefault("WEBHOOK_NOTIFICATION", "notification")
+os.environ.setdefault("WEBHOOK_LIFECYCLE", "lifecycle")
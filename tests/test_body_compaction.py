@@ -0,0 +1,129 @@
+import pytest
+
+from models.email import EmailBody
+from utils.body_compaction import (
+    TRUNCATION_MARKER,
+    compact_body,
+    html_to_text,
+    strip_quoted_text,
+    truncate_utf8,
+)
+
+
+def test_html_reply_drops_outlook_history_and_signature():
+    html = (
+        "<html><head><style>p{color:red}</style></head><body>"
+        "<div>Segue a resposta sobre o item&nbsp;3.</div>"
+        "<div id=\"Signature\"><p>Fulano<br>Gerente</p></div>"
+        "<div id=\"appendonsend\"></div>"
+        "<div id=\"divRplyFwdMsg\"><b>De:</b> Beltrano</div><p>Mensagem anterior</p>"
+        "</body></html>"
+    )
+
+    text, cut = html_to_text(html)
+
+    assert text == "Segue a resposta sobre o item 3."
+    assert not cut
+
+
+def test_html_gmail_quote_is_skipped_but_following_text_kept():
+    html = (
+        "<div>Nova mensagem</div>"
+        "<div class=\"gmail_quote\"><div>Em seg, Beltrano escreveu:</div><blockquote>antiga</blockquote></div>"
+        "<div>Depois da citação</div>"
+    )
+
+    assert html_to_text(html)[0] == "Nova mensagem\n\nDepois da citação"
+
+
+def test_html_keeps_quotes_when_disabled():
+    html = "<div>Nova</div><blockquote type=\"cite\">antiga</blockquote>"
+
+    assert html_to_text(html, strip_quotes=False)[0] == "Nova\n\nantiga"
+
+
+def test_html_lists_and_preformatted_text():
+    html = "<ul><li>um</li><li>dois</li></ul><pre>a\n  b</pre>"
+
+    assert html_to_text(html)[0] == "- um\n- dois\n\na\nb"
+
+
+def test_html_stops_at_max_chars():
+    text, cut = html_to_text("<p>" + "palavra " * 1000 + "</p><p>fim</p>", max_chars=100)
+
+    assert cut
+    assert "fim" not in text
+
+
+@pytest.mark.parametrize("header", [
+    "Em seg., 1 de jan. de 2024 às 10:00, Beltrano <b@x.com> escreveu:",
+    "On Mon, Jan 1, 2024 at 10:00 AM Beltrano <b@x.com> wrote:",
+    "-----Original Message-----",
+    "De: Beltrano\nEnviado: segunda-feira",
+])
+def test_text_quote_headers(header):
+    text = f"Resposta nova\n\n{header}\n> texto antigo"
+
+    assert strip_quoted_text(text) == "Resposta nova"
+
+
+def test_text_signatures():
+    text = "Obrigado!\n\nEnviado do meu iPhone"
+    assert strip_quoted_text(text) == "Obrigado!"
+
+    text = "Obrigado!\n-- \nFulano\nGerente"
+    assert strip_quoted_text(text) == "Obrigado!"
+
+
+def test_text_only_quote_is_kept():
+    text = "> mensagem encaminhada sem comentário"
+
+    assert strip_quoted_text(text) == text
+
+
+def test_truncate_utf8_never_splits_a_character():
+    text = "ção" * 100  # 5 bytes por repetição
+
+    for max_bytes in range(len(TRUNCATION_MARKER) + 1, 60):
+        truncated, cut = truncate_utf8(text, max_bytes)
+        encoded = truncated.encode("utf-8")
+
+        assert cut
+        assert len(encoded) <= max_bytes
+        assert truncated.endswith(TRUNCATION_MARKER)
+        encoded.decode("utf-8")
+
+
+def test_truncate_utf8_prefers_word_boundary():
+    truncated, cut = truncate_utf8("palavra " * 10, 40)
+
+    assert cut
+    assert truncated == "palavra palavra palavra palavra" + TRUNCATION_MARKER
+
+
+def test_truncate_utf8_keeps_short_text():
+    assert truncate_utf8("curto", 100) == ("curto", False)
+    assert truncate_utf8("sem limite " * 100, 0) == ("sem limite " * 100, False)
+
+
+def test_compact_body_converts_html_and_truncates():
+    body = EmailBody(content="<p>" + "conteúdo " * 500 + "</p>", content_type="html")
+
+    compacted, truncated = compact_body(body, max_bytes=256)
+
+    assert compacted.content_type == "text"
+    assert truncated
+    assert len(compacted.content.encode("utf-8")) <= 256
+    assert compacted.content.endswith(TRUNCATION_MARKER)
+
+
+def test_compact_body_keeps_history_of_forward_without_new_text():
+    body = EmailBody(
+        content="<div id=\"divRplyFwdMsg\"><b>De:</b> Beltrano</div><p>Conteúdo encaminhado</p>",
+        content_type="html"
+    )
+
+    compacted, truncated = compact_body(body, max_bytes=1024)
+
+    assert "Conteúdo encaminhado" in compacted.content
+    assert not truncated
@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from models.webhook import EncryptedContent
+from utils.decrypt_notification import NotificationDecryptor, NotificationSignatureError
+
+_OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA1()), algorithm=hashes.SHA1(), label=None)
+
+
+def generate_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def to_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+
+def encrypt(resource: dict, private_key, certificate_id: str) -> EncryptedContent:
+    """
+    Criptografa o recurso como o Graph faz nas rich notifications.
+    """
+    data_key = os.urandom(32)
+    plain = json.dumps(resource).encode("utf-8")
+    pad = 16 - len(plain) % 16
+    plain += bytes([pad]) * pad
+
+    encryptor = Cipher(algorithms.AES(data_key), modes.CBC(data_key[:16])).encryptor()
+    data = encryptor.update(plain) + encryptor.finalize()
+
+    return EncryptedContent(
+        data=base64.b64encode(data).decode(),
+        dataKey=base64.b64encode(private_key.public_key().encrypt(data_key, _OAEP)).decode(),
+        dataSignature=base64.b64encode(hmac.new(data_key, data, hashlib.sha256).digest()).decode(),
+        encryptionCertificateId=certificate_id,
+        encryptionCertificateThumbprint="thumbprint"
+    )
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return {"cert-old": generate_key(), "cert-new": generate_key()}
+
+
+@pytest.fixture
+def decryptor(keys):
+    decryptor = NotificationDecryptor({cert: to_pem(key) for cert, key in keys.items()}, "cert-old", workers=1)
+    yield decryptor
+    decryptor.close()
+
+
+def test_key_is_selected_by_certificate_id(keys, decryptor):
+    async def scenario():
+        for certificate_id in ("cert-old", "cert-new"):
+            content = encrypt({"id": certificate_id}, keys[certificate_id], certificate_id)
+            assert await decryptor.decrypt(content) == {"id": certificate_id}
+
+    asyncio.run(scenario())
+
+
+def test_unknown_certificate_id_is_rejected(keys, decryptor):
+    content = encrypt({"id": "m1"}, keys["cert-new"], "cert-removed")
+
+    with pytest.raises(ValueError, match="cert-removed"):
+        decryptor.decrypt_content(content)
+
+
+def test_signature_mismatch_is_rejected(keys, decryptor):
+    content = encrypt({"id": "m1"}, keys["cert-new"], "cert-new")
+    content.dataSignature = base64.b64encode(b"\x00" * 32).decode()
+
+    with pytest.raises(NotificationSignatureError):
+        decryptor.decrypt_content(content)
+
+
+def test_tampered_data_is_rejected(keys, decryptor):
+    content = encrypt({"id": "m1"}, keys["cert-new"], "cert-new")
+    data = bytearray(base64.b64decode(content.data))
+    data[0] ^= 1
+    content.data = base64.b64encode(bytes(data)).decode()
+
+    with pytest.raises(NotificationSignatureError):
+        decryptor.decrypt_content(content)
@@ -0,0 +1,99 @@
+import asyncio
+
+from services.dedup_cache import DedupCache, SqliteDedupBackend
+
+
+def test_claim_and_release_in_memory():
+    async def scenario():
+        cache = DedupCache(ttl=60, max_entries=100)
+
+        assert await cache.claim("s1:m1:created")
+        assert not await cache.claim("s1:m1:created")
+
+        await cache.release("s1:m1:created")
+        assert await cache.claim("s1:m1:created")
+
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_claim_after_ttl_expires(monkeypatch):
+    async def scenario():
+        now = [1000.0]
+        monkeypatch.setattr("services.dedup_cache.time.time", lambda: now[0])
+        cache = DedupCache(ttl=10)
+
+        assert await cache.claim("key")
+        now[0] += 5
+        assert not await cache.claim("key")
+        now[0] += 6
+        assert await cache.claim("key")
+
+    asyncio.run(scenario())
+
+
+def test_lru_evicts_oldest_entry():
+    async def scenario():
+        cache = DedupCache(ttl=60, max_entries=2)
+
+        for key in ("a", "b", "c"):
+            assert await cache.claim(key)
+
+        assert cache.stats()["entries"] == 2
+        assert await cache.claim("a")
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "dedup.db")
+
+        cache = DedupCache(ttl=60, backend=SqliteDedupBackend(path))
+        assert await cache.claim("processed")
+        await cache.confirm("processed")
+        assert await cache.claim("failed")
+        await cache.release("failed")
+        cache.close()
+
+        # Nova instância (reinício do processo): a memória está vazia, o SQLite não
+        restarted = DedupCache(ttl=60, backend=SqliteDedupBackend(path))
+        assert not await restarted.claim("processed")
+        assert await restarted.claim("failed")
+        restarted.close()
+
+    asyncio.run(scenario())
+
+
+def test_unconfirmed_claim_expires_after_lease(tmp_path, monkeypatch):
+    async def scenario():
+        now = [1000.0]
+        monkeypatch.setattr("services.dedup_cache.time.time", lambda: now[0])
+        path = str(tmp_path / "dedup.db")
+
+        cache = DedupCache(ttl=3600, lease=60, backend=SqliteDedupBackend(path))
+        assert await cache.claim("in-flight")
+        assert await cache.claim("delivered")
+        await cache.confirm("delivered")
+        cache.close()
+
+        # O processo caiu com "in-flight" em processamento: a reserva vence com o lease
+        now[0] += 61
+        restarted = DedupCache(ttl=3600, lease=60, backend=SqliteDedupBackend(path))
+        assert await restarted.claim("in-flight")
+        assert not await restarted.claim("delivered")
+        restarted.close()
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_backend_reclaims_expired_key(tmp_path):
+    backend = SqliteDedupBackend(str(tmp_path / "dedup.db"))
+
+    assert backend.claim("key", expires_at=110, now=100)
+    assert not backend.claim("key", expires_at=120, now=105)
+    assert backend.claim("key", expires_at=130, now=115)
+
+    backend.close()
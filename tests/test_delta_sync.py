@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from services.delta_sync import DeltaSyncService, DeltaTokenExpired, DeltaTokenStore, MailboxSyncResult
+
+NOW = datetime.now(timezone.utc)
+
+
+def iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeGraphClient:
+    """
+    Responde às URLs da delta com as páginas configuradas; tokens expirados devolvem 410.
+    """
+
+    def __init__(self, pages, expired=()):
+        self.pages = pages
+        self.expired = set(expired)
+        self.calls = []
+
+    async def request(self, method, url, params=None, headers=None):
+        self.calls.append((url, params, headers))
+        status, body = (410, {}) if url in self.expired else (200, self.pages[url])
+        return httpx.Response(status, json=body, request=httpx.Request(method, f"https://graph.microsoft.com/v1.0{url}"))
+
+
+class FakeRegistry:
+    def __init__(self, records):
+        self.records = records
+
+    async def all(self):
+        return self.records
+
+    async def get(self, subscription_id):
+        return next((record for record in self.records if record["id"] == subscription_id), None)
+
+
+INITIAL_URL = "/users/a%40x.com/mailFolders/inbox/messages/delta"
+
+
+@pytest.fixture
+def token_store(tmp_path):
+    store = DeltaTokenStore(str(tmp_path / "delta.db"))
+    yield store
+    store.close()
+
+
+def service(graph_client, token_store, enqueued, records=None):
+    async def enqueue(payload):
+        enqueued.append(payload)
+
+    registry = FakeRegistry(records if records is not None else [
+        {"id": "s1", "mailbox": "a@x.com", "resource": "users/a@x.com/messages", "change_type": "created", "expiration": "2030"}
+    ])
+    return DeltaSyncService(graph_client, registry, token_store, enqueue, folder="inbox", page_size=50)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ({"id": "m1", "receivedDateTime": iso(NOW)}, True),
+    ({"id": "m1"}, True),
+    ({"id": "m1", "receivedDateTime": iso(NOW - timedelta(days=1))}, False),
+    ({"id": "m1", "@removed": {"reason": "deleted"}}, False),
+    ({"receivedDateTime": iso(NOW)}, False),
+])
+def test_is_new(message, expected):
+    assert DeltaSyncService._is_new(message, NOW - timedelta(minutes=5)) is expected
+
+
+def test_walk_follows_next_links_and_batches_items(token_store):
+    async def scenario():
+        graph_client = FakeGraphClient({
+            INITIAL_URL: {
+                "value": [{"id": f"m{i}", "receivedDateTime": iso(NOW)} for i in range(25)],
+                "@odata.nextLink": "https://graph/delta?skiptoken=2"
+            },
+            "https://graph/delta?skiptoken=2": {
+                "value": [
+                    {"id": "m25", "receivedDateTime": iso(NOW)},
+                    {"id": "old", "receivedDateTime": iso(NOW - timedelta(days=2))},
+                    {"id": "gone", "@removed": {"reason": "deleted"}}
+                ],
+                "@odata.deltaLink": "https://graph/delta?deltatoken=3"
+            }
+        })
+        enqueued = []
+        sync = service(graph_client, token_store, enqueued)
+        result = MailboxSyncResult(mailbox="a@x.com", subscription_id="s1")
+
+        delta_link = await sync._walk("a@x.com", None, NOW - timedelta(minutes=5), result)
+
+        assert delta_link == "https://graph/delta?deltatoken=3"
+        assert (result.pages, result.changes, result.enqueued) == (2, 28, 26)
+        assert [len(payload.value) for payload in enqueued] == [20, 6]
+
+        item = enqueued[0].value[0]
+        assert (item.subscriptionId, item.changeType, item.resource) == ("s1", "created", "Users/a@x.com/Messages/m0")
+
+        url, params, headers = graph_client.calls[0]
+        assert params["$filter"].startswith("receivedDateTime ge ")
+        assert headers == {"Prefer": "odata.maxpagesize=50"}
+        assert graph_client.calls[1][1] is None
+
+    asyncio.run(scenario())
+
+
+def test_walk_raises_on_expired_token(token_store):
+    async def scenario():
+        graph_client = FakeGraphClient({}, expired={"https://graph/delta?deltatoken=old"})
+        sync = service(graph_client, token_store, [])
+        result = MailboxSyncResult(mailbox="a@x.com", subscription_id="s1")
+
+        with pytest.raises(DeltaTokenExpired):
+            await sync._walk("a@x.com", "https://graph/delta?deltatoken=old", NOW, result)
+
+    asyncio.run(scenario())
+
+
+def test_sync_mailbox_resets_after_410(token_store):
+    async def scenario():
+        token_store.save("a@x.com", "https://graph/delta?deltatoken=old", NOW - timedelta(hours=1))
+        graph_client = FakeGraphClient(
+            {INITIAL_URL: {"value": [{"id": "m1", "receivedDateTime": iso(NOW)}], "@odata.deltaLink": "https://graph/delta?deltatoken=new"}},
+            expired={"https://graph/delta?deltatoken=old"}
+        )
+        enqueued = []
+        sync = service(graph_client, token_store, enqueued)
+
+        result = await sync.sync_mailbox("a@x.com")
+
+        assert result.status == "reset"
+        assert result.subscription_id == "s1"
+        assert result.enqueued == 1
+        assert sync.resets == 1
+        assert token_store.get("a@x.com")["delta_link"] == "https://graph/delta?deltatoken=new"
+        # A nova sincronização inicial parte do último horário salvo, e não da pasta inteira
+        assert graph_client.calls[1][0] == INITIAL_URL
+        assert iso(NOW - timedelta(hours=1) - sync.grace) in graph_client.calls[1][1]["$filter"]
+
+    asyncio.run(scenario())
+
+
+def test_sync_mailbox_without_subscription_fails(token_store):
+    async def scenario():
+        graph_client = FakeGraphClient({})
+        sync = service(graph_client, token_store, [])
+
+        result = await sync.sync_mailbox("nobody@x.com")
+
+        assert result.status == "failed"
+        assert graph_client.calls == []
+
+    asyncio.run(scenario())
+
+
+def test_mailbox_locks_are_released(token_store):
+    async def scenario():
+        graph_client = FakeGraphClient({
+            INITIAL_URL: {"value": [], "@odata.deltaLink": "https://graph/delta?deltatoken=1"},
+            "https://graph/delta?deltatoken=1": {"value": [], "@odata.deltaLink": "https://graph/delta?deltatoken=2"}
+        })
+        sync = service(graph_client, token_store, [])
+
+        # Mesma caixa com grafias diferentes: as execuções são serializadas pelo mesmo lock
+        results = await asyncio.gather(sync.sync_mailbox("a@x.com"), sync.sync_mailbox("A@X.COM"))
+
+        assert [result.status for result in results] == ["synced", "synced"]
+        assert sync._locks == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.planner_management_service import label_service
+from services.planner_management_service.label_service import LabelService, invalidate_label_cache
+
+
+class FakePlanDetails:
+    """
+    planner.plans.by_planner_plan_id(id).details do SDK, com as categoryDescriptions em memória.
+    """
+
+    def __init__(self, descriptions):
+        self.descriptions = dict(descriptions)
+        self.gets = 0
+        self.patches = []
+
+    async def get(self):
+        self.gets += 1
+        return SimpleNamespace(
+            category_descriptions=SimpleNamespace(**self.descriptions),
+            additional_data={"@odata.etag": f"W/\"{len(self.patches)}\""}
+        )
+
+    async def patch(self, body, request_configuration=None):
+        created = {
+            category: getattr(body.category_descriptions, category)
+            for category in label_service.CATEGORY_SLOTS
+            if getattr(body.category_descriptions, category, None)
+        }
+        self.patches.append(created)
+        self.descriptions.update(created)
+
+
+def graph_client(details):
+    plans = SimpleNamespace(by_planner_plan_id=lambda plan_id: SimpleNamespace(details=details))
+    return SimpleNamespace(planner=SimpleNamespace(plans=plans))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    invalidate_label_cache()
+    yield
+    invalidate_label_cache()
+
+
+def test_labels_are_mapped_by_name_case_insensitive():
+    async def scenario():
+        details = FakePlanDetails({"category1": "Urgente", "category4": "Financeiro"})
+        service = LabelService(graph_client(details))
+
+        applied = await service.map_labels("plan", ["urgente", " FINANCEIRO ", "", "category7"])
+
+        assert applied == {"category1": True, "category4": True, "category7": True}
+
+    asyncio.run(scenario())
+
+
+def test_category_keys_skip_plan_lookup():
+    async def scenario():
+        details = FakePlanDetails({})
+        service = LabelService(graph_client(details))
+
+        assert await service.map_labels("plan", ["Category2", "category25"]) == {"category2": True, "category25": True}
+        assert await service.map_labels("plan", []) == {}
+        assert details.gets == 0
+
+    asyncio.run(scenario())
+
+
+def test_plan_categories_are_cached():
+    async def scenario():
+        details = FakePlanDetails({"category1": "Urgente"})
+        service = LabelService(graph_client(details))
+
+        await service.map_labels("plan", ["Urgente"])
+        await service.map_labels("plan", ["Urgente"])
+
+        assert details.gets == 1
+
+    asyncio.run(scenario())
+
+
+def test_unknown_labels_are_ignored_by_default(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(label_service, "PLANNER_CREATE_MISSING_LABELS", False)
+        details = FakePlanDetails({"category1": "Urgente"})
+        service = LabelService(graph_client(details))
+
+        assert await service.map_labels("plan", ["Urgente", "Novo"]) == {"category1": True}
+        assert details.patches == []
+
+    asyncio.run(scenario())
+
+
+def test_unknown_labels_are_created_in_free_slots(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(label_service, "PLANNER_CREATE_MISSING_LABELS", True)
+        details = FakePlanDetails({"category1": "Urgente"})
+        service = LabelService(graph_client(details))
+
+        applied = await service.map_labels("plan", ["Urgente", "Novo", "novo"])
+
+        assert applied == {"category1": True, "category2": True}
+        assert details.patches == [{"category2": "Novo"}]
+        assert await service.map_labels("plan", ["Novo"]) == {"category2": True}
+
+    asyncio.run(scenario())
@@ -0,0 +1,131 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.message_batch_fetcher import (
+    GRAPH_BATCH_LIMIT,
+    GraphBatchItemError,
+    MessageBatchFetcher,
+    MessageBatchFetcherClosed,
+)
+
+
+class FakeGraphClient:
+    """
+    Responde ao POST /$batch; respond recebe a lista de requisições do lote e
+    devolve (status do lote, respostas dos itens).
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.batches = []
+
+    async def request(self, method, url, json=None):
+        self.batches.append(json["requests"])
+        status, responses = self.respond(json["requests"])
+        return httpx.Response(
+            status,
+            json={"responses": responses},
+            headers={"Retry-After": "0"},
+            request=httpx.Request(method, f"https://graph.microsoft.com/v1.0{url}")
+        )
+
+
+def ok(requests):
+    return 200, [{"id": r["id"], "status": 200, "body": {"url": r["url"]}} for r in requests]
+
+
+def test_requests_are_split_in_chunks_of_twenty():
+    async def scenario():
+        client = FakeGraphClient(ok)
+        fetcher = MessageBatchFetcher(client, window_ms=5, max_size=50)
+
+        bodies = await asyncio.gather(*(fetcher.get(f"/users/u/messages/{i}") for i in range(45)))
+
+        assert [body["url"] for body in bodies] == [f"/users/u/messages/{i}" for i in range(45)]
+        assert [len(batch) for batch in client.batches] == [GRAPH_BATCH_LIMIT, GRAPH_BATCH_LIMIT, 5]
+        assert fetcher.stats.batches_sent == 3
+        await fetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_only_throttled_items_are_retried():
+    async def scenario():
+        attempts = {}
+
+        def respond(requests):
+            responses = []
+            for request in requests:
+                attempts[request["url"]] = attempts.get(request["url"], 0) + 1
+                if request["url"].endswith("/throttled") and attempts[request["url"]] == 1:
+                    responses.append({"id": request["id"], "status": 429, "headers": {"Retry-After": "0"}})
+                else:
+                    responses.append({"id": request["id"], "status": 200, "body": {"url": request["url"]}})
+            return 200, responses
+
+        client = FakeGraphClient(respond)
+        fetcher = MessageBatchFetcher(client, window_ms=1)
+
+        bodies = await asyncio.gather(fetcher.get("/m/ok"), fetcher.get("/m/throttled"))
+
+        assert [body["url"] for body in bodies] == ["/m/ok", "/m/throttled"]
+        assert attempts == {"/m/ok": 1, "/m/throttled": 2}
+        assert client.batches[1] == [{"id": "0", "method": "GET", "url": "/m/throttled"}]
+        assert fetcher.stats.retries == 1
+        await fetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_item_fails_after_max_retries():
+    async def scenario():
+        def respond(requests):
+            return 200, [{"id": r["id"], "status": 503} for r in requests]
+
+        fetcher = MessageBatchFetcher(FakeGraphClient(respond), window_ms=1, max_retries=2)
+
+        with pytest.raises(GraphBatchItemError) as error:
+            await fetcher.get("/m/unavailable")
+
+        assert error.value.status == 503
+        assert fetcher.stats.retries == 2
+        await fetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_non_retryable_item_error_is_returned_to_caller():
+    async def scenario():
+        def respond(requests):
+            return 200, [{"id": r["id"], "status": 404, "body": {"error": {"message": "not found"}}} for r in requests]
+
+        fetcher = MessageBatchFetcher(FakeGraphClient(respond), window_ms=1)
+
+        with pytest.raises(GraphBatchItemError, match="not found"):
+            await fetcher.get("/m/deleted")
+
+        assert fetcher.stats.retries == 0
+        await fetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_fails_requests_waiting_for_retry():
+    async def scenario():
+        def respond(requests):
+            return 200, [{"id": r["id"], "status": 429, "headers": {"Retry-After": "30"}} for r in requests]
+
+        client = FakeGraphClient(respond)
+        fetcher = MessageBatchFetcher(client, window_ms=1)
+
+        request = asyncio.create_task(fetcher.get("/m/throttled"))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(fetcher.close(), 1)
+
+        with pytest.raises(MessageBatchFetcherClosed):
+            await request
+        assert len(client.batches) == 1
+
+    asyncio.run(scenario())
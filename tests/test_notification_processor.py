@@ -0,0 +1,153 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from models.email import Email
+from models.webhook import NotificationPayload
+from services import notification_processor
+from services.dedup_cache import DedupCache
+from services.notification_processor import process_notification
+from services.notification_queue import NotificationQueue
+
+
+class FakeEmailService:
+    """
+    EmailService com get_email_data em memória; ids em `fail` levantam erro na busca.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.fetched = []
+
+    async def get_email_data(self, item):
+        message_id = item.resourceData.id
+        self.fetched.append(message_id)
+        if message_id in self.fail:
+            raise RuntimeError(f"falha ao buscar {message_id}")
+        return Email(id=message_id, subject=f"Assunto {message_id}")
+
+
+class FakeExternalService:
+    """
+    ExternalService que registra os e-mails entregues; `accept` decide o retorno de send_email.
+    """
+
+    def __init__(self, accept=lambda email: True):
+        self.accept = accept
+        self.sent = []
+
+    async def send_email(self, payload):
+        self.sent.append(payload.id)
+        return self.accept(payload)
+
+
+class FakeRegistry:
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def contains(self, subscription_id):
+        return subscription_id in self.ids
+
+
+def payload(*items):
+    return NotificationPayload(value=[
+        {
+            "subscriptionId": subscription_id,
+            "changeType": "created",
+            "clientState": "state",
+            "resource": f"Users/a@x.com/Messages/{message_id}",
+            "resourceData": {"id": message_id}
+        }
+        for subscription_id, message_id in items
+    ])
+
+
+@pytest.fixture(autouse=True)
+def pipeline_config(monkeypatch):
+    monkeypatch.setattr(notification_processor, "SUBSCRIPTION_REGISTRY_ENFORCE", True)
+    monkeypatch.setattr(notification_processor, "BODY_COMPACTION_ENABLED", False)
+    monkeypatch.setattr(notification_processor, "get_subscription_registry", lambda: FakeRegistry({"s1"}))
+    monkeypatch.setattr(notification_processor, "write_audit_record", lambda endpoint, data: True)
+
+
+def test_queue_delivers_each_item_once():
+    async def scenario():
+        graph_api = FakeEmailService()
+        external_service = FakeExternalService()
+        dedup_cache = DedupCache(ttl=60)
+        outcomes = []
+
+        async def handler(notification):
+            outcomes.extend(await process_notification(notification, graph_api, external_service, dedup_cache))
+
+        queue = NotificationQueue(handler, maxsize=10, workers=2)
+        queue.start()
+        queue.enqueue(payload(("s1", "m1"), ("s2", "m2")))
+        queue.enqueue(payload(("s1", "m1")))  # reentrega do Graph
+        await queue.stop(drain_timeout=1)
+
+        statuses = sorted((outcome.resource.rsplit("/", 1)[1], outcome.status) for outcome in outcomes)
+        assert statuses == [("m1", "delivered"), ("m1", "duplicate"), ("m2", "unknown_subscription")]
+        assert graph_api.fetched == ["m1"]
+        assert external_service.sent == ["m1"]
+
+    asyncio.run(scenario())
+
+
+def test_claim_is_released_when_delivery_fails():
+    async def scenario():
+        graph_api = FakeEmailService()
+        external_service = FakeExternalService(accept=lambda email: False)
+        dedup_cache = DedupCache(ttl=60)
+        process = partial(
+            process_notification, graph_api=graph_api, external_service=external_service, dedup_cache=dedup_cache
+        )
+
+        [outcome] = await process(payload(("s1", "m1")))
+        assert outcome.status == "delivery_failed"
+
+        # A reentrega não é tratada como duplicata e é entregue
+        external_service.accept = lambda email: True
+        [outcome] = await process(payload(("s1", "m1")))
+        assert outcome.status == "delivered"
+        assert external_service.sent == ["m1", "m1"]
+
+    asyncio.run(scenario())
+
+
+def test_claim_is_released_when_fetch_fails():
+    async def scenario():
+        graph_api = FakeEmailService(fail={"m1"})
+        dedup_cache = DedupCache(ttl=60)
+
+        [outcome] = await process_notification(payload(("s1", "m1")), graph_api, FakeExternalService(), dedup_cache)
+
+        assert outcome.status == "failed"
+        assert "falha ao buscar m1" in outcome.error
+        assert await dedup_cache.claim("s1:m1:created")
+
+    asyncio.run(scenario())
+
+
+def test_claim_is_released_when_item_is_cancelled():
+    async def scenario():
+        started = asyncio.Event()
+
+        class HangingExternalService(FakeExternalService):
+            async def send_email(self, payload):
+                started.set()
+                await asyncio.sleep(10)
+
+        dedup_cache = DedupCache(ttl=60)
+        task = asyncio.create_task(
+            process_notification(payload(("s1", "m1")), FakeEmailService(), HangingExternalService(), dedup_cache)
+        )
+        await started.wait()
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert await dedup_cache.claim("s1:m1:created")
+
+    asyncio.run(scenario())
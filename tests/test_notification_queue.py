@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from services.notification_queue import NotificationQueue, NotificationQueueFull
+
+
+def test_enqueue_raises_when_full():
+    async def scenario():
+        queue = NotificationQueue(handler=None, maxsize=2, workers=1)
+        queue.enqueue("a")
+        queue.enqueue("b")
+
+        with pytest.raises(NotificationQueueFull):
+            queue.enqueue("c")
+
+        assert queue.stats()["queue_depth"] == 2
+        assert queue.enqueued == 2
+        assert queue.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_put_waits_for_free_slot():
+    async def scenario():
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(payload):
+            await release.wait()
+            handled.append(payload)
+
+        queue = NotificationQueue(handler, maxsize=1, workers=1)
+        queue.start()
+        queue.enqueue("a")
+        await asyncio.sleep(0)  # o worker retira "a" e fica bloqueado no handler
+        queue.enqueue("b")
+
+        put = asyncio.create_task(queue.put("c"))
+        await asyncio.sleep(0.01)
+        assert not put.done()
+
+        release.set()
+        await asyncio.wait_for(put, 1)
+        await queue.stop(drain_timeout=1)
+
+        assert handled == ["a", "b", "c"]
+        assert queue.enqueued == 3
+        assert queue.rejected == 0
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_pending_items():
+    async def scenario():
+        handled = []
+
+        async def handler(payload):
+            await asyncio.sleep(0.001)
+            handled.append(payload)
+
+        queue = NotificationQueue(handler, maxsize=10, workers=2)
+        queue.start()
+        for index in range(6):
+            queue.enqueue(index)
+
+        await queue.stop(drain_timeout=1)
+
+        assert sorted(handled) == list(range(6))
+        assert queue.processed == 6
+        assert queue.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_stop_gives_up_after_drain_timeout():
+    async def scenario():
+        async def handler(payload):
+            await asyncio.sleep(10)
+
+        queue = NotificationQueue(handler, maxsize=10, workers=1)
+        queue.start()
+        queue.enqueue("slow")
+        queue.enqueue("pending")
+
+        await asyncio.wait_for(queue.stop(drain_timeout=0.05), 1)
+
+        assert queue.processed == 0
+        assert queue.stats()["queue_depth"] == 1
+
+    asyncio.run(scenario())
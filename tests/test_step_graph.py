@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from utils.step_graph import Step, StepGraph, StepGraphError
+
+
+def test_independent_steps_run_in_parallel():
+    async def scenario():
+        async def fetch(results):
+            await asyncio.sleep(0.1)
+            return "email"
+
+        async def lookup(results):
+            await asyncio.sleep(0.1)
+            return "user"
+
+        async def deliver(results):
+            return (results["fetch"], results["lookup"])
+
+        graph = StepGraph([
+            Step("fetch", fetch),
+            Step("lookup", lookup),
+            Step("deliver", deliver, depends_on=("fetch", "lookup")),
+        ])
+        result = await graph.run()
+
+        assert result.results["deliver"] == ("email", "user")
+        assert result.total_ms < 180
+        assert result.timings["deliver"].started_ms >= result.timings["fetch"].duration_ms
+
+    asyncio.run(scenario())
+
+
+def test_first_exception_cancels_remaining_steps():
+    async def scenario():
+        cancelled = asyncio.Event()
+        dependent_ran = False
+
+        async def slow(results):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def failing(results):
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def dependent(results):
+            nonlocal dependent_ran
+            dependent_ran = True
+
+        graph = StepGraph([
+            Step("slow", slow),
+            Step("failing", failing),
+            Step("dependent", dependent, depends_on=("failing",)),
+        ])
+
+        with pytest.raises(StepGraphError) as error:
+            await asyncio.wait_for(graph.run(), 1)
+
+        assert error.value.step == "failing"
+        assert isinstance(error.value.error, ValueError)
+        assert error.value.result.timings["failing"].status == "failed"
+        assert cancelled.is_set()
+        assert not dependent_ran
+
+    asyncio.run(scenario())
+
+
+def test_unknown_dependency_is_rejected():
+    async def step(results):
+        return None
+
+    with pytest.raises(ValueError):
+        StepGraph([Step("deliver", step, depends_on=("fetch",))])
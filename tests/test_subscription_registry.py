@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services.subscription_registry import SubscriptionRegistry, mailbox_from_resource
+
+
+def subscription(subscription_id, resource, change_type="created", expires_in=timedelta(days=1)):
+    """
+    Subscription no formato do SDK do Graph (apenas os atributos usados pelo registro).
+    """
+    return SimpleNamespace(
+        id=subscription_id,
+        resource=resource,
+        change_type=change_type,
+        expiration_date_time=datetime.now(timezone.utc) + expires_in,
+        client_state="state",
+        notification_url="https://webhook/notification",
+        lifecycle_notification_url="https://webhook/lifecycle",
+        include_resource_data=False
+    )
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = SubscriptionRegistry(str(tmp_path / "subscriptions.db"))
+    yield registry
+    registry.close()
+
+
+def test_list_filters_and_paginates(registry):
+    async def scenario():
+        await registry.upsert(subscription("s1", "users/A@x.com/messages", expires_in=timedelta(days=1)))
+        await registry.upsert(subscription("s2", "users/a@x.com/events", change_type="updated", expires_in=timedelta(days=2)))
+        await registry.upsert(subscription("s3", "users/b@x.com/messages", expires_in=timedelta(days=3)))
+
+        rows, total = await registry.list(mailbox="a@x.com")
+        assert total == 2
+        assert [row["id"] for row in rows] == ["s1", "s2"]
+
+        rows, total = await registry.list(resource="messages", limit=1, offset=1)
+        assert total == 2
+        assert [row["id"] for row in rows] == ["s3"]
+
+        rows, total = await registry.list(change_type="updated")
+        assert [row["id"] for row in rows] == ["s2"]
+
+    asyncio.run(scenario())
+
+
+def test_find_active_matches_resource_case_and_select(registry):
+    async def scenario():
+        await registry.upsert(subscription("s1", "Users/A@x.com/Messages?$select=id,subject"))
+        await registry.upsert(subscription("s2", "users/b@x.com/messages", expires_in=timedelta(hours=-1)))
+        await registry.upsert(subscription("s3", "users/c@x.com/messages", change_type="updated"))
+
+        assert (await registry.find_active("users/a@x.com/messages", "created"))["id"] == "s1"
+        assert await registry.find_active("users/b@x.com/messages", "created") is None
+        assert await registry.find_active("users/c@x.com/messages", "created") is None
+        assert await registry.find_active("users/a@x.com/events", "created") is None
+
+    asyncio.run(scenario())
+
+
+def test_count_active_total_and_per_mailbox(registry):
+    async def scenario():
+        await registry.upsert(subscription("s1", "users/a@x.com/messages"))
+        await registry.upsert(subscription("s2", "users/A@x.com/events"))
+        await registry.upsert(subscription("s3", "users/b@x.com/messages"))
+        await registry.upsert(subscription("s4", "users/a@x.com/contacts", expires_in=timedelta(hours=-1)))
+
+        assert await registry.count_active() == 3
+        assert await registry.count_active("a@x.com") == 2
+        assert await registry.count_active("nobody@x.com") == 0
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_updates_and_removes(registry):
+    async def scenario():
+        await registry.upsert(subscription("s1", "users/a@x.com/messages"))
+        await registry.upsert(subscription("s2", "users/b@x.com/messages"))
+
+        renewed = subscription("s1", "users/a@x.com/messages", expires_in=timedelta(days=3))
+        summary = await registry.reconcile([renewed, subscription("s3", "users/c@x.com/messages")])
+
+        assert summary == {"active": 2, "removed": 1}
+        assert registry.contains("s1") and registry.contains("s3")
+        assert not registry.contains("s2")
+        assert await registry.get("s2") is None
+        assert (await registry.get("s1"))["expiration"] > (datetime.now(timezone.utc) + timedelta(days=2)).isoformat()
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_keeps_subscriptions_created_during_listing(registry):
+    async def scenario():
+        await registry.upsert(subscription("s1", "users/a@x.com/messages"))
+        await registry.upsert(subscription("s2", "users/b@x.com/messages"))
+        known_ids = registry.snapshot_ids()
+
+        # Provisionada enquanto a listagem paginada do Graph ainda rodava
+        await registry.upsert(subscription("s3", "users/c@x.com/messages"))
+
+        summary = await registry.reconcile([subscription("s1", "users/a@x.com/messages")], known_ids)
+
+        assert summary == {"active": 1, "removed": 1}
+        assert registry.contains("s3")
+        assert not registry.contains("s2")
+
+    asyncio.run(scenario())
+
+
+def test_ids_are_loaded_on_open(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "subscriptions.db")
+        registry = SubscriptionRegistry(path)
+        await registry.upsert(subscription("s1", "users/a@x.com/messages"))
+        registry.close()
+
+        reopened = SubscriptionRegistry(path)
+        assert reopened.contains("s1")
+        assert len(reopened) == 1
+        reopened.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("resource, mailbox", [
+    ("users/a@x.com/messages", "a@x.com"),
+    ("/Users/0a1b/mailFolders('Inbox')/messages", "0a1b"),
+    ("groups/g1/conversations", None),
+    (None, None),
+])
+def test_mailbox_from_resource(resource, mailbox):
+    assert mailbox_from_resource(resource) == mailbox
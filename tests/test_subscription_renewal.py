@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from services.subscription_renewal import SubscriptionRenewalScheduler
+
+
+class GraphError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.response_status_code = status_code
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete(self, subscription_id):
+        self.deleted.append(subscription_id)
+
+
+class FakeSubscriptionService:
+    """
+    SubscriptionService em que renew_subscription levanta `error`; create_subscription sempre funciona.
+    """
+
+    def __init__(self, error):
+        self.error = error
+        self.registry = FakeRegistry()
+        self.created = []
+
+    async def renew_subscription(self, subscription_id):
+        raise self.error
+
+    async def create_subscription(self, resource, change_type):
+        self.created.append((resource, change_type))
+        return SimpleNamespace(id="new")
+
+
+def scheduler(error):
+    renewal = SubscriptionRenewalScheduler(FakeSubscriptionService(error))
+    renewal.track("s1", datetime.now(timezone.utc) + timedelta(minutes=5), "users/a@x.com/messages", "created")
+    return renewal
+
+
+def test_missing_subscription_is_recreated():
+    async def scenario():
+        renewal = scheduler(GraphError("Resource not found", 404))
+
+        assert not await renewal.renew("s1")
+        assert renewal.subscription_service.created == [("users/a@x.com/messages", "created")]
+        assert renewal.subscription_service.registry.deleted == ["s1"]
+        assert renewal.recreated == 1
+
+    asyncio.run(scenario())
+
+
+def test_other_errors_mentioning_404_do_not_recreate():
+    async def scenario():
+        renewal = scheduler(GraphError("Timeout after 404 ms", 504))
+
+        assert not await renewal.renew("s1")
+        assert renewal.subscription_service.created == []
+        assert renewal.renewal_failures == 1
+
+    asyncio.run(scenario())
+
+
+def test_missed_event_without_handlers_is_logged(caplog):
+    async def scenario():
+        renewal = scheduler(None)
+        await renewal._handle_lifecycle_event({"lifecycleEvent": "missed", "subscriptionId": "s1"})
+
+    with caplog.at_level(logging.WARNING, logger="services.subscription_renewal"):
+        asyncio.run(scenario())
+
+    assert "Notificações perdidas na subscription s1" in caplog.text
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from utils.ttl_cache import AsyncTTLCache
+
+
+def test_concurrent_loads_share_one_call():
+    async def scenario():
+        cache = AsyncTTLCache(ttl=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        values = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+
+        assert values == ["value"] * 10
+        assert calls == 1
+        assert await cache.get_or_load("key", loader) == "value"
+        assert calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_loader_error_is_shared_and_not_cached():
+    async def scenario():
+        cache = AsyncTTLCache(ttl=60)
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("graph")
+
+        results = await asyncio.gather(
+            *(cache.get_or_load("key", failing) for _ in range(3)),
+            return_exceptions=True
+        )
+
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert "key" not in cache
+
+        async def loader():
+            return "value"
+
+        assert await cache.get_or_load("key", loader) == "value"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_loader_does_not_cancel_waiters():
+    async def scenario():
+        cache = AsyncTTLCache(ttl=60)
+        started = asyncio.Event()
+        calls = []
+
+        async def loader(name):
+            calls.append(name)
+            started.set()
+            await asyncio.sleep(0.01)
+            return name
+
+        leader = asyncio.create_task(cache.get_or_load("key", lambda: loader("leader")))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_load("key", lambda: loader("waiter"))) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        assert await asyncio.gather(*waiters) == ["waiter"] * 3
+        assert calls == ["leader", "waiter"]
+        assert cache.get("key") == "waiter"
+
+    asyncio.run(scenario())
+
+
+def test_none_is_not_cached_without_negative_ttl():
+    async def scenario():
+        cache = AsyncTTLCache(ttl=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            return None
+
+        await cache.get_or_load("missing", loader)
+        await cache.get_or_load("missing", loader)
+
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_negative_ttl_expires_before_positive(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.ttl_cache.time.monotonic", lambda: now[0])
+    cache = AsyncTTLCache(ttl=60, negative_ttl=5)
+
+    cache.set("missing", None)
+    cache.set("found", "value")
+
+    now[0] += 4
+    assert "missing" in cache
+    assert cache.get("missing", "default") is None
+
+    now[0] += 2
+    assert "missing" not in cache
+    assert cache.get("found") == "value"
+
+    now[0] += 60
+    assert "found" not in cache
+
+
+def test_lru_limit():
+    cache = AsyncTTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+@pytest.mark.parametrize("value", [0, "", []])
+def test_falsy_values_are_cached(value):
+    async def scenario():
+        cache = AsyncTTLCache(ttl=60)
+
+        async def loader():
+            return value
+
+        await cache.get_or_load("key", loader)
+        assert "key" in cache
+
+    asyncio.run(scenario())